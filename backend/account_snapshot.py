@@ -0,0 +1,61 @@
+import threading
+import time
+
+def _amount(value):
+    """Phoenix money values are {'amount': '1.23', 'currency_code': 'USD'} or plain numbers / strings"""
+    if isinstance(value, dict):
+        value = value.get('amount')
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class AccountSnapshots:
+    """
+    One multi-account phoenix payload per refresh cycle, indexed by account
+    number. Per-account crypto equity lookups within `ttl_seconds` of the
+    fetch share it instead of fetching again; concurrent callers wait for the
+    single in-flight fetch.
+    """
+    def __init__(self, fetch_func=None, ttl_seconds=30):
+        self.fetch_func = fetch_func  # fetch_func() -> {'results': [account, ...]}
+        self.ttl_seconds = ttl_seconds
+        self._accounts = {}  # account number -> phoenix account dict
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def configure(self, fetch_func=None, ttl_seconds=None):
+        if fetch_func is not None:
+            self.fetch_func = fetch_func
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+
+    def _snapshot(self):
+        with self._lock:
+            if self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl_seconds:
+                payload = self.fetch_func()
+                results = payload.get('results', []) if isinstance(payload, dict) else (payload or [])
+                self._accounts = {
+                    account.get('account_number'): account
+                    for account in results if isinstance(account, dict) and account.get('account_number')
+                }
+                self._fetched_at = time.monotonic()
+            return self._accounts
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None
+
+    def account(self, account_number):
+        return self._snapshot().get(account_number)
+
+    def crypto_equity(self, account_number):
+        account = self.account(account_number)
+        if not account:
+            return 0.0
+        return _amount((account.get('crypto') or {}).get('equity', 0.0)) or 0.0
+
+# Global instance
+account_snapshots = AccountSnapshots()
@@ -3,15 +3,46 @@ import pytz
 import json
 import pprint
 import traceback
-import yfinance
+import threading
 from collections import defaultdict
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask_cors import CORS
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, make_response, Response, g
 import robin_stocks.robinhood as r
 from cache_utils import cache_robinhood_response
-from datetime import datetime, timedelta, time
+from portfolio_snapshots import portfolio_snapshots
+from portfolio_stream import PortfolioStreamHub
+from portfolio_analytics import AnalyticsWorker, ANALYTICS_FIELDS
+from positions import Position, positions_from_dicts
+from portfolio_frame import (
+    build_account_frame,
+    count_tickers,
+    theta_by_ticker,
+    summarize_account_frame,
+    merge_account_positions,
+    count_position_tickers,
+    position_theta_by_ticker,
+    frame_to_positions
+)
+from perf_metrics import perf
+from robinhood_session import robinhood_session
+from keyed_locks import KeyedLocks
+from upstream import upstream, KnownBadTicker, UpstreamUnavailable
+from serialization import FastJSONProvider, compress_response, dump_json_bytes, load_json, read_json, write_json, json_file_lock, json_file_locks
+from risk_analytics import position_exposures, close_matrix, compute_risk, risk_cache
+from downsampling import downsample_series, slice_series
+from screener import screener_index, parse_conditions, ScreenerQueryError
+from equity_history import equity_history
+from premium_rollups import PremiumLedger, ROLLUP_BUCKETS, merge_premium_series
+from account_snapshot import account_snapshots
+from daily_bars import daily_bars
+from trading_calendar import trading_calendar
+from tax_lots import tax_lot_store, stock_trades, option_trades, sort_orders, is_filled, merge_buckets
+from datetime import datetime, timedelta
 import uuid
+import time as time_module
 from ticker_data_cache import (
     ticker_cache,
     get_fundamentals_cached,
@@ -30,29 +61,82 @@ with open('config.json', 'r') as f:
 with open('market-config.json', 'r') as f:
     market_config = json.load(f)
 
+# Per-provider rate budgets for Robinhood / yfinance calls (see upstream.py)
+upstream.configure(
+    config['upstream']['budgets'],
+    config['upstream']['max_wait_seconds'],
+    breaker=config['upstream']['circuit_breaker'],
+    negative_ttl_seconds=config['upstream']['negative_cache_ttl_seconds'],
+    ticker_failures=config['upstream']['ticker_failures']
+)
+trading_calendar.configure(market_config['market_hours'], market_config.get('calendar'))
+daily_bars.configure(batch_size=config['daily_bars']['batch_size'])
+# Read-modify-write of groups, notes and ledgers locks across gunicorn workers too
+json_file_locks.configure(lock_dir=os.path.join(config['cache']['cache_directory'], 'locks', 'json'))
+account_snapshots.configure(
+    fetch_func=lambda: load_phoenix_account(),  # defined with the other Robinhood fetchers below
+    ttl_seconds=config['account_snapshot']['ttl_seconds']
+)
+tax_lot_store.configure(
+    cache_directory=config['cache']['cache_directory'],
+    method=config['tax_lots']['method'],
+    sync_interval_seconds=config['tax_lots']['sync_interval_seconds']
+)
+equity_history.configure(
+    directory=config['equity_history']['directory'],
+    timezone=market_config['market_hours']['timezone'],
+    min_interval_seconds=config['equity_history']['min_interval_seconds'],
+    max_snapshot_days=config['equity_history']['max_snapshot_days']
+)
+
 # --- Flask App Initialization ---
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app, resources={r"/api/*": {"origins": config['cors']['origins']}})
 
 pp = pprint.PrettyPrinter(indent=4)
 
-# --- Robinhood Logic (similar to your original script) ---
-# We will login once when the server starts.
-# NOTE: In a real production app, you'd manage this session more robustly.
-try:
-    with open("robinhood_secrets.json") as f:
-        secrets = json.load(f)
-
-    r.login(
-        username=secrets["USER"],
-        password=secrets["PASSWORD"],
-        store_session=True,
-        mfa_code=secrets["MY_2FA_APP_HERE"]
+@app.before_request
+def start_request_timer():
+    g.request_start = time_module.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Per-endpoint latency histogram (time to first byte for streamed responses)"""
+    if 'request_start' in g:
+        perf.record('request', request.endpoint or 'unknown',
+                    time_module.perf_counter() - g.request_start, outcome=str(response.status_code))
+    return response
+
+@app.after_request
+def compress_large_responses(response):
+    """Negotiate brotli/gzip for large JSON responses (ALL view, historical data)"""
+    return compress_response(
+        response,
+        request.headers.get('Accept-Encoding', ''),
+        min_bytes=config['compression']['min_bytes']
     )
-    print("Robinhood login successful.")
-except Exception as e:
-    print(f"CRITICAL: Robinhood login failed on startup. {e}")
-    # The app will still run, but API calls will fail.
+
+# Serve robin_stocks/yfinance calls from recorded fixtures (see replay.py)
+if os.environ.get('REPLAY_MODE'):
+    from replay import install_from_env
+    install_from_env()
+
+# --- Robinhood Logic (similar to your original script) ---
+# Login runs in the background (see robinhood_session.py) so the server accepts
+# requests immediately and serves cached data until the session is ready.
+@app.before_request
+def ensure_robinhood_session():
+    robinhood_session.start()
+
+def require_robinhood_session():
+    """
+    Wait (bounded) for the background login before calling Robinhood.
+    Returns None when ready, else an (error payload, 503) tuple.
+    """
+    if robinhood_session.wait_ready(config['startup']['login_wait_seconds']):
+        return None
+    return {"error": "Robinhood session is not ready", "session": robinhood_session.status()}, 503
 
 # Global dictionary to cache Ticker objects
 yfinance_ticker_cache = {}
@@ -65,17 +149,21 @@ def get_yfinance_ticker(symbol, refresh_interval_minutes=None):
     """
     # Replace invalid characters in the symbol
     symbol = symbol.replace('.', '-')
-    # Check if the symbol is in the cache
-    if symbol in yfinance_ticker_cache:
+    # Check if the symbol is in the cache (single lookup, entries are replaced whole)
+    cached = yfinance_ticker_cache.get(symbol)
+    if cached:
         # Check if the cached data is still fresh
-        last_call_time = yfinance_ticker_cache[symbol]['timestamp']
+        last_call_time = cached['timestamp']
         time_diff = datetime.now() - last_call_time
         if time_diff.total_seconds() < refresh_interval_minutes * 60:
             # Data is fresh, return the cached Ticker object
-            return yfinance_ticker_cache[symbol]['ticker']
+            return cached['ticker']
+    if upstream.known_bad('yfinance', 'ticker', symbol):
+        return None
     # If the ticker is not in the cache or is stale, create a new Ticker object
     # and update the cache with the current timestamp
     try:
+        import yfinance  # deferred: pulls in pandas, only needed once analytics run
         ticker = yfinance.Ticker(symbol)
         yfinance_ticker_cache[symbol] = {
             'ticker': ticker,
@@ -83,7 +171,8 @@ def get_yfinance_ticker(symbol, refresh_interval_minutes=None):
         }
         return ticker
     except Exception as e:
-        print(f"Failed to create yfinance Ticker object for {ticker}: {e}")
+        print(f"Failed to create yfinance Ticker object for {symbol}: {e}")
+        upstream.mark_bad('yfinance', 'ticker', symbol, str(e))
         return None
 
 @cache_robinhood_response
@@ -103,30 +192,48 @@ def get_open_stock_positions(account_number):
     return r.account.get_open_stock_positions(account_number=account_number)
 
 def get_instrument_by_url(url):
-    return r.get_instrument_by_url(url)
+    with upstream.call('robinhood', 'get_instrument_by_url'):
+        return r.get_instrument_by_url(url)
 
 # --- Caching for get_instrument_by_url ---
 INSTRUMENT_URL_CACHE_FILE = config['paths']['instrument_cache_file']
 
-def get_instrument_by_url_cached(url):
-    os.makedirs(os.path.dirname(INSTRUMENT_URL_CACHE_FILE), exist_ok=True)
+# The map is loaded once and kept in memory; misses are added under a lock and
+# the merged map is written back, so concurrent lookups don't drop entries
+instrument_url_map = None
+instrument_url_lock = threading.Lock()
+
+def load_instrument_url_map():
     url_to_ticker_map = {}
     if os.path.exists(INSTRUMENT_URL_CACHE_FILE):
         try:
             with open(INSTRUMENT_URL_CACHE_FILE, 'r') as f:
-                url_to_ticker_map = json.load(f)
+                url_to_ticker_map = load_json(f.read())
         except json.JSONDecodeError:
             print(f"Warning: Could not decode JSON from {INSTRUMENT_URL_CACHE_FILE}. Starting fresh.")
+    return url_to_ticker_map
 
-    if url in url_to_ticker_map:
-        return {'symbol': url_to_ticker_map[url]}
+def get_instrument_by_url_cached(url):
+    global instrument_url_map
+    with instrument_url_lock:
+        if instrument_url_map is None:
+            os.makedirs(os.path.dirname(INSTRUMENT_URL_CACHE_FILE), exist_ok=True)
+            instrument_url_map = load_instrument_url_map()
+        ticker = instrument_url_map.get(url)
+
+    if ticker:
+        perf.record_cache('instrument_map', 'symbol', 'hit')
+        return {'symbol': ticker}
     else:
-        instrument_data = r.get_instrument_by_url(url)
+        perf.record_cache('instrument_map', 'symbol', 'miss')
+        with upstream.call('robinhood', 'get_instrument_by_url'):
+            instrument_data = r.get_instrument_by_url(url)
         if instrument_data and 'symbol' in instrument_data:
             ticker = instrument_data['symbol']
-            url_to_ticker_map[url] = ticker
-            with open(INSTRUMENT_URL_CACHE_FILE, 'w') as f:
-                json.dump(url_to_ticker_map, f, indent=2)
+            with instrument_url_lock:
+                # Pick up entries other workers wrote since we loaded the map
+                instrument_url_map.update({**load_instrument_url_map(), url: ticker})
+                write_json(INSTRUMENT_URL_CACHE_FILE, instrument_url_map)
             return {'symbol': ticker}
         return None # Or handle error appropriately
 
@@ -158,36 +265,11 @@ def load_phoenix_account():
 
 def get_crypto_equity_for_account(account_number):
     """
-    Gets crypto equity for a specific account using cached phoenix account data.
-    Returns the crypto equity value for the specified account.
+    Gets crypto equity for a specific account from the shared phoenix snapshot
+    (one fetch per refresh cycle for all accounts, see account_snapshot.py).
     """
     try:
-        with open("robinhood_secrets.json") as f:
-            secrets = json.load(f)
-
-        # Get all account data (cached)
-        phoenix_data = load_phoenix_account()
-
-        if not phoenix_data or 'results' not in phoenix_data:
-            return 0.0
-
-        # Find the account by account number
-        for account_data in phoenix_data['results']:
-            if account_data.get('account_number') == account_number:
-                crypto_data = account_data.get('crypto', {})
-
-                # Handle the case where equity might be a dict or a direct value
-                equity_value = crypto_data.get('equity', 0.0)
-
-                if isinstance(equity_value, dict):
-                    # If it's a dict, look for a 'amount' field
-                    crypto_equity = float(equity_value.get('amount', 0.0))
-                else:
-                    crypto_equity = float(equity_value)
-
-                return crypto_equity
-
-        return 0.0
+        return account_snapshots.crypto_equity(account_number)
     except Exception as e:
         print(f"ERROR in get_crypto_equity_for_account: {e}")
         return 0.0
@@ -238,71 +320,98 @@ def is_order_eligible_for_premium(order: dict):
 
     return  is_theta_play_initiator
 
-def calculate_theta_premium_for_account(account_number, account_name):
-    """
-    Calculates the net premium from all historical filled option orders
-    and groups it by ticker, using a cache to avoid reprocessing orders.
-    """
+def premium_cache_file(account_name):
     cache_dir = os.path.join(config['cache']['cache_directory'], account_name)
     os.makedirs(cache_dir, exist_ok=True)
-    cache_file = os.path.join(cache_dir, 'earned_premium.json')
-
-    # Load cached data if it exists
-    cached_data = {"processed_order_ids": [], "premiums_by_ticker": {}}
-    if os.path.exists(cache_file):
+    return os.path.join(cache_dir, 'earned_premium.json')
+
+# account -> (cache file mtime, PremiumLedger); re-read only when the file changes
+premium_ledgers = {}
+
+def load_premium_ledger(account_name):
+    """Per-order premium records and rollups of an account (older caches without them start fresh)"""
+    cache_file = premium_cache_file(account_name)
+    mtime = os.path.getmtime(cache_file) if os.path.exists(cache_file) else None
+    cached = premium_ledgers.get(account_name)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    cached_data = None
+    if mtime is not None:
         with open(cache_file, 'r') as f:
             try:
-                cached_data = json.load(f)
-                # Ensure keys exist
-                if "processed_order_ids" not in cached_data:
-                    cached_data["processed_order_ids"] = []
-                if "premiums_by_ticker" not in cached_data:
-                    cached_data["premiums_by_ticker"] = {}
+                cached_data = load_json(f.read())
             except json.JSONDecodeError:
                 print(f"Warning: Could not decode JSON from {cache_file}. Starting fresh.")
+    ledger = PremiumLedger(cached_data, timezone=market_config['market_hours']['timezone'])
+    premium_ledgers[account_name] = (mtime, ledger)
+    return ledger
 
-    processed_order_ids = set(cached_data["processed_order_ids"])
-    premiums = defaultdict(float, cached_data["premiums_by_ticker"])
-    new_orders_processed = False
-
-    try:
-        all_orders = get_all_option_orders(account_number=account_number)
-        if not all_orders:
-            return premiums
-
-        for order in all_orders:
-            order_id = order.get("id")
-            if not order_id or order_id in processed_order_ids:
-                continue
+def calculate_theta_premium_for_account(account_number, account_name):
+    """
+    Calculates the net premium from all historical filled option orders
+    and groups it by ticker, using a cache to avoid reprocessing orders.
+    Every final-state order is recorded once with its fill date and premium
+    classification, and the day / week / month / ticker / strategy rollups
+    are updated as it is added (see premium_rollups.py).
+    """
+    cache_file = premium_cache_file(account_name)
+    with json_file_lock(cache_file):
+        ledger = load_premium_ledger(account_name)
+        try:
+            all_orders = get_all_option_orders(account_number=account_number)
+            if not all_orders:
+                return ledger.premiums_by_ticker()
+
+            new_orders_processed = False
+            for order in all_orders:
+                order_id = order.get("id")
+                if not order_id or ledger.has_order(order_id):
+                    continue
+                if ledger.add_order(order, is_order_eligible_for_premium(order)):
+                    new_orders_processed = True
 
-            if not is_order_eligible_for_premium(order):
-                continue
+            # Save back to cache if new orders were processed
+            if new_orders_processed:
+                write_json(cache_file, ledger.state)
+                premium_ledgers[account_name] = (os.path.getmtime(cache_file), ledger)
 
-            new_orders_processed = True
-            processed_order_ids.add(order_id)
+            return ledger.premiums_by_ticker()
+        except Exception as e:
+            print(f"ERROR in calculate_theta_premium_for_account: {e}")
+            traceback.print_exc()
+            return ledger.premiums_by_ticker()
 
-            ticker = order.get("chain_symbol")
-            direction = order.get("direction") # Use 'direction' for overall order credit/debit
-            amount = float(order.get("net_amount", 0)) # Use 'net_amount' which is the net amount for the order
-            quantity = float(order.get("quantity", 0))
-            if not all([ticker, direction, amount, quantity]):
-                continue
-            net_amount = amount * quantity
-            premiums[ticker] += net_amount if direction == "credit" else -net_amount
-
-        # Save back to cache if new orders were processed
-        if new_orders_processed:
-            with open(cache_file, 'w') as f:
-                json.dump({
-                    "processed_order_ids": list(processed_order_ids),
-                    "premiums_by_ticker": premiums
-                }, f, indent=2)
-
-        return premiums
-    except Exception as e:
-        print(f"ERROR in calculate_theta_premium_for_account: {e}")
-        traceback.print_exc()
-        return premiums
+def sync_tax_lots(account_name, account_number, force=False):
+    """
+    Feed orders placed since the ledger's cursor into the account's tax lots and
+    persist the updated state. Skipped if synced recently or logged out.
+    """
+    with tax_lot_store.lock(account_name):
+        ledger = tax_lot_store.ledger(account_name)
+        if not (force or tax_lot_store.needs_sync(account_name)) or not robinhood_session.is_ready():
+            return ledger
+        try:
+            start_date = tax_lot_store.cursor_date(account_name)
+            orders = []
+            for order in get_all_stock_orders(account_number, start_date=start_date) or []:
+                if is_filled(order, 'cumulative_quantity') and ledger.is_new(order):
+                    instrument = get_instrument_by_url_cached(order['instrument'])
+                    if instrument and instrument.get('symbol'):
+                        orders.append((order, stock_trades(order, instrument['symbol'])))
+            for order in get_all_option_orders(account_number, start_date=start_date) or []:
+                if is_filled(order, 'processed_quantity') and ledger.is_new(order):
+                    orders.append((order, option_trades(order)))
+
+            applied = ledger.apply_orders(sort_orders(orders))
+            expired = ledger.expire_options(datetime.now().date().isoformat())
+            tax_lot_store.mark_synced(account_name)
+            if applied or expired:
+                tax_lot_store.save(account_name, ledger)
+                print(f"Tax lots for {account_name}: {applied} new orders, {expired} expired contracts")
+        except Exception as e:
+            print(f"ERROR syncing tax lots for {account_name}: {e}")
+            traceback.print_exc()
+        return ledger
 
 def parse_occ_symbol(occ_symbol_full):
     """Parses the OCC option symbol to extract expiry, type, and strike."""
@@ -320,36 +429,115 @@ def parse_occ_symbol(occ_symbol_full):
         return 'N/A', 'N/A', 0
 
 def is_market_hours(now=None):
-    """Checks if the current time is within US stock market hours."""
-    if now is None:
-        now = datetime.now(pytz.utc)
-
-    eastern = pytz.timezone(market_config['market_hours']['timezone'])
-    now_eastern = now.astimezone(eastern)
+    """Checks if the current time is within a US stock market session (holidays and early closes included)."""
+    return trading_calendar.is_open(now)
 
-    # Parse market hours from config
-    open_time_str = market_config['market_hours']['open_time']
-    close_time_str = market_config['market_hours']['close_time']
+EMPTY_ANALYTICS = {field: None for field in ANALYTICS_FIELDS}
 
-    market_open = time(*map(int, open_time_str.split(':')))
-    market_close = time(*map(int, close_time_str.split(':')))
-
-    # Check if it's a trading day and within market hours
-    is_trading_day = now_eastern.weekday() in market_config['market_hours']['trading_days']
-    is_market_time = market_open <= now_eastern.time() <= market_close
+def compute_ticker_analytics(ticker):
+    """
+    Expensive per-ticker enrichment columns: 1W/1M/3M/1Y change, revenue change,
+    RSI and the P/S and P/E ranges. May block on cold yfinance fetches.
+    """
+    with perf.timed('analytics', 'compute_ticker_analytics'):
+        # Get all price changes in one cached call
+        price_changes = get_all_price_changes_cached(ticker, ticker, get_yfinance_ticker)
+
+        # Get revenue changes in one cached call
+        revenue_changes = get_revenue_changes_cached(ticker, ticker, get_yfinance_ticker)
+
+        # Get historical metrics (RSI, P/S, P/E min/max)
+        historical_metrics = get_historical_metrics(ticker)
+
+    analytics = {
+        'one_week_change': price_changes['one_week_change'],
+        'one_month_change': price_changes['one_month_change'],
+        'three_month_change': price_changes['three_month_change'],
+        'one_year_change': price_changes['one_year_change'],
+        'yearly_revenue_change': revenue_changes['yearly_revenue_change'],
+        'current_rsi': historical_metrics['current_rsi'],
+        'current_ps': historical_metrics['current_ps'],
+        'ps_12m_max': historical_metrics['ps_12m_max'],
+        'ps_12m_min': historical_metrics['ps_12m_min'],
+        'pe_12m_max': historical_metrics['pe_12m_max'],
+        'pe_12m_min': historical_metrics['pe_12m_min']
+    }
+    screener_index.update(ticker, analytics)
+    return analytics
+
+analytics_worker = AnalyticsWorker(
+    # Background priority: the core portfolio view goes first for upstream budget
+    lambda ticker: upstream.run_in_background(compute_ticker_analytics, ticker),
+    max_workers=config['analytics']['max_workers'],
+    ttl_seconds=config['cache']['market_hours_duration_seconds'],
+    retry_seconds=config['analytics']['retry_seconds']
+)
 
-    return is_trading_day and is_market_time
+# cache file -> ((mtime_ns, size), parsed contents with Position rows); re-parsed only when the file changes
+portfolio_cache_memo = {}
 
-def get_data_for_account(account_name, force_refresh=False):
+def read_portfolio_cache(cache_file):
+    """
+    A portfolio cache file with its rows as Position objects, parsed once per
+    version of the file: the ALL view and polling re-read the same account
+    caches many times between refreshes. Rows are read-only and shared.
+    """
+    stat = os.stat(cache_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+    memo = portfolio_cache_memo.get(cache_file)
+    if memo is None or memo[0] != version:
+        cached_data = read_json(cache_file)
+        data = cached_data.get("data", {})
+        data['positions'] = positions_from_dicts(data.get('positions', []))
+        memo = portfolio_cache_memo[cache_file] = (version, cached_data)
+    return memo[1]
+
+# Only one portfolio refresh per account (core or full) at a time, across threads and workers;
+# requests that waited then find the fresh cache instead of fetching again
+portfolio_refresh_locks = KeyedLocks(os.path.join(config['cache']['cache_directory'], 'locks'))
+
+def record_equity_history(account_name, summary, positions):
+    """Append a fresh summary (and optionally per-position market values) to the equity history"""
+    try:
+        position_values = None
+        if config['equity_history']['record_positions']:
+            position_values = {pos.id: pos.marketValue for pos in positions}
+        equity_history.append(account_name, summary, positions=position_values)
+    except Exception as e:
+        print(f"Error recording equity history for {account_name}: {e}")
+
+def index_screener_rows(positions_frame):
+    """Feed the screener index with the stock rows of a freshly built account frame"""
+    stocks = positions_frame[positions_frame['type'] == 'stock']
+    fields = ['ticker', 'latest_price', 'pe_ratio', 'sector', 'industry'] + ANALYTICS_FIELDS
+    for row in stocks[fields].to_dict('records'):
+        row['price'] = row.pop('latest_price') or None
+        row['pe_ratio'] = row['pe_ratio'] or None  # 0 means Robinhood had no P/E
+        screener_index.update(row.pop('ticker'), row)
+
+def refresh_lock_key(account_name, include_analytics):
+    """Core and full refreshes write separate cache files, so a core request never queues behind a full one"""
+    return account_name if include_analytics else f"{account_name}:core"
+
+def get_data_for_account(account_name, force_refresh=False, include_analytics=True):
     """
     Fetches and processes portfolio data for a given account name.
     This function is designed to be called by our API endpoint.
     It uses a cache to avoid fetching data too frequently, with different
     durations for market vs. off-market hours.
+    With include_analytics=False only Robinhood data is used and the
+    ANALYTICS_FIELDS columns are left as None (see /api/portfolio/<account>/analytics).
     """
+    with portfolio_refresh_locks.lock(refresh_lock_key(account_name, include_analytics)):
+        return _get_data_for_account(account_name, force_refresh, include_analytics)
+
+def _get_data_for_account(account_name, force_refresh, include_analytics):
     cache_dir = os.path.join(config['cache']['cache_directory'], account_name)
     os.makedirs(cache_dir, exist_ok=True)
     portfolio_cache_file = os.path.join(cache_dir, 'portfolio_data.json')
+    # Core-only data is cached separately; a full snapshot satisfies a core request too
+    core_cache_file = os.path.join(cache_dir, 'portfolio_core.json')
+    cache_files = [portfolio_cache_file] if include_analytics else [portfolio_cache_file, core_cache_file]
 
     # Determine cache duration based on market hours
     if is_market_hours():
@@ -360,20 +548,28 @@ def get_data_for_account(account_name, force_refresh=False):
         print(f"Market is closed. Using {CACHE_DURATION_SECONDS//60}-minute cache.")
 
     # --- Check for cached data first ---
-    if not force_refresh and os.path.exists(portfolio_cache_file):
-        with open(portfolio_cache_file, 'r') as f:
+    for cache_file in cache_files:
+        if not force_refresh and os.path.exists(cache_file):
             try:
-                cached_data = json.load(f)
+                cached_data = read_portfolio_cache(cache_file)
                 last_fetched_time = datetime.fromisoformat(cached_data.get("timestamp"))
-                if (datetime.now() - last_fetched_time).total_seconds() < CACHE_DURATION_SECONDS:
+                # Until the background login finishes, stale data beats an error
+                if (datetime.now() - last_fetched_time).total_seconds() < CACHE_DURATION_SECONDS or not robinhood_session.is_ready():
                     print(f"Serving cached portfolio data for {account_name}.")
-                    response_data = cached_data.get("data", {})
+                    perf.record_cache('portfolio', os.path.basename(cache_file).replace('.json', ''), 'hit')
+                    response_data = dict(cached_data.get("data", {}))
                     response_data['timestamp'] = cached_data.get("timestamp")
                     return response_data, 200
             except (json.JSONDecodeError, KeyError, TypeError) as e:
-                print(f"Warning: Could not read cache file {portfolio_cache_file}. Refetching. Error: {e}")
+                print(f"Warning: Could not read cache file {cache_file}. Refetching. Error: {e}")
+
+    session_error = require_robinhood_session()
+    if session_error:
+        return session_error
 
     print(f"Fetching fresh portfolio data for {account_name}.")
+    perf.record_cache('portfolio', os.path.basename(cache_files[-1]).replace('.json', ''), 'miss')
+    phases = perf.stopwatch('get_data_for_account')
     try:
         with open("robinhood_secrets.json") as f:
             accounts_map = json.load(f)["ACCOUNTS"]
@@ -385,6 +581,7 @@ def get_data_for_account(account_name, force_refresh=False):
         # --- Calculate Earned Premium ---
         premiums_by_ticker = calculate_theta_premium_for_account(account_number, account_name)
         total_earned_premium = sum(premiums_by_ticker.values())
+        phases.lap('earned_premium')
 
         # for total equity
         portfolio = load_portfolio_profile(account_number=account_number + '/')
@@ -392,14 +589,23 @@ def get_data_for_account(account_name, force_refresh=False):
         account_details = load_account_profile(account_number=account_number + '/')
 
         total_equity = float(portfolio.get('extended_hours_equity') or portfolio['equity'])
+        # Adjusted for deposits and withdrawals, so the day's change is market movement only
+        previous_close_equity = float(portfolio['adjusted_portfolio_equity_previous_close'])
+        cash = float(account_details.get('cash')) + float(account_details.get('uncleared_deposits'))
         crypto_equity = get_crypto_equity_for_account(account_number)
         total_equity += crypto_equity
-        cash = float(account_details.get('cash')) + float(account_details.get('uncleared_deposits'))
+        phases.lap('account_profile')
 
-        total_pnl = 0
-        # 1. Fetch and process stocks first
+        # 1. Fetch stocks first; rows hold raw inputs, metrics are computed per column below
         stock_positions = get_open_stock_positions(account_number=account_number)
-        all_positions_data = []
+        position_rows = []
+
+        # Daily bars (previous close, price changes) for all held tickers in batched calls
+        if stock_positions:
+            daily_bars.prefetch([
+                get_instrument_by_url_cached(pos['instrument'])['symbol']
+                for pos in stock_positions if pos and float(pos.get('quantity', 0)) != 0
+            ])
 
         if stock_positions:
             for pos in stock_positions:
@@ -408,71 +614,36 @@ def get_data_for_account(account_name, force_refresh=False):
 
                 instrument_data = get_instrument_by_url_cached(pos['instrument'])
                 ticker = instrument_data['symbol']
-                fundamentals = get_fundamentals(ticker)[0]
-                latest_price_str = get_latest_price(ticker)[0]
+                # None when upstream refused a ticker with nothing cached: skip the row, not the account
+                fundamentals = (get_fundamentals(ticker) or [None])[0] or {}
+                latest_price_str = (get_latest_price(ticker) or [None])[0]
                 if not latest_price_str:
                     continue
 
-                quantity = float(pos['quantity'])
-                avg_cost = float(pos['average_buy_price'])
-                latest_price = float(latest_price_str)
-                market_value = quantity * latest_price
-                unrealized_pnl = market_value - (quantity * avg_cost)
-                total_pnl += unrealized_pnl
-                high_52_weeks = float(fundamentals.get('high_52_weeks', 0)) if fundamentals.get('high_52_weeks', 0) else 0
-                low_52_weeks  = float(fundamentals.get('low_52_weeks', 0))  if fundamentals.get('low_52_weeks', 0)  else 0
-
-                # Get all price changes in one cached call
-                price_changes = get_all_price_changes_cached(ticker, ticker, get_yfinance_ticker)
-
-                # Get revenue changes in one cached call
-                revenue_changes = get_revenue_changes_cached(ticker, ticker, get_yfinance_ticker)
+                # Price changes, revenue change and historical metrics (yfinance / historical cache)
+                analytics = compute_ticker_analytics(ticker) if include_analytics else EMPTY_ANALYTICS
 
-                # Get historical metrics (RSI, P/S, P/E min/max)
-                historical_metrics = get_historical_metrics(ticker)
-
-                # Get yesterday's closing price for accurate day change calculation
-                previous_close = get_previous_close_cached(ticker)
-                if previous_close and previous_close > 0:
-                    intraday_pct_change = (latest_price - previous_close) * 100 / previous_close
-                else:
-                    intraday_pct_change = 0
-
-                all_positions_data.append({
+                position_rows.append({
                     "type": "stock",
                     "ticker": ticker,
-                    "quantity": quantity,
-                    "marketValue": market_value,
-                    "avgCost": avg_cost,
-                    "latest_price": latest_price,
-                    "unrealizedPnl": unrealized_pnl,
-                    "returnPct": (unrealized_pnl / (quantity * avg_cost)) * 100 if avg_cost > 0 else 0,
-                    "strike": None, "expiry": None, "option_type": None,
+                    "quantity": float(pos['quantity']),
+                    "avgCost": float(pos['average_buy_price']),
+                    "latest_price": float(latest_price_str),
+                    # Yesterday's close for an accurate day change
+                    "previous_close": get_previous_close_cached(ticker),
                     "earnedPremium": premiums_by_ticker.get(ticker, 0.0),
                     "name": get_name_by_symbol(ticker),
-                    "intraday_percent_change": intraday_pct_change,
                     "pe_ratio": float(fundamentals.get('pe_ratio')) if fundamentals.get('pe_ratio') else 0.0,
-                    "portfolio_percent": (market_value / total_equity) * 100 if total_equity > 0 else 0,
-                    "high_52_weeks": high_52_weeks,
-                    "low_52_weeks": low_52_weeks,
-                    "position_52_week": (latest_price - low_52_weeks) * 100 / (high_52_weeks - low_52_weeks) if high_52_weeks > low_52_weeks else 0,
-                    "side": 'long' if market_value > 0 else 'short',
-                    "one_week_change": price_changes['one_week_change'],
-                    "one_month_change": price_changes['one_month_change'],
-                    "three_month_change": price_changes['three_month_change'],
-                    "one_year_change": price_changes['one_year_change'],
-                    "yearly_revenue_change": revenue_changes['yearly_revenue_change'],
+                    "high_52_weeks": float(fundamentals.get('high_52_weeks', 0)) if fundamentals.get('high_52_weeks', 0) else 0,
+                    "low_52_weeks": float(fundamentals.get('low_52_weeks', 0)) if fundamentals.get('low_52_weeks', 0) else 0,
                     "sector": fundamentals.get('sector'),
                     "industry": fundamentals.get('industry'),
-                    "current_rsi": historical_metrics['current_rsi'],
-                    "current_ps": historical_metrics['current_ps'],
-                    "ps_12m_max": historical_metrics['ps_12m_max'],
-                    "ps_12m_min": historical_metrics['ps_12m_min'],
-                    "pe_12m_max": historical_metrics['pe_12m_max'],
-                    "pe_12m_min": historical_metrics['pe_12m_min'],
+                    **analytics
                 })
 
-        # 2. then, Fetch and process options
+        phases.lap('stocks')
+
+        # 2. then, Fetch options
         option_positions = get_open_option_positions(account_number=account_number)
         if option_positions:
             for pos in option_positions:
@@ -483,61 +654,31 @@ def get_data_for_account(account_name, force_refresh=False):
                 market_data = market_data_list[0]
 
                 ticker = pos.get('chain_symbol')
-                quantity = float(pos['quantity'])
-                avg_price = float(pos['average_price']) / 100
-                mark_price = float(market_data.get('mark_price', 0))
-
-                # For short options, Robinhood returns negative avg_price
-                # Convert to positive (representing the credit received)
-                is_short = pos.get('type') == 'short'
-                if is_short:
-                    avg_price = abs(avg_price)
-
-                # For short options, market value is negative (liability)
-                market_value = quantity * mark_price * 100
-                if is_short:
-                    market_value *= -1
-
-                # P/L calculation
-                # Long: P/L = (current_price - avg_price) * quantity * 100
-                # Short: P/L = (avg_price - current_price) * quantity * 100
-                pnl_per_share = mark_price - avg_price
-                if is_short:
-                    pnl_per_share *= -1
-
-                unrealized_pnl = pnl_per_share * quantity * 100
-                total_pnl += unrealized_pnl
-
                 expiry, option_type, strike = parse_occ_symbol(market_data.get('occ_symbol'))
-                fundamentals = get_fundamentals(ticker)[0]
+                fundamentals = (get_fundamentals(ticker) or [None])[0] or {}
+                # Underlying price for the greeks (ticker cache: one fetch per underlying, not per leg)
+                underlying_price = (get_latest_price(ticker) or [None])[0]
 
                 # Get revenue changes in one cached call for options underlying
-                revenue_changes = get_revenue_changes_cached(ticker, ticker, get_yfinance_ticker)
+                if include_analytics:
+                    revenue_changes = get_revenue_changes_cached(ticker, ticker, get_yfinance_ticker)
+                else:
+                    revenue_changes = {'yearly_revenue_change': None}
 
                 try:
-                    all_positions_data.append({
+                    position_rows.append({
                         "type": "option",
                         "ticker": ticker,
-                        "quantity": quantity,
-                        "marketValue": market_value,
-                        "avgCost": avg_price,
-                        "latest_price": mark_price,
-                        "unrealizedPnl": unrealized_pnl,
-                        "returnPct": (pnl_per_share / avg_price) * 100 if avg_price > 0 else 0,
-                        "strike": strike, "expiry": expiry, "option_type": option_type,
-                        "earnedPremium": premiums_by_ticker.get(pos.get('chain_symbol'), 0.0),
-                        "name": get_name_by_symbol(pos.get('chain_symbol')),
-                        "intraday_percent_change": 0,
-                        "pe_ratio": 0,
-                        "portfolio_percent": 0,
-                        "high_52_weeks": 0,
-                        "low_52_weeks": 0,
-                        "position_52_week": 0,
+                        "quantity": float(pos['quantity']),
+                        # For short options Robinhood returns a negative average price;
+                        # keep it positive (the credit received), `side` flips the sign
+                        "avgCost": abs(float(pos['average_price']) / 100),
+                        "latest_price": float(market_data.get('mark_price', 0)),
                         "side": pos.get('type'),
-                        "one_week_change": 0,
-                        "one_month_change": 0,
-                        "three_month_change": 0,
-                        "one_year_change": 0,
+                        "underlying_price": float(underlying_price) if underlying_price else None,
+                        "strike": strike, "expiry": expiry, "option_type": option_type,
+                        "earnedPremium": premiums_by_ticker.get(ticker, 0.0),
+                        "name": get_name_by_symbol(ticker),
                         "yearly_revenue_change": revenue_changes['yearly_revenue_change'],
                         "sector": fundamentals.get('sector'),
                         "industry": fundamentals.get('industry'),
@@ -546,62 +687,37 @@ def get_data_for_account(account_name, force_refresh=False):
                     print(f"ticker: {ticker}, error: {e}")
                     pp.pprint(fundamentals)
 
+        phases.lap('options')
+
         # Add cash as a position
-        all_positions_data.append({
-            "type": "cash", "ticker": "USD Cash", "quantity": 1,
-            "marketValue": cash, "avgCost": cash, "latest_price": 1.0, "unrealizedPnl": 0, "returnPct": 0,
-            "strike": None, "expiry": None, "option_type": None,
-            "earnedPremium": 0.0,
-            "name": "Cash",
-            "intraday_percent_change": 0,
-            "pe_ratio": 0,
-            "portfolio_percent": (cash/total_equity)*100,
-            "high_52_weeks": 0,
-            "low_52_weeks": 0,
-            "position_52_week": 0,
-            "side": 'long',
-            "one_week_change": 0,
-            "one_month_change": 0,
-            "three_month_change": 0,
-            "one_year_change": 0,
-            "yearly_revenue_change": 0,
+        position_rows.append({
+            "type": "cash", "ticker": "USD Cash", "quantity": 1, "marketValue": cash,
+            "avgCost": cash, "latest_price": 1.0, "earnedPremium": 0.0, "name": "Cash"
         })
 
         # Add crypto as a position if there is any
         if crypto_equity > 0:
-            all_positions_data.append({
-                "type": "crypto", "ticker": "Cryptocurrency", "quantity": 1,
-                "marketValue": crypto_equity, "avgCost": crypto_equity, "latest_price": crypto_equity, "unrealizedPnl": 0, "returnPct": 0,
-                "strike": None, "expiry": None, "option_type": None,
-                "earnedPremium": 0.0,
-                "name": "Cryptocurrency",
-                "intraday_percent_change": 0,
-                "pe_ratio": 0,
-                "portfolio_percent": (crypto_equity/total_equity)*100,
-                "high_52_weeks": 0,
-                "low_52_weeks": 0,
-                "position_52_week": 0,
-                "side": 'long',
-                "one_week_change": 0,
-                "one_month_change": 0,
-                "three_month_change": 0,
-                "one_year_change": 0,
-                "yearly_revenue_change": 0,
-                "sector": "Cryptocurrency",
-                "industry": "Digital Assets",
+            position_rows.append({
+                "type": "crypto", "ticker": "Cryptocurrency", "quantity": 1, "marketValue": crypto_equity,
+                "avgCost": crypto_equity, "latest_price": crypto_equity, "earnedPremium": 0.0,
+                "name": "Cryptocurrency", "sector": "Cryptocurrency", "industry": "Digital Assets"
             })
 
-        if float(portfolio['adjusted_portfolio_equity_previous_close']) == 0:
+        # Greeks for all option legs in one batch (IV from each leg's mark)
+        positions_frame = build_account_frame(
+            position_rows, total_equity,
+            now=datetime.now(pytz.utc), risk_free_rate=config['greeks']['risk_free_rate']
+        )
+        total_pnl, total_tickers = summarize_account_frame(positions_frame)
+        account_theta = theta_by_ticker(positions_frame)
+        index_screener_rows(positions_frame)
+
+        if previous_close_equity == 0:
             change_today_abs = 0.0
             change_today_pct = 0.0
         else:
-            change_today_abs = total_equity - float(portfolio['adjusted_portfolio_equity_previous_close']) - crypto_equity
-            change_today_pct = (change_today_abs / float(portfolio['adjusted_portfolio_equity_previous_close'])) * 100
-
-        # 4. Calculate unique tickers
-        # Exclude 'USD Cash' and 'Cryptocurrency' from the count
-        unique_tickers = set(pos['ticker'] for pos in all_positions_data if pos['ticker'] not in ['USD Cash', 'Cryptocurrency'])
-        total_tickers = len(unique_tickers)
+            change_today_abs = total_equity - previous_close_equity - crypto_equity
+            change_today_pct = (change_today_abs / previous_close_equity) * 100
 
         summary = {
             "totalEquity": total_equity,
@@ -609,7 +725,9 @@ def get_data_for_account(account_name, force_refresh=False):
             "changeTodayPct": change_today_pct,
             "totalPnl": total_pnl,
             "totalTickers": total_tickers,
-            "earnedPremium": total_earned_premium
+            "earnedPremium": total_earned_premium,
+            "totalTheta": sum(account_theta.values()),
+            "thetaByTicker": account_theta
         }
 
         # --- Save the fresh data to cache before returning ---
@@ -617,11 +735,12 @@ def get_data_for_account(account_name, force_refresh=False):
             "timestamp": datetime.now().isoformat(),
             "data": {
                 "summary": summary,
-                "positions": all_positions_data
+                "positions": frame_to_positions(positions_frame)
             }
         }
-        with open(portfolio_cache_file, 'w') as f:
-            json.dump(data_to_cache, f, indent=2)
+        write_json(portfolio_cache_file if include_analytics else core_cache_file, data_to_cache)
+        record_equity_history(account_name, summary, data_to_cache['data']['positions'])
+        phases.lap('summary_and_save')
 
         response_data = data_to_cache.get("data", {})
         response_data['timestamp'] = data_to_cache.get("timestamp")
@@ -633,14 +752,20 @@ def get_data_for_account(account_name, force_refresh=False):
         traceback.print_exc()
         return {"error": f"An internal error occurred. Check the backend console for details. Error: {e}"}, 500
 
-def get_data_for_all_accounts(force_refresh=False):
+def get_data_for_all_accounts(force_refresh=False, include_analytics=True):
     """
     Fetches and combines portfolio data from all accounts.
     Returns aggregated summary and combined positions with account labels.
     """
+    with portfolio_refresh_locks.lock(refresh_lock_key('ALL', include_analytics)):
+        return _get_data_for_all_accounts(force_refresh, include_analytics)
+
+def _get_data_for_all_accounts(force_refresh, include_analytics):
     cache_dir = os.path.join(config['cache']['cache_directory'], 'ALL')
     os.makedirs(cache_dir, exist_ok=True)
     portfolio_cache_file = os.path.join(cache_dir, 'portfolio_data.json')
+    core_cache_file = os.path.join(cache_dir, 'portfolio_core.json')
+    cache_files = [portfolio_cache_file] if include_analytics else [portfolio_cache_file, core_cache_file]
 
     # Determine cache duration based on market hours
     if is_market_hours():
@@ -649,20 +774,23 @@ def get_data_for_all_accounts(force_refresh=False):
         CACHE_DURATION_SECONDS = config['cache']['after_hours_duration_seconds']
 
     # Check for cached data first
-    if not force_refresh and os.path.exists(portfolio_cache_file):
-        with open(portfolio_cache_file, 'r') as f:
+    for cache_file in cache_files:
+        if not force_refresh and os.path.exists(cache_file):
             try:
-                cached_data = json.load(f)
+                cached_data = read_portfolio_cache(cache_file)
                 last_fetched_time = datetime.fromisoformat(cached_data.get("timestamp"))
-                if (datetime.now() - last_fetched_time).total_seconds() < CACHE_DURATION_SECONDS:
+                if (datetime.now() - last_fetched_time).total_seconds() < CACHE_DURATION_SECONDS or not robinhood_session.is_ready():
                     print(f"Serving cached portfolio data for ALL accounts.")
-                    response_data = cached_data.get("data", {})
+                    perf.record_cache('portfolio_all', os.path.basename(cache_file).replace('.json', ''), 'hit')
+                    response_data = dict(cached_data.get("data", {}))
                     response_data['timestamp'] = cached_data.get("timestamp")
                     return response_data, 200
             except (json.JSONDecodeError, KeyError, TypeError) as e:
-                print(f"Warning: Could not read cache file {portfolio_cache_file}. Refetching. Error: {e}")
+                print(f"Warning: Could not read cache file {cache_file}. Refetching. Error: {e}")
 
     print(f"Fetching fresh portfolio data for ALL accounts.")
+    perf.record_cache('portfolio_all', os.path.basename(cache_files[-1]).replace('.json', ''), 'miss')
+    phases = perf.stopwatch('get_data_for_all_accounts')
 
     try:
         # Fetch data for all accounts
@@ -670,95 +798,19 @@ def get_data_for_all_accounts(force_refresh=False):
         all_accounts_data = {}
 
         for account_name in account_names:
-            data, status_code = get_data_for_account(account_name, force_refresh=force_refresh)
+            data, status_code = get_data_for_account(account_name, force_refresh=force_refresh, include_analytics=include_analytics)
             if status_code == 200:
                 all_accounts_data[account_name] = data
             else:
                 print(f"Warning: Failed to fetch data for {account_name}")
 
-        # Combine positions from all accounts
-        combined_positions = []
-        for account_name, account_data in all_accounts_data.items():
-            for position in account_data.get('positions', []):
-                # Add account field to each position
-                position_with_account = {**position, 'account': account_name}
-                combined_positions.append(position_with_account)
-
-        # Merge stock and cash positions with same ticker across accounts
-        merged_positions = {}
-        for position in combined_positions:
-            ticker = position.get('ticker')
-            position_type = position.get('type', 'stock')
-
-            # Only merge stocks and cash - don't merge options
-            if position_type == 'option' or not ticker:
-                # Don't merge options - keep them separate per account
-                # Create unique key for non-mergeable positions
-                account = position.get('account')
-                key = f"{ticker}-{position.get('expiry')}-{position.get('strike')}-{position.get('option_type')}-{account}"
-                merged_positions[key] = position
-                continue
-
-            # Merge stocks and cash with same ticker
-            if ticker not in merged_positions:
-                # First occurrence of this ticker - initialize with accounts as list
-                merged_positions[ticker] = {**position, 'account': [position.get('account')]}
-            else:
-                # Merge this position with existing
-                existing = merged_positions[ticker]
-
-                # Add account to list if not already there
-                if isinstance(existing['account'], list):
-                    if position.get('account') not in existing['account']:
-                        existing['account'].append(position.get('account'))
-                else:
-                    existing['account'] = [existing['account'], position.get('account')]
-
-                # Merge quantities
-                existing_qty = existing.get('quantity', 0)
-                new_qty = position.get('quantity', 0)
-                total_qty = existing_qty + new_qty
+        phases.lap('accounts')
 
-                # Calculate weighted average cost
-                existing_cost = existing.get('avgCost', 0)
-                new_cost = position.get('avgCost', 0)
-                weighted_avg_cost = ((existing_qty * existing_cost) + (new_qty * new_cost)) / total_qty if total_qty > 0 else 0
-
-                # Sum market values
-                existing['marketValue'] = existing.get('marketValue', 0) + position.get('marketValue', 0)
-
-                # Sum unrealized P/L
-                existing['unrealizedPnl'] = existing.get('unrealizedPnl', 0) + position.get('unrealizedPnl', 0)
-
-                # Update quantity and avg cost
-                existing['quantity'] = total_qty
-                existing['avgCost'] = weighted_avg_cost
-
-                # Recalculate return percentage
-                total_cost = total_qty * weighted_avg_cost
-                existing['returnPct'] = (existing['unrealizedPnl'] / total_cost * 100) if total_cost > 0 else 0
-
-                # Latest price should be same, but take the most recent one just in case
-                existing['latest_price'] = position.get('latest_price', existing.get('latest_price'))
-
-                # Portfolio percent will be recalculated later based on total equity
-                # For other fields like intraday_percent_change, take the value (should be same for same ticker)
-                existing['intraday_percent_change'] = position.get('intraday_percent_change', existing.get('intraday_percent_change'))
-
-                # Preserve historical metrics (ticker-based, not account-based, so take from any position)
-                for metric_key in ['current_rsi', 'current_ps', 'ps_12m_max', 'ps_12m_min', 'pe_12m_max', 'pe_12m_min']:
-                    if metric_key not in existing or existing.get(metric_key) is None:
-                        existing[metric_key] = position.get(metric_key)
-
-        # Convert merged_positions dict back to list
-        combined_positions = list(merged_positions.values())
-
-        # Recalculate portfolio_percent for all positions based on total equity
-        # First calculate total equity for percentage calculation
-        total_equity_for_pct = sum(pos.get('marketValue', 0) for pos in combined_positions)
-        for position in combined_positions:
-            if total_equity_for_pct > 0:
-                position['portfolio_percent'] = (position.get('marketValue', 0) / total_equity_for_pct) * 100
+        # Merge stock, cash and crypto rows with the same ticker across accounts (options stay per account)
+        combined_positions = merge_account_positions({
+            account_name: account_data.get('positions', [])
+            for account_name, account_data in all_accounts_data.items()
+        })
 
         # Calculate combined summary metrics
         total_equity = sum(data.get('summary', {}).get('totalEquity', 0) for data in all_accounts_data.values())
@@ -774,12 +826,8 @@ def get_data_for_all_accounts(force_refresh=False):
         change_today_pct = (total_change_today_abs / total_previous_equity * 100) if total_previous_equity != 0 else 0
 
         # Calculate unique tickers across all accounts
-        all_tickers = set()
-        for position in combined_positions:
-            ticker = position.get('ticker')
-            if ticker and ticker not in ['USD Cash', 'Cryptocurrency']:
-                all_tickers.add(ticker)
-        total_tickers = len(all_tickers)
+        total_tickers = count_position_tickers(combined_positions)
+        all_theta = position_theta_by_ticker(combined_positions)
 
         summary = {
             "totalEquity": total_equity,
@@ -787,9 +835,17 @@ def get_data_for_all_accounts(force_refresh=False):
             "changeTodayPct": change_today_pct,
             "totalPnl": total_pnl,
             "totalTickers": total_tickers,
-            "earnedPremium": total_earned_premium
+            "earnedPremium": total_earned_premium,
+            "totalTheta": sum(all_theta.values()),
+            "thetaByTicker": all_theta,
+            "thetaByAccount": {
+                account_name: data.get('summary', {}).get('totalTheta', 0)
+                for account_name, data in all_accounts_data.items()
+            }
         }
 
+        phases.lap('merge')
+
         # Save to cache
         data_to_cache = {
             "timestamp": datetime.now().isoformat(),
@@ -798,8 +854,9 @@ def get_data_for_all_accounts(force_refresh=False):
                 "positions": combined_positions
             }
         }
-        with open(portfolio_cache_file, 'w') as f:
-            json.dump(data_to_cache, f, indent=2)
+        write_json(portfolio_cache_file if include_analytics else core_cache_file, data_to_cache)
+        record_equity_history('ALL', summary, combined_positions)
+        phases.lap('summary_and_save')
 
         response_data = data_to_cache.get("data", {})
         response_data['timestamp'] = data_to_cache.get("timestamp")
@@ -814,17 +871,115 @@ def get_data_for_all_accounts(force_refresh=False):
 
 @app.route('/api/portfolio/<string:account_name>', methods=['GET'])
 def get_portfolio(account_name):
-    """API endpoint to get portfolio data."""
+    """
+    API endpoint to get portfolio data.
+    Every response carries a snapshot `version`. Pass `?since=<version>` to get
+    only the changes since that version; full responses support ETag/If-None-Match.
+    """
     # Check for the 'force' query parameter
     force_refresh = request.args.get('force', 'false').lower() == 'true'
+    since_version = request.args.get('since')
+    # `?fields=core` skips the yfinance analytics columns; fetch them from /analytics
+    include_analytics = request.args.get('fields', 'all').lower() != 'core'
 
     # Special handling for "ALL" account type
     if account_name.upper() == 'ALL':
-        data, status_code = get_data_for_all_accounts(force_refresh=force_refresh)
+        account_key = 'ALL'
+        data, status_code = get_data_for_all_accounts(force_refresh=force_refresh, include_analytics=include_analytics)
+    else:
+        account_key = account_name
+        data, status_code = get_data_for_account(account_name, force_refresh=force_refresh, include_analytics=include_analytics)
+
+    if status_code != 200:
+        return jsonify(data), status_code
+
+    if not include_analytics:
+        # Start computing the enrichment columns while the client renders the core data
+        analytics_worker.request(get_stock_tickers(data['positions']))
+        account_key = f"{account_key}:core"
+
+    snapshot = portfolio_snapshots.record(account_key, data, get_position_id)
+    portfolio_stream.publish(account_key)
+
+    # Delta response if the client's base version is still retained
+    if since_version is not None:
+        patch = portfolio_snapshots.diff(account_key, since_version)
+        if patch is not None:
+            return jsonify(patch), 200
+
+    response = make_response(jsonify({
+        **data,
+        'full': True,
+        'version': snapshot['version'],
+        'position_ids': list(snapshot['positions'].keys())
+    }), 200)
+    response.set_etag(f"{account_key}-{snapshot['version']}")
+    return response.make_conditional(request)
+
+def get_stock_tickers(positions):
+    """Unique tickers of stock and option positions (no cash or crypto rows)"""
+    return sorted({pos['ticker'] for pos in positions if pos.get('ticker') and pos.get('type') in ('stock', 'option')})
+
+@app.route('/api/portfolio/<string:account_name>/analytics', methods=['GET'])
+def get_portfolio_analytics(account_name):
+    """
+    Analytics columns (ANALYTICS_FIELDS) for an account's tickers, computed in the background.
+    Returns {"ready": {ticker: fields}, "pending": [tickers]}; poll until `pending` is empty.
+    Optional `?tickers=AAPL,MSFT` restricts the tickers.
+    """
+    tickers_param = request.args.get('tickers')
+    if tickers_param:
+        tickers = sorted({t for t in tickers_param.split(',') if t})
+    else:
+        if account_name.upper() == 'ALL':
+            data, status_code = get_data_for_all_accounts(include_analytics=False)
+        else:
+            data, status_code = get_data_for_account(account_name, include_analytics=False)
+        if status_code != 200:
+            return jsonify(data), status_code
+        tickers = get_stock_tickers(data['positions'])
+
+    return jsonify(analytics_worker.status(tickers)), 200
+
+# --- Live Portfolio Stream (Server-Sent Events) ---
+def refresh_portfolio_snapshot(account_key):
+    """Refresh an account's portfolio (served from cache when fresh) and record the snapshot"""
+    if account_key == 'ALL':
+        data, status_code = get_data_for_all_accounts()
     else:
-        data, status_code = get_data_for_account(account_name, force_refresh=force_refresh)
+        data, status_code = get_data_for_account(account_key)
+    if status_code == 200:
+        portfolio_snapshots.record(account_key, data, get_position_id)
+
+def get_stream_poll_interval():
+    if is_market_hours():
+        return config['stream']['market_hours_poll_seconds']
+    return config['stream']['after_hours_poll_seconds']
+
+portfolio_stream = PortfolioStreamHub(
+    portfolio_snapshots,
+    lambda account_key: upstream.run_in_background(refresh_portfolio_snapshot, account_key),
+    get_stream_poll_interval,
+    heartbeat_seconds=config['stream']['heartbeat_seconds']
+)
 
-    return jsonify(data), status_code
+@app.route('/api/stream/portfolio/<string:account_name>', methods=['GET'])
+def stream_portfolio(account_name):
+    """
+    Server-Sent Events stream of portfolio updates.
+    Sends a `snapshot` event first, then `patch` events (same format as
+    /api/portfolio?since=...) whenever a new snapshot version is recorded.
+    Optional `?tickers=AAPL,MSFT` limits the positions streamed.
+    """
+    account_key = 'ALL' if account_name.upper() == 'ALL' else account_name
+    tickers_param = request.args.get('tickers')
+    tickers = [t for t in tickers_param.split(',') if t] if tickers_param else None
+
+    return Response(
+        portfolio_stream.stream(account_key, tickers),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/accounts', methods=['GET'])
 def get_accounts():
@@ -863,24 +1018,25 @@ def update_global_note():
     notes_path = os.path.join(notes_dir, 'global_notes.json')
     notes = {}
 
-    if os.path.exists(notes_path):
-        with open(notes_path, 'r') as f:
-            try:
-                notes = json.load(f)
-            except json.JSONDecodeError:
-                print(f"Warning: Could not decode JSON from {notes_path}. Starting fresh.")
+    # Hold the file lock across read-modify-write so concurrent edits aren't lost
+    with json_file_lock(notes_path):
+        if os.path.exists(notes_path):
+            with open(notes_path, 'r') as f:
+                try:
+                    notes = json.load(f)
+                except json.JSONDecodeError:
+                    print(f"Warning: Could not decode JSON from {notes_path}. Starting fresh.")
 
-    ticker = data['ticker']
-    if ticker not in notes:
-        notes[ticker] = {"note": "", "comment": ""}
+        ticker = data['ticker']
+        if ticker not in notes:
+            notes[ticker] = {"note": "", "comment": ""}
 
-    if 'note' in data:
-        notes[ticker]['note'] = data['note']
-    if 'comment' in data:
-        notes[ticker]['comment'] = data['comment']
+        if 'note' in data:
+            notes[ticker]['note'] = data['note']
+        if 'comment' in data:
+            notes[ticker]['comment'] = data['comment']
 
-    with open(notes_path, 'w') as f:
-        json.dump(notes, f, indent=2)
+        write_json(notes_path, notes, indent=True)
     return jsonify({"success": True, **data})
 
 # Legacy endpoints for backward compatibility (these just call the global endpoints)
@@ -904,6 +1060,10 @@ def get_orders(account_name):
         if not account_number:
             return jsonify({"error": "Account not found"}), 404
 
+        session_error = require_robinhood_session()
+        if session_error:
+            return jsonify(session_error[0]), session_error[1]
+
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
 
@@ -1007,8 +1167,7 @@ def save_account_groups(account_name, groups_data):
     """Save groups configuration for an account"""
     groups_file = get_groups_file_path(account_name)
     try:
-        with open(groups_file, 'w') as f:
-            json.dump(groups_data, f, indent=2)
+        write_json(groups_file, groups_data, indent=True)
         return True
     except Exception as e:
         print(f"Error saving groups for {account_name}: {e}")
@@ -1016,13 +1175,9 @@ def save_account_groups(account_name, groups_data):
 
 def calculate_group_metrics(positions, group_position_ids):
     """Calculate metrics for a group of positions"""
-    group_positions = []
-
+    group_position_ids = set(group_position_ids)
     # Find positions that belong to this group
-    for pos in positions:
-        position_id = get_position_id(pos)
-        if position_id in group_position_ids:
-            group_positions.append(pos)
+    group_positions = [pos for pos in positions if get_position_id(pos) in group_position_ids]
 
     if not group_positions:
         return {
@@ -1035,28 +1190,28 @@ def calculate_group_metrics(positions, group_position_ids):
         }
 
     # Calculate totals
-    total_market_value = sum(pos.get('marketValue', 0) for pos in group_positions)
-    total_pnl = sum(pos.get('unrealizedPnl', 0) for pos in group_positions)
-    total_cost = sum(pos.get('quantity', 0) * pos.get('avgCost', 0) for pos in group_positions if pos.get('type') != 'cash')
+    total_market_value = sum(pos.marketValue or 0 for pos in group_positions)
+    total_pnl = sum(pos.unrealizedPnl or 0 for pos in group_positions)
+    total_cost = sum((pos.quantity or 0) * (pos.avgCost or 0) for pos in group_positions if pos.type != 'cash')
 
     # Calculate weighted return percentage
     total_return_pct = (total_pnl / total_cost * 100) if total_cost > 0 else 0
 
     # Calculate day change (using intraday change)
     day_change_abs = sum(
-        pos.get('marketValue', 0) * pos.get('intraday_percent_change', 0) / 100
-        for pos in group_positions if pos.get('type') != 'cash'
+        (pos.marketValue or 0) * (pos.intraday_percent_change or 0) / 100
+        for pos in group_positions if pos.type != 'cash'
     )
 
     # Sector breakdown
     sectors = {}
     for pos in group_positions:
-        if pos.get('sector') and pos.get('type') != 'cash':
-            sector = pos['sector']
+        if pos.sector and pos.type != 'cash':
+            sector = pos.sector
             if sector not in sectors:
                 sectors[sector] = {"count": 0, "value": 0}
             sectors[sector]["count"] += 1
-            sectors[sector]["value"] += pos.get('marketValue', 0)
+            sectors[sector]["value"] += pos.marketValue or 0
 
     return {
         "total_market_value": total_market_value,
@@ -1068,28 +1223,22 @@ def calculate_group_metrics(positions, group_position_ids):
     }
 
 def get_position_id(position):
-    """Generate a unique ID for a position"""
-    # For ALL page, account can be either a string or an array (for merged positions)
-    account = position.get('account', '')
-
-    # Determine the base ID based on position type
-    if position.get('type') == 'option':
-        base_id = f"{position['ticker']}-{position.get('expiry', '')}-{position.get('strike', '')}-{position.get('option_type', '')}"
-    elif position.get('type') == 'cash':
-        base_id = position.get('ticker', '')
-    else:
-        # Stock position
-        base_id = position.get('ticker', '')
-
-    # For merged positions (account is an array), use just the base_id
-    if isinstance(account, list):
-        return base_id
-
-    # For non-merged positions (account is a string), append account to make ID unique
-    if account and isinstance(account, str):
-        return f"{base_id}-{account}"
-
-    return base_id
+    """
+    Unique ID of a position: ticker (plus expiry, strike and type for options),
+    suffixed with the account unless it is a merged row of the ALL page.
+    Precomputed on Position objects.
+    """
+    if not isinstance(position, Position):
+        position = Position.from_dict(position)
+    return position.id
+
+def with_groups_file_lock(func):
+    """Hold the account's groups file lock for a whole load-modify-save request"""
+    @wraps(func)
+    def wrapper(account_name, *args, **kwargs):
+        with json_file_lock(get_groups_file_path(account_name)):
+            return func(account_name, *args, **kwargs)
+    return wrapper
 
 # --- Groups API Endpoints ---
 @app.route('/api/groups/<string:account_name>', methods=['GET'])
@@ -1102,6 +1251,7 @@ def get_groups(account_name):
         return jsonify({"error": f"Failed to load groups: {str(e)}"}), 500
 
 @app.route('/api/groups/<string:account_name>', methods=['POST'])
+@with_groups_file_lock
 def create_group(account_name):
     """Create a new group"""
     try:
@@ -1137,6 +1287,7 @@ def create_group(account_name):
         return jsonify({"error": f"Failed to create group: {str(e)}"}), 500
 
 @app.route('/api/groups/<string:account_name>/<string:group_id>', methods=['PUT'])
+@with_groups_file_lock
 def update_group(account_name, group_id):
     """Update group properties"""
     try:
@@ -1168,6 +1319,7 @@ def update_group(account_name, group_id):
         return jsonify({"error": f"Failed to update group: {str(e)}"}), 500
 
 @app.route('/api/groups/<string:account_name>/<string:group_id>', methods=['DELETE'])
+@with_groups_file_lock
 def delete_group(account_name, group_id):
     """Delete a group and move its positions to ungrouped"""
     try:
@@ -1195,6 +1347,7 @@ def delete_group(account_name, group_id):
         return jsonify({"error": f"Failed to delete group: {str(e)}"}), 500
 
 @app.route('/api/groups/<string:account_name>/assign', methods=['POST'])
+@with_groups_file_lock
 def assign_position_to_group(account_name):
     """Move a position to a group or ungrouped"""
     try:
@@ -1270,6 +1423,243 @@ def get_group_metrics(account_name):
     except Exception as e:
         return jsonify({"error": f"Failed to calculate group metrics: {str(e)}"}), 500
 
+# --- Portfolio Analytics Endpoints (risk, realized P/L, premium, equity history, screener) ---
+def load_close_series(ticker):
+    """Daily closes from the historical cache (any age: old closes don't change), or None"""
+    cache_file = get_historical_cache_file(ticker)
+    try:
+        price_data = read_json(cache_file)['data']['price_data']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return {point['date']: point['price'] for point in price_data}
+
+@app.route('/api/risk/<string:account_name>', methods=['GET'])
+def get_portfolio_risk(account_name):
+    """
+    Correlation matrix, beta against the benchmark (SPY) and historical one-day
+    VaR / CVaR for the portfolio and each group, from the cached daily closes.
+    Results are cached per portfolio snapshot version and group layout.
+    Optional `?confidence=0.99&window=126` (trading days).
+    """
+    risk_config = config['risk']
+    confidence = request.args.get('confidence', risk_config['confidence'], type=float)
+    window = request.args.get('window', risk_config['window_days'], type=int)
+    if not 0 < confidence < 1 or window < 2:
+        return jsonify({"error": "confidence must be in (0, 1) and window at least 2"}), 400
+
+    if account_name.upper() == 'ALL':
+        account_key = 'ALL'
+        data, status_code = get_data_for_all_accounts()
+    else:
+        account_key = account_name
+        data, status_code = get_data_for_account(account_name)
+    if status_code != 200:
+        return jsonify(data), status_code
+
+    snapshot = portfolio_snapshots.record(account_key, data, get_position_id)
+    groups = {
+        group_id: sorted(group.get('positions', []))
+        for group_id, group in load_account_groups(account_name)['groups'].items()
+    }
+    cache_key = (account_key, snapshot['version'], confidence, window,
+                 tuple((group_id, tuple(ids)) for group_id, ids in sorted(groups.items())))
+    result = risk_cache.get(cache_key)
+    if result is not None:
+        perf.record_cache('risk', account_key, 'hit')
+        return jsonify({**result, 'version': snapshot['version']}), 200
+    perf.record_cache('risk', account_key, 'miss')
+
+    with perf.timed('analytics', 'portfolio_risk'):
+        benchmark = risk_config['benchmark']
+        exposures = position_exposures(data['positions'])
+        series = {}
+        missing = []
+        for ticker in sorted({ticker for ticker, _ in exposures.values()} | {benchmark}):
+            closes = load_close_series(ticker)
+            if closes is None and ticker == benchmark:
+                # The benchmark isn't a holding, so nothing else fetches its history
+                load_historical_data(benchmark)
+                closes = load_close_series(ticker)
+            if closes:
+                series[ticker] = closes
+            else:
+                missing.append(ticker)
+
+        if benchmark not in series:
+            return jsonify({"error": f"No historical data for benchmark {benchmark}"}), 503
+
+        result = compute_risk(close_matrix(series, benchmark, window), benchmark, exposures, groups, confidence)
+        # Held tickers without cached closes: fill them via /api/fetch-all-historical
+        result['missing_history'] = missing
+
+    risk_cache.put(cache_key, result)
+    return jsonify({**result, 'version': snapshot['version']}), 200
+
+@app.route('/api/realized/<string:account_name>', methods=['GET'])
+def get_realized_pnl(account_name):
+    """
+    Realized P/L from the incrementally maintained tax lots.
+    Query parameters:
+      year   - e.g. 2025: that year's total and per-ticker breakdown
+      ticker - that ticker's realized P/L and open lots
+      force  - `true` to fetch new orders even if synced recently
+    """
+    try:
+        with open("robinhood_secrets.json") as f:
+            accounts_map = json.load(f)["ACCOUNTS"]
+    except Exception as e:
+        print(f"ERROR in get_realized_pnl for account '{account_name}': {e}")
+        return jsonify({"error": f"An internal error occurred. Check backend console. Error: {e}"}), 500
+    if account_name == 'ALL':
+        accounts = dict(accounts_map)
+    elif account_name in accounts_map:
+        accounts = {account_name: accounts_map[account_name]}
+    else:
+        return jsonify({"error": "Account not found"}), 404
+
+    year = request.args.get('year')
+    ticker = request.args.get('ticker', '').upper() or None
+    force = request.args.get('force', 'false').lower() == 'true'
+    summaries = {
+        name: sync_tax_lots(name, number, force=force).summary(year=year, ticker=ticker)
+        for name, number in accounts.items()
+    }
+    if account_name != 'ALL':
+        return jsonify({'account': account_name, **summaries[account_name]}), 200
+
+    years = sorted({y for summary in summaries.values() for y in summary['years']})
+    result = {
+        'account': 'ALL',
+        'total': merge_buckets(summary['total'] for summary in summaries.values()),
+        'years': {y: merge_buckets(summary['years'].get(y, {}) for summary in summaries.values()) for y in years},
+        'accounts': summaries
+    }
+    if year or ticker:
+        result['realized'] = merge_buckets(summary['realized'] for summary in summaries.values())
+    return jsonify(result), 200
+
+@app.route('/api/premium/<string:account_name>', methods=['GET'])
+def get_premium_rollups(account_name):
+    """
+    Earned option premium over time from the maintained rollups (no order re-scan).
+    Query parameters:
+      bucket     - day, week or month (default month)
+      start, end - ISO dates bounding the series
+      orders     - `true` to include the per-order records (optionally `ticker`-filtered)
+    """
+    bucket = request.args.get('bucket', 'month')
+    if bucket not in ROLLUP_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {', '.join(ROLLUP_BUCKETS)}"}), 400
+    start, end = request.args.get('start'), request.args.get('end')
+
+    try:
+        with open("robinhood_secrets.json") as f:
+            accounts_map = json.load(f)["ACCOUNTS"]
+    except Exception as e:
+        print(f"ERROR in get_premium_rollups for account '{account_name}': {e}")
+        return jsonify({"error": f"An internal error occurred. Check backend console. Error: {e}"}), 500
+    if account_name == 'ALL':
+        account_names = list(accounts_map)
+    elif account_name in accounts_map:
+        account_names = [account_name]
+    else:
+        return jsonify({"error": "Account not found"}), 404
+
+    ledgers = {name: load_premium_ledger(name) for name in account_names}
+    by_ticker = defaultdict(float)
+    by_strategy = {}
+    for ledger in ledgers.values():
+        for ticker, premium in ledger.state['rollups']['ticker'].items():
+            by_ticker[ticker] += premium
+        for strategy, stats in ledger.state['rollups']['strategy'].items():
+            merged = by_strategy.setdefault(strategy, {'premium': 0.0, 'orders': 0, 'eligible_orders': 0})
+            for field in merged:
+                merged[field] += stats[field]
+    by_account = {name: sum(ledger.state['rollups']['ticker'].values()) for name, ledger in ledgers.items()}
+
+    result = {
+        'account': account_name,
+        'bucket': bucket,
+        'total': sum(by_account.values()),
+        'series': merge_premium_series(ledger.series(bucket, start, end) for ledger in ledgers.values()),
+        'by_ticker': by_ticker,
+        'by_strategy': by_strategy,
+        'by_account': by_account
+    }
+    if request.args.get('orders', 'false').lower() == 'true':
+        ticker = request.args.get('ticker', '').upper() or None
+        result['orders'] = {name: ledger.orders(ticker, start, end) for name, ledger in ledgers.items()}
+    return jsonify(result), 200
+
+@app.route('/api/equity-history/<account_name>', methods=['GET'])
+def get_equity_history(account_name):
+    """
+    Equity curve recorded from portfolio refreshes.
+    Query parameters:
+      start, end  - ISO dates (YYYY-MM-DD), both optional
+      max_points  - downsample to at most this many points (LTTB on totalEquity)
+      positions   - `true` to include per-position market values where recorded
+    """
+    try:
+        for bound in ('start', 'end'):
+            if request.args.get(bound):
+                datetime.strptime(request.args[bound], '%Y-%m-%d')
+        max_points = int(request.args.get('max_points', config['equity_history']['default_max_points']))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    with perf.timed('equity_history', 'query'):
+        result = equity_history.query(
+            account_name,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            max_points=max_points,
+            include_positions=request.args.get('positions', 'false').lower() == 'true'
+        )
+    return jsonify(result), 200
+
+@app.route('/api/screener', methods=['GET'])
+def screen_tickers():
+    """
+    Screen every ticker with cached metrics, answered from the in-memory index.
+    Query parameters:
+      where  - comma separated conditions, e.g. `current_rsi<35,yearly_revenue_change>20`
+      sector, industry - exact matches
+      sort   - field to sort by, `-` prefix for descending
+      limit  - maximum rows returned (default 50)
+    """
+    started = time_module.perf_counter()
+    try:
+        conditions = parse_conditions(request.args.get('where', ''))
+        for field in ('sector', 'industry'):
+            if request.args.get(field):
+                conditions.append((field, '==', request.args[field]))
+        limit = int(request.args.get('limit', 50))
+        total, results = screener_index.query(conditions, sort=request.args.get('sort'), limit=limit)
+    except (ScreenerQueryError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "count": len(results),
+        "total": total,
+        "indexed": len(screener_index),
+        "results": results,
+        "query_us": round((time_module.perf_counter() - started) * 1e6, 1)
+    }), 200
+
+# --- Performance Instrumentation ---
+@app.route('/api/debug/perf', methods=['GET'])
+def get_perf_metrics():
+    """Latency histograms and cache hit rates. `?format=prometheus` for Prometheus text format."""
+    if request.args.get('format') == 'prometheus':
+        return Response(perf.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify({**perf.snapshot(), 'upstream_budgets': upstream.status()}), 200
+
+@app.route('/api/debug/perf/reset', methods=['POST'])
+def reset_perf_metrics():
+    perf.reset()
+    return jsonify({"success": True}), 200
+
 # --- Cleanup Endpoint ---
 @app.route('/api/cleanup-cache', methods=['POST'])
 def cleanup_cache():
@@ -1284,35 +1674,38 @@ def cleanup_cache():
 @app.route('/api/auth/login', methods=['POST'])
 def re_login():
     """Force re-login to Robinhood"""
-    try:
-        print("Starting login process...")
-        with open("robinhood_secrets.json") as f:
-            secrets = json.load(f)
-
-        r.login(
-            username=secrets["USER"],
-            password=secrets["PASSWORD"],
-            store_session=True,
-            mfa_code=secrets["MY_2FA_APP_HERE"]
-        )
-        print("Robinhood login successful.")
+    print("Starting login process...")
+    if robinhood_session.login():
         return jsonify({"success": True, "message": "Login successful"}), 200
-    except Exception as e:
-        print(f"ERROR: Robinhood login failed: {e}")
-        return jsonify({"success": False, "error": f"Login failed: {str(e)}"}), 500
+    return jsonify({"success": False, "error": f"Login failed: {robinhood_session.status()['error']}"}), 500
 
 @app.route('/api/auth/status', methods=['GET'])
 def login_status():
     """Check if logged in to Robinhood"""
+    session = robinhood_session.status()
+    if not session['ready']:
+        return jsonify({"authenticated": False, "session": session}), 200
     try:
         # Try to fetch profile info as a simple auth check
         profile = r.account.load_account_profile()
         if profile:
-            return jsonify({"authenticated": True}), 200
+            return jsonify({"authenticated": True, "session": session}), 200
         else:
-            return jsonify({"authenticated": False}), 200
+            return jsonify({"authenticated": False, "session": session}), 200
     except Exception as e:
-        return jsonify({"authenticated": False, "error": str(e)}), 200
+        return jsonify({"authenticated": False, "error": str(e), "session": session}), 200
+
+# --- Health Endpoints ---
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness: the server is accepting requests"""
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """Readiness: 200 once the Robinhood session is established, 503 while logging in or after a failure"""
+    session = robinhood_session.status()
+    return jsonify({"ready": session['ready'], "session": session}), 200 if session['ready'] else 503
 
 @app.route('/api/cache/invalidate/<string:account_name>', methods=['POST'])
 def invalidate_portfolio_cache(account_name):
@@ -1358,6 +1751,53 @@ def calculate_rsi(prices, period=14):
 
     return rsi_values
 
+EMPTY_HISTORICAL_METRICS = {
+    'current_rsi': None,
+    'current_ps': None,
+    'ps_12m_max': None,
+    'ps_12m_min': None,
+    'pe_12m_max': None,
+    'pe_12m_min': None
+}
+
+def historical_metrics_from_payload(data):
+    """Current RSI, current P/S and 12-month P/S and P/E min/max of a historical data payload"""
+    rsi_data = data.get('rsi_data', [])
+    ps_data = data.get('ps_data', [])
+    pe_data = data.get('pe_data', [])
+
+    # Calculate current values (last entry)
+    current_rsi = rsi_data[-1]['rsi'] if rsi_data else None
+    current_ps = ps_data[-1]['ps_ratio'] if ps_data else None
+
+    # Calculate 12-month min/max
+    twelve_months_ago = datetime.now() - timedelta(days=365)
+
+    # Filter P/S data for last 12 months
+    ps_12m = [
+        entry['ps_ratio'] for entry in ps_data
+        if datetime.strptime(entry['date'], '%Y-%m-%d') >= twelve_months_ago
+    ]
+    ps_12m_max = max(ps_12m) if ps_12m else None
+    ps_12m_min = min(ps_12m) if ps_12m else None
+
+    # Filter P/E data for last 12 months
+    pe_12m = [
+        entry['pe_ratio'] for entry in pe_data
+        if datetime.strptime(entry['date'], '%Y-%m-%d') >= twelve_months_ago
+    ]
+    pe_12m_max = max(pe_12m) if pe_12m else None
+    pe_12m_min = min(pe_12m) if pe_12m else None
+
+    return {
+        'current_rsi': current_rsi,
+        'current_ps': current_ps,
+        'ps_12m_max': ps_12m_max,
+        'ps_12m_min': ps_12m_min,
+        'pe_12m_max': pe_12m_max,
+        'pe_12m_min': pe_12m_min
+    }
+
 def get_historical_metrics(ticker):
     """
     Get current RSI, current P/S, and 12-month P/S and P/E min/max from cached historical data.
@@ -1370,68 +1810,27 @@ def get_historical_metrics(ticker):
         cache_file = os.path.join(cache_dir, f"{ticker.upper()}.json")
 
         if not os.path.exists(cache_file):
-            return {
-                'current_rsi': None,
-                'current_ps': None,
-                'ps_12m_max': None,
-                'ps_12m_min': None,
-                'pe_12m_max': None,
-                'pe_12m_min': None
-            }
+            return dict(EMPTY_HISTORICAL_METRICS)
 
         # Load cached data
         with open(cache_file, 'r') as f:
-            cached_data = json.load(f)
-
-        data = cached_data.get('data', {})
-        rsi_data = data.get('rsi_data', [])
-        ps_data = data.get('ps_data', [])
-        pe_data = data.get('pe_data', [])
-
-        # Calculate current values (last entry)
-        current_rsi = rsi_data[-1]['rsi'] if rsi_data else None
-        current_ps = ps_data[-1]['ps_ratio'] if ps_data else None
-
-        # Calculate 12-month min/max
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        twelve_months_ago = today - timedelta(days=365)
-
-        # Filter P/S data for last 12 months
-        ps_12m = [
-            entry['ps_ratio'] for entry in ps_data
-            if datetime.strptime(entry['date'], '%Y-%m-%d') >= twelve_months_ago
-        ]
-        ps_12m_max = max(ps_12m) if ps_12m else None
-        ps_12m_min = min(ps_12m) if ps_12m else None
-
-        # Filter P/E data for last 12 months
-        pe_12m = [
-            entry['pe_ratio'] for entry in pe_data
-            if datetime.strptime(entry['date'], '%Y-%m-%d') >= twelve_months_ago
-        ]
-        pe_12m_max = max(pe_12m) if pe_12m else None
-        pe_12m_min = min(pe_12m) if pe_12m else None
+            cached_data = load_json(f.read())
 
-        return {
-            'current_rsi': current_rsi,
-            'current_ps': current_ps,
-            'ps_12m_max': ps_12m_max,
-            'ps_12m_min': ps_12m_min,
-            'pe_12m_max': pe_12m_max,
-            'pe_12m_min': pe_12m_min
-        }
+        return historical_metrics_from_payload(cached_data.get('data', {}))
 
     except Exception as e:
         print(f"Error getting historical metrics for {ticker}: {e}")
-        return {
-            'current_rsi': None,
-            'current_ps': None,
-            'ps_12m_max': None,
-            'ps_12m_min': None,
-            'pe_12m_max': None,
-            'pe_12m_min': None
-        }
+        return dict(EMPTY_HISTORICAL_METRICS)
+
+def screener_fields_from_historical(data):
+    """Screener index fields of a historical data payload: the metrics plus last close and revenue growth"""
+    price_data = data.get('price_data', [])
+    revenue_growth_data = data.get('revenue_growth_data', [])
+    return {
+        **historical_metrics_from_payload(data),
+        'price': price_data[-1]['price'] if price_data else None,
+        'revenue_growth_yoy': revenue_growth_data[-1]['growth_pct'] if revenue_growth_data else None
+    }
 
 @app.route('/api/metrics/<string:ticker>', methods=['GET'])
 def get_ticker_metrics(ticker):
@@ -1443,35 +1842,105 @@ def get_ticker_metrics(ticker):
         print(f"Error getting metrics for {ticker}: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/historical/<string:ticker>', methods=['GET'])
-def get_historical_data(ticker):
-    """Fetch and cache 2-year historical data for a ticker"""
-    try:
-        force_refresh = request.args.get('force', 'false').lower() == 'true'
-
-        # Check cache first
-        cache_dir = os.path.join('..', 'cache', 'historical_data')
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f"{ticker.upper()}.json")
+# Series in a historical payload and the value key of each {date, value} entry
+HISTORICAL_SERIES_KEYS = {
+    'price_data': 'price',
+    'rsi_data': 'rsi',
+    'pe_data': 'pe_ratio',
+    'ps_data': 'ps_ratio',
+    'revenue_growth_data': 'growth_pct'
+}
+
+def to_columnar_historical(result):
+    """Convert each list of {date, value} objects into parallel `dates`/`values` arrays"""
+    columnar = {key: value for key, value in result.items() if key not in HISTORICAL_SERIES_KEYS}
+    columnar['format'] = 'columnar'
+    for series_key, value_key in HISTORICAL_SERIES_KEYS.items():
+        if series_key not in result:
+            continue
+        series = result[series_key]
+        columnar[series_key] = {
+            'dates': [entry['date'] for entry in series],
+            'values': [entry[value_key] for entry in series]
+        }
+    return columnar
+
+def parse_historical_shape_args(args):
+    """Read the start/end/max_points/format query parameters. Raises ValueError on malformed dates."""
+    start = args.get('start')
+    end = args.get('end')
+    for date_str in (start, end):
+        if date_str:
+            datetime.strptime(date_str, '%Y-%m-%d')
+    return {
+        'start': start,
+        'end': end,
+        'max_points': args.get('max_points', type=int),
+        'columnar': args.get('format') == 'columnar'
+    }
 
-        # Check if cache exists and is valid (less than 1 day old)
-        if not force_refresh and os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
+def shape_historical_response(result, start=None, end=None, max_points=None, columnar=False):
+    """
+    Restrict every series of a historical payload to [start, end] (ISO dates),
+    downsample each to at most max_points with LTTB, and optionally convert to columnar form.
+    """
+    if start or end or max_points:
+        shaped = dict(result)
+        for series_key, value_key in HISTORICAL_SERIES_KEYS.items():
+            if series_key not in result:
+                continue
+            series = slice_series(result[series_key], start, end)
+            shaped[series_key] = downsample_series(series, value_key, max_points)
+        result = shaped
+    if columnar:
+        return to_columnar_historical(result)
+    return result
+
+def get_historical_cache_file(ticker):
+    cache_dir = os.path.join('..', 'cache', 'historical_data')
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{ticker.upper()}.json")
 
-                cache_time = datetime.fromisoformat(cached_data.get('timestamp', ''))
-                now = datetime.now()
+def read_cached_historical(ticker):
+    """Return the cached historical payload for a ticker if it is less than 1 day old, else None"""
+    cache_file = get_historical_cache_file(ticker)
+    if not os.path.exists(cache_file):
+        perf.record_cache('historical', 'series', 'miss')
+        return None
+    try:
+        with open(cache_file, 'r') as f:
+            cached_data = load_json(f.read())
+
+        cache_time = datetime.fromisoformat(cached_data.get('timestamp', ''))
+        now = datetime.now()
+
+        # If cache is less than 1 day old, use it
+        if now - cache_time < timedelta(days=1):
+            print(f"Using cached historical data for {ticker}")
+            perf.record_cache('historical', 'series', 'hit')
+            return cached_data['data']
+    except (json.JSONDecodeError, ValueError, KeyError) as e:
+        print(f"Cache read error for {ticker}: {e}")
+    perf.record_cache('historical', 'series', 'stale')
+    return None
+
+def load_historical_data(ticker, force_refresh=False):
+    """
+    Return (payload, status_code) with 2-year historical data for a ticker,
+    served from the 1-day cache or fetched from yfinance and cached.
+    """
+    try:
+        cache_file = get_historical_cache_file(ticker)
 
-                # If cache is less than 1 day old, use it
-                if now - cache_time < timedelta(days=1):
-                    print(f"Using cached historical data for {ticker}")
-                    return jsonify(cached_data['data']), 200
-            except (json.JSONDecodeError, ValueError, KeyError) as e:
-                print(f"Cache read error for {ticker}: {e}")
+        # Check cache first
+        if not force_refresh:
+            cached = read_cached_historical(ticker)
+            if cached is not None:
+                return cached, 200
 
         # Fetch fresh data
         print(f"Fetching fresh historical data for {ticker}")
+        import yfinance
         symbol = ticker.replace('.', '-')
         yf_ticker = yfinance.Ticker(symbol)
 
@@ -1480,15 +1949,21 @@ def get_historical_data(ticker):
         start_date = end_date - timedelta(days=730)  # 2 years
 
         # Fetch price history
-        hist = yf_ticker.history(start=start_date, end=end_date)
+        with upstream.call('yfinance', 'history', ticker=ticker):
+            hist = yf_ticker.history(start=start_date, end=end_date)
 
         if hist.empty:
-            return jsonify({"error": f"No historical data found for {ticker}"}), 404
+            # Unresolvable / delisted symbol: don't ask yfinance again until the negative TTL expires
+            upstream.mark_bad('yfinance', 'history', ticker, 'no historical data')
+            return {"error": f"No historical data found for {ticker}"}, 404
 
         # Get quarterly financials for P/S and P/E
-        info = yf_ticker.info
-        quarterly_financials = yf_ticker.quarterly_financials
-        quarterly_balance_sheet = yf_ticker.quarterly_balance_sheet
+        with upstream.call('yfinance', 'info', ticker=ticker):
+            info = yf_ticker.info
+        with upstream.call('yfinance', 'quarterly_financials', ticker=ticker):
+            quarterly_financials = yf_ticker.quarterly_financials
+        with upstream.call('yfinance', 'quarterly_balance_sheet', ticker=ticker):
+            quarterly_balance_sheet = yf_ticker.quarterly_balance_sheet
 
         # Prepare price data
         price_data = []
@@ -1673,30 +2148,122 @@ def get_historical_data(ticker):
         }
 
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            write_json(cache_file, cache_data)
             print(f"Cached historical data for {ticker}")
+            screener_index.update(ticker, screener_fields_from_historical(result))
         except Exception as e:
             print(f"Error caching historical data for {ticker}: {e}")
 
-        return jsonify(result), 200
+        return result, 200
 
+    except KnownBadTicker as e:
+        return {"error": f"No historical data found for {ticker}", "detail": str(e)}, 404
+    except UpstreamUnavailable as e:
+        return {"error": str(e)}, 503
     except Exception as e:
         print(f"Error fetching historical data for {ticker}: {e}")
         traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+@app.route('/api/historical/<string:ticker>', methods=['GET'])
+def get_historical_data(ticker):
+    """
+    Fetch and cache 2-year historical data for a ticker.
+    Optional query parameters:
+      start, end  - ISO dates (YYYY-MM-DD) limiting every series
+      max_points  - downsample each series to at most this many points (LTTB)
+      format      - `columnar` for parallel date/value arrays instead of lists of objects
+    """
+    force_refresh = request.args.get('force', 'false').lower() == 'true'
+    try:
+        shape_args = parse_historical_shape_args(request.args)
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format"}), 400
+
+    result, status_code = load_historical_data(ticker, force_refresh=force_refresh)
+    if status_code != 200:
+        return jsonify(result), status_code
+    return jsonify(shape_historical_response(result, **shape_args)), 200
+
+@app.route('/api/historical/batch', methods=['GET'])
+def get_historical_batch():
+    """
+    Historical data for several tickers in one response.
+    Query parameters:
+      tickers - comma-separated symbols (required)
+      fields  - comma-separated series to include (default: all series)
+      start, end, max_points, format - as for /api/historical/<ticker>
+      stream  - `ndjson` to stream one {"ticker", "data" | "error"} line per ticker as each completes
+    Cached series are served straight from the cache; misses are fetched in parallel.
+    """
+    tickers = list(dict.fromkeys(t.strip() for t in request.args.get('tickers', '').split(',') if t.strip()))
+    if not tickers:
+        return jsonify({"error": "tickers is required"}), 400
+
+    fields_param = request.args.get('fields')
+    fields = [f for f in fields_param.split(',') if f] if fields_param else list(HISTORICAL_SERIES_KEYS)
+    unknown_fields = [f for f in fields if f not in HISTORICAL_SERIES_KEYS]
+    if unknown_fields:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown_fields)}"}), 400
+
+    try:
+        shape_args = parse_historical_shape_args(request.args)
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format"}), 400
+
+    def select(result):
+        selected = {key: value for key, value in result.items() if key not in HISTORICAL_SERIES_KEYS or key in fields}
+        return shape_historical_response(selected, **shape_args)
+
+    def iter_results():
+        """Yield (ticker, payload, status_code), cached tickers first, then misses as they complete"""
+        misses = []
+        for ticker in tickers:
+            cached = read_cached_historical(ticker)
+            if cached is not None:
+                yield ticker, cached, 200
+            else:
+                misses.append(ticker)
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=config['historical']['batch_workers']) as executor:
+                futures = {executor.submit(load_historical_data, ticker, True): ticker for ticker in misses}
+                for future in as_completed(futures):
+                    result, status_code = future.result()
+                    yield futures[future], result, status_code
+
+    if request.args.get('stream') == 'ndjson':
+        def generate():
+            for ticker, result, status_code in iter_results():
+                if status_code == 200:
+                    line = {"ticker": ticker, "data": select(result)}
+                else:
+                    line = {"ticker": ticker, "error": result.get('error'), "status": status_code}
+                yield dump_json_bytes(line) + b"\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    results = {}
+    errors = {}
+    for ticker, result, status_code in iter_results():
+        if status_code == 200:
+            results[ticker] = select(result)
+        else:
+            errors[ticker] = result.get('error')
+
+    return jsonify({"results": results, "errors": errors}), 200
 
 @app.route('/api/fetch-all-historical/<string:account_name>', methods=['POST'])
 def fetch_all_historical_data(account_name):
     """Fetch historical data for ALL positions in an account (long operation)"""
     try:
         # Get portfolio data for the account
-        portfolio_response = get_portfolio(account_name)
-        if portfolio_response[1] != 200:
+        if account_name.upper() == 'ALL':
+            portfolio_data, status_code = get_data_for_all_accounts()
+        else:
+            portfolio_data, status_code = get_data_for_account(account_name)
+        if status_code != 200:
             return jsonify({"error": f"Failed to get portfolio data for {account_name}"}), 400
 
-        portfolio_data = portfolio_response[0].json if hasattr(portfolio_response[0], 'json') else json.loads(portfolio_response[0].data)
-
         positions = portfolio_data.get('positions', [])
         if not positions:
             return jsonify({"message": "No positions found", "count": 0}), 200
@@ -1727,8 +2294,9 @@ def fetch_all_historical_data(account_name):
             try:
                 print(f"[{idx}/{total}] Fetching historical data for {ticker}...")
 
-                # Call the get_historical_data function with force=true
-                response = get_historical_data(ticker)
+                # Fetch (or serve from the 1-day cache) the historical data, as
+                # background prefetch so interactive requests keep their budget
+                response = upstream.run_in_background(load_historical_data, ticker)
 
                 if response[1] == 200:
                     results["fetched"] += 1
@@ -1772,11 +2340,59 @@ def fetch_all_historical_data(account_name):
         return jsonify({"error": str(e)}), 500
 
 # --- Run the App ---
-if __name__ == '__main__':
-    # Clean up expired cache on startup
+def sweep_expired_cache():
     print("Cleaning up expired ticker cache...")
     ticker_cache.clear_expired_cache()
 
+def build_screener_index():
+    """Initial screener index from the historical and ticker data already on disk"""
+    historical_dir = os.path.join('..', 'cache', 'historical_data')
+    ticker_dir = ticker_cache.cache_dir
+    tickers = set()
+    if os.path.isdir(historical_dir):
+        tickers.update(name[:-len('.json')] for name in os.listdir(historical_dir) if name.endswith('.json'))
+    if os.path.isdir(ticker_dir):
+        tickers.update(name for name in os.listdir(ticker_dir) if os.path.isdir(os.path.join(ticker_dir, name)))
+
+    def cached_data(path):
+        return read_json(path).get('data') if os.path.exists(path) else None
+
+    for ticker in tickers:
+        fields = {}
+        try:
+            historical = cached_data(os.path.join(historical_dir, f"{ticker}.json"))
+            if historical:
+                fields.update(screener_fields_from_historical(historical))
+            for data_type in ('price_changes', 'revenue_change'):
+                cached = cached_data(os.path.join(ticker_dir, ticker, f"{data_type}.json"))
+                if isinstance(cached, dict):
+                    fields.update(cached)
+            fundamentals = cached_data(os.path.join(ticker_dir, ticker, 'fundamentals.json'))
+            if isinstance(fundamentals, list) and fundamentals and fundamentals[0]:
+                fundamentals = fundamentals[0]
+                fields['pe_ratio'] = float(fundamentals['pe_ratio']) if fundamentals.get('pe_ratio') else None
+                fields['sector'] = fundamentals.get('sector')
+                fields['industry'] = fundamentals.get('industry')
+        except Exception as e:
+            print(f"Error indexing {ticker} for the screener: {e}")
+        if fields:
+            screener_index.update(ticker, fields)
+    print(f"Screener index built for {len(screener_index)} tickers")
+
+def start_background_startup_tasks():
+    """Kick off login, the screener index build and the cache sweep off the request path"""
+    robinhood_session.start()
+    threading.Thread(target=build_screener_index, name='screener-index', daemon=True).start()
+    sweep = threading.Timer(config['startup']['cache_sweep_delay_seconds'], sweep_expired_cache)
+    sweep.daemon = True
+    sweep.start()
+
+if __name__ == '__main__':
+    # With the debug reloader, the parent process only watches files; start
+    # background work in the process that actually serves requests
+    if not config['server']['debug'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_startup_tasks()
+
     # Load server configuration from config
     app.run(
         debug=config['server']['debug'],
@@ -0,0 +1,76 @@
+"""
+Fixtures for the portfolio pipeline benchmarks.
+
+The backend is imported from a throwaway working directory (its own config,
+secrets and ../cache) with a replay harness serving synthetic Robinhood and
+yfinance responses (synthetic_portfolio.py). Set
+BENCH_LATENCY_MS=robinhood:50,yfinance:200 to inject upstream latency per call.
+"""
+import json
+import os
+import shutil
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from replay import ReplayHarness, parse_latency_spec
+from synthetic_portfolio import SyntheticPortfolio, DEFAULT_ACCOUNTS as ACCOUNTS
+
+TICKER_CACHE_SETTINGS = {
+    "cache_settings": {
+        "fundamentals_cache_hours": 24,
+        "price_cache_minutes": 5,
+        "name_cache_hours": 168,
+        "historical_cache_hours": 24,
+        "revenue_cache_hours": 168,
+        "previous_close_cache_minutes": 60
+    }
+}
+
+@pytest.fixture(scope='session')
+def workdir(tmp_path_factory):
+    root = tmp_path_factory.mktemp('bench')
+    backend = root / 'backend'
+    backend.mkdir()
+    for name in ('config.json', 'market-config.json'):
+        shutil.copy(os.path.join(BACKEND_DIR, name), backend / name)
+    with open(backend / 'ticker_cache.json', 'w') as f:
+        json.dump(TICKER_CACHE_SETTINGS, f)
+    with open(backend / 'robinhood_secrets.json', 'w') as f:
+        json.dump({'USER': 'bench', 'PASSWORD': 'bench', 'MY_2FA_APP_HERE': '000000', 'ACCOUNTS': ACCOUNTS}, f)
+    return root
+
+@pytest.fixture(scope='session')
+def harness(workdir):
+    harness = ReplayHarness(SyntheticPortfolio(positions=10), mode='replay', latency_ms=parse_latency_spec(os.environ.get('BENCH_LATENCY_MS')))
+    harness.install()
+    yield harness
+    harness.uninstall()
+
+@pytest.fixture(scope='session')
+def backend(workdir, harness):
+    """The app module, imported inside the benchmark working directory"""
+    previous = os.getcwd()
+    os.chdir(workdir / 'backend')
+    import app
+    # Measure our own code, not the rate governor's pacing
+    app.upstream.configure({})
+    yield app
+    os.chdir(previous)
+
+@pytest.fixture(params=[10, 100, 1000], ids=lambda size: f"{size}pos")
+def portfolio_size(request, harness, backend, workdir):
+    use_portfolio(harness, workdir, positions=request.param)
+    return request.param
+
+def use_portfolio(harness, workdir, **kwargs):
+    """Serve a fresh SyntheticPortfolio(**kwargs) and start from an empty cache"""
+    harness.store = SyntheticPortfolio(**kwargs)
+    clear_cache(workdir)
+    return harness.store
+
+def clear_cache(workdir):
+    """Drop on-disk caches so each round pays for the full upstream fetch"""
+    shutil.rmtree(workdir / 'cache', ignore_errors=True)
@@ -0,0 +1,91 @@
+"""
+Benchmarks for the portfolio refresh pipeline, run offline against synthetic
+fixtures:  cd backend && python -m pytest benchmarks --benchmark-only
+"""
+import shutil
+from conftest import clear_cache, use_portfolio
+
+ROUNDS = 3
+
+def run(benchmark, func, setup=None):
+    return benchmark.pedantic(func, setup=setup, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+
+def test_get_data_for_account(benchmark, backend, workdir, portfolio_size):
+    data, status = run(
+        benchmark,
+        lambda: backend.get_data_for_account('INDIVIDUAL', force_refresh=True),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert status == 200
+    assert len([p for p in data['positions'] if p.get('type') == 'stock']) == portfolio_size
+
+def test_get_data_for_account_core(benchmark, backend, workdir, portfolio_size):
+    data, status = run(
+        benchmark,
+        lambda: backend.get_data_for_account('INDIVIDUAL', force_refresh=True, include_analytics=False),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert status == 200
+
+def test_get_data_for_all_accounts(benchmark, backend, workdir, portfolio_size):
+    data, status = run(
+        benchmark,
+        lambda: backend.get_data_for_all_accounts(force_refresh=True),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert status == 200
+
+def test_calculate_theta_premium(benchmark, backend, workdir, portfolio_size):
+    premiums = run(
+        benchmark,
+        lambda: backend.calculate_theta_premium_for_account('1001', 'INDIVIDUAL'),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert premiums
+
+def test_premium_ledger_10k_orders(benchmark, backend, harness, workdir):
+    portfolio = use_portfolio(harness, workdir, positions=200, option_orders=10000)
+    assert len(portfolio.option_order_history('1001')) == 10000
+    premiums = run(
+        benchmark,
+        lambda: backend.calculate_theta_premium_for_account('1001', 'INDIVIDUAL'),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert premiums
+
+def test_merge_all_accounts_overlapping(benchmark, backend, harness, workdir):
+    # Every ticker held in all three accounts: worst case for the ALL-accounts merge
+    use_portfolio(harness, workdir, positions=1000, overlap=1.0)
+    data, status = backend.get_data_for_all_accounts(force_refresh=True)
+    assert status == 200
+    # Per-account caches stay warm; only the ALL cache is dropped, so the merge dominates
+    data, status = run(
+        benchmark,
+        backend.get_data_for_all_accounts,
+        setup=lambda: shutil.rmtree(workdir / 'cache' / 'ALL', ignore_errors=True)
+    )
+    assert status == 200
+    assert all(len(p['account']) == 3 for p in data['positions'] if p.get('type') == 'stock')
+
+def test_calculate_group_metrics(benchmark, backend, portfolio_size):
+    data, status = backend.get_data_for_account('INDIVIDUAL', force_refresh=True)
+    positions = data['positions']
+    group_ids = {backend.get_position_id(p) for p in positions[::2]}
+    metrics = benchmark(backend.calculate_group_metrics, positions, group_ids)
+    # A long and a short leg of the same contract share an id
+    assert metrics['position_count'] == sum(1 for p in positions if backend.get_position_id(p) in group_ids)
+
+def test_historical_data_cold(benchmark, backend, harness, workdir):
+    payload, status = run(
+        benchmark,
+        lambda: backend.load_historical_data(harness.store.tickers()[0], force_refresh=True),
+        setup=lambda: clear_cache(workdir)
+    )
+    assert status == 200
+
+def test_historical_endpoint_cached(benchmark, backend, harness):
+    ticker = harness.store.tickers()[0]
+    client = backend.app.test_client()
+    client.get(f'/api/historical/{ticker}')
+    response = benchmark(client.get, f'/api/historical/{ticker}?max_points=500')
+    assert response.status_code == 200
@@ -1,6 +1,8 @@
-import json
 import os
 from functools import wraps
+from serialization import write_json
+from perf_metrics import perf
+from upstream import upstream
 
 def cache_robinhood_response(func):
     @wraps(func)
@@ -19,13 +21,14 @@ def cache_robinhood_response(func):
 
         cache_file_path = os.path.join(cache_dir, f"{sanitized_key}.json")
 
-        # Call the original function to get the data
-        data = func(*args, **kwargs)
+        # Call the original function to get the data (responses are only written, never read back)
+        perf.record_cache('robinhood_response', func.__name__, 'miss')
+        with upstream.call('robinhood', func.__name__):
+            data = func(*args, **kwargs)
 
         # Save the data to the cache
         try:
-            with open(cache_file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            write_json(cache_file_path, data)
         except Exception as e:
             print(f"Error caching response for {func.__name__}: {e}")
 
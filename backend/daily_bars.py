@@ -0,0 +1,158 @@
+import os
+import threading
+from datetime import datetime, timedelta
+import pytz
+import robin_stocks.robinhood as r
+from serialization import read_json, write_json
+from upstream import upstream
+from trading_calendar import trading_calendar
+
+# Calendar-day lookbacks of the price-change windows
+PRICE_CHANGE_WINDOWS = {
+    'one_week_change': 7,
+    'one_month_change': 30,
+    'three_month_change': 90,
+    'one_year_change': 365
+}
+
+def price_changes_from_bars(bars):
+    """
+    1W / 1M / 3M / 1Y % change from [(ISO date, close)] daily bars: the latest
+    close against the first close within each window before the latest bar.
+    """
+    if not bars:
+        return None
+    latest_day = datetime.strptime(bars[-1][0], '%Y-%m-%d')
+    new_price = bars[-1][1]
+    changes = {}
+    for field, days in PRICE_CHANGE_WINDOWS.items():
+        start = (latest_day - timedelta(days=days)).strftime('%Y-%m-%d')
+        window = [close for day, close in bars if day >= start]
+        old_price = window[0] if len(window) >= 2 else 0
+        changes[field] = ((new_price - old_price) / old_price) * 100 if old_price else 0.0
+    return changes
+
+class DailyBarStore:
+    """
+    A year of daily closes per ticker, fetched for many tickers at once with
+    robin_stocks' multi-symbol historicals (chunked) and kept until the next
+    session boundary on the trading calendar (the close if fetched during a
+    session, early closes included, else the next open), in memory and in
+    <cache_dir>/<TICKER>/daily_bars.json.
+    Previous close and the price-change windows are computed from these bars.
+    """
+    def __init__(self, cache_dir='../cache/ticker_data', batch_size=75):
+        self.cache_dir = cache_dir
+        self.batch_size = batch_size
+        self._bars = {}  # ticker -> {'bars': [(date, close)], 'expires_at': aware datetime}
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def configure(self, cache_dir=None, batch_size=None):
+        if cache_dir is not None:
+            self.cache_dir = cache_dir
+        if batch_size is not None:
+            self.batch_size = batch_size
+
+    def _cache_file(self, ticker):
+        return os.path.join(self.cache_dir, ticker.upper(), 'daily_bars.json')
+
+    def _fresh(self, ticker, now):
+        with self._lock:
+            entry = self._bars.get(ticker)
+        if entry is None:
+            cache_file = self._cache_file(ticker)
+            if not os.path.exists(cache_file):
+                return None
+            try:
+                cached = read_json(cache_file)
+                entry = {
+                    'bars': [tuple(bar) for bar in cached['data']],
+                    'expires_at': datetime.fromisoformat(cached['expires_at'])
+                }
+            except (ValueError, KeyError, TypeError):
+                return None
+            with self._lock:
+                self._bars[ticker] = entry
+        return entry if entry['expires_at'] > now else None
+
+    def _store(self, ticker, bars, now):
+        # Off-hours bars end at the last session; the next session adds one
+        expires_at = trading_calendar.next_close(now) if trading_calendar.is_open(now) else trading_calendar.next_open(now)
+        entry = {'bars': bars, 'expires_at': expires_at}
+        with self._lock:
+            self._bars[ticker] = entry
+        try:
+            os.makedirs(os.path.dirname(self._cache_file(ticker)), exist_ok=True)
+            write_json(self._cache_file(ticker), {
+                'timestamp': now.isoformat(),
+                'expires_at': entry['expires_at'].isoformat(),
+                'data': bars
+            })
+        except Exception as e:
+            print(f"Error caching daily bars for {ticker}: {e}")
+
+    def prefetch(self, tickers):
+        """Fetch bars for every ticker without fresh ones, `batch_size` symbols per call"""
+        now = datetime.now(pytz.utc)
+        tickers = list(dict.fromkeys(t.upper() for t in tickers if t))
+        missing = [ticker for ticker in tickers if self._fresh(ticker, now) is None
+                   and not upstream.known_bad('robinhood', 'daily_bars', ticker)]
+        if not missing:
+            return
+        with self._fetch_lock:
+            # Another thread may have fetched them while we waited
+            missing = [ticker for ticker in missing if self._fresh(ticker, now) is None]
+            for start in range(0, len(missing), self.batch_size):
+                chunk = missing[start:start + self.batch_size]
+                try:
+                    with upstream.call('robinhood', 'get_stock_historicals'):
+                        rows = r.get_stock_historicals(chunk, interval='day', span='year')
+                except Exception as e:
+                    print(f"Error fetching daily bars for {len(chunk)} tickers: {e}")
+                    continue
+                by_symbol = {}
+                for row in rows or []:
+                    if row and row.get('symbol') and row.get('close_price') is not None:
+                        by_symbol.setdefault(row['symbol'].upper(), []).append(
+                            (row['begins_at'][:10], float(row['close_price'])))
+                print(f"Fetched daily bars for {len(by_symbol)}/{len(chunk)} tickers in one call")
+                for ticker, bars in by_symbol.items():
+                    self._store(ticker, sorted(bars), now)
+                # Symbols the batch had no bars for: don't refetch them on every lookup
+                for ticker in set(chunk) - set(by_symbol):
+                    upstream.mark_bad('robinhood', 'daily_bars', ticker, 'no daily bars returned')
+
+    def get(self, ticker):
+        """Daily [(ISO date, close)] bars for a ticker, fetching it alone if not prefetched; None on failure"""
+        ticker = ticker.upper()
+        now = datetime.now(pytz.utc)
+        entry = self._fresh(ticker, now)
+        if entry is None:
+            self.prefetch([ticker])
+            entry = self._fresh(ticker, now)
+        return entry['bars'] if entry else None
+
+    def previous_close(self, ticker):
+        """Close of the last session before the current one (today's, or the most recent if the market is closed today)"""
+        bars = self.get(ticker)
+        if not bars:
+            return None
+        session_day = trading_calendar.session_date().isoformat()
+        for day, close in reversed(bars):
+            if day < session_day:
+                return close
+        return None
+
+    def is_expired(self, cache_file):
+        """Whether a daily_bars.json file is past its expires_at (for the cache sweep)"""
+        try:
+            return datetime.fromisoformat(read_json(cache_file)['expires_at']) <= datetime.now(pytz.utc)
+        except (OSError, ValueError, KeyError, TypeError):
+            return True
+
+    def price_changes(self, ticker):
+        return price_changes_from_bars(self.get(ticker))
+
+# Global instance
+daily_bars = DailyBarStore()
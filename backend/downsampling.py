@@ -0,0 +1,60 @@
+from datetime import date
+
+def lttb_indices(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of at most `threshold` points that preserve the visual
+    shape of the series (first and last points are always kept).
+    """
+    n = len(xs)
+    if threshold >= n or threshold <= 0:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:threshold]
+
+    indices = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0  # index of the previously selected point
+
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / next_count
+        avg_y = sum(ys[next_start:next_end]) / next_count
+
+        # Pick the point in the current bucket forming the largest triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        selected = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                selected = j
+
+        indices.append(selected)
+        a = selected
+
+    indices.append(n - 1)
+    return indices
+
+def downsample_series(series, value_key, max_points):
+    """Downsample a list of {'date': 'YYYY-MM-DD', value_key: number} entries with LTTB"""
+    if not max_points or len(series) <= max_points:
+        return series
+    xs = [date.fromisoformat(entry['date']).toordinal() for entry in series]
+    ys = [entry[value_key] for entry in series]
+    return [series[i] for i in lttb_indices(xs, ys, max_points)]
+
+def slice_series(series, start=None, end=None):
+    """Keep entries whose ISO date is within [start, end] (inclusive, either bound optional)"""
+    if not start and not end:
+        return series
+    return [
+        entry for entry in series
+        if (not start or entry['date'] >= start) and (not end or entry['date'] <= end)
+    ]
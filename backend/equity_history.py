@@ -0,0 +1,168 @@
+import os
+import threading
+from datetime import datetime
+import pytz
+from downsampling import lttb_indices
+from serialization import dump_json_bytes, load_json
+
+# Summary fields kept per snapshot, in the order they are stored on each line
+SUMMARY_FIELDS = ['totalEquity', 'changeTodayAbs', 'totalPnl', 'earnedPremium']
+
+class EquityHistory:
+    """
+    Append-only time series of portfolio summaries, partitioned by account and
+    day: <directory>/<ACCOUNT>/<YYYY-MM-DD>.jsonl with one compact line per
+    snapshot, `[epoch_seconds, totalEquity, changeTodayAbs, totalPnl,
+    earnedPremium]` plus an optional {position id: market value} map.
+
+    Closed days are also rolled up into <ACCOUNT>/daily.jsonl (the day's last
+    snapshot), so long ranges read one small file instead of every partition,
+    and reads are downsampled with LTTB to a fixed number of points.
+    """
+    def __init__(self, directory='../cache/equity_history', timezone='US/Eastern', min_interval_seconds=60,
+                 max_snapshot_days=31):
+        self.directory = directory
+        self.timezone = pytz.timezone(timezone)
+        self.min_interval_seconds = min_interval_seconds
+        self.max_snapshot_days = max_snapshot_days  # longer ranges read the daily rollup
+        self._last_append = {}  # account -> epoch seconds of the latest snapshot written
+        self._closed_days = {}  # (account, day) -> parsed points; closed partitions never change
+        self._daily = {}  # account -> {day: point}
+        self._lock = threading.Lock()
+
+    def configure(self, directory=None, timezone=None, min_interval_seconds=None, max_snapshot_days=None):
+        if directory is not None:
+            self.directory = directory
+        if timezone is not None:
+            self.timezone = pytz.timezone(timezone)
+        if min_interval_seconds is not None:
+            self.min_interval_seconds = min_interval_seconds
+        if max_snapshot_days is not None:
+            self.max_snapshot_days = max_snapshot_days
+
+    def _account_dir(self, account):
+        return os.path.join(self.directory, account)
+
+    def _day(self, timestamp):
+        return datetime.fromtimestamp(timestamp, self.timezone).date().isoformat()
+
+    def append(self, account, summary, timestamp=None, positions=None):
+        """
+        Append one snapshot. `positions` (optional) maps position id -> market value.
+        Snapshots closer than min_interval_seconds to the previous one are dropped,
+        so a core refresh followed by the full refresh is stored once.
+        """
+        timestamp = (timestamp or datetime.now(pytz.utc)).timestamp()
+        line = [round(timestamp, 3)] + [summary.get(field) for field in SUMMARY_FIELDS]
+        if positions:
+            line.append(positions)
+        with self._lock:
+            last = self._last_append.get(account)
+            if last is not None and timestamp - last < self.min_interval_seconds:
+                return False
+            self._last_append[account] = timestamp
+            os.makedirs(self._account_dir(account), exist_ok=True)
+            path = os.path.join(self._account_dir(account), f"{self._day(timestamp)}.jsonl")
+            # One write per line in append mode: concurrent writers never interleave
+            with open(path, 'ab') as f:
+                f.write(dump_json_bytes(line) + b'\n')
+        return True
+
+    def _days(self, account):
+        try:
+            names = os.listdir(self._account_dir(account))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.jsonl')] for name in names if name.endswith('.jsonl') and name != 'daily.jsonl')
+
+    def _read_lines(self, path):
+        points = []
+        try:
+            with open(path, 'rb') as f:
+                for raw in f:
+                    try:
+                        points.append(load_json(raw))
+                    except ValueError:
+                        pass  # a torn last line from a crash mid-write
+        except FileNotFoundError:
+            pass
+        return points
+
+    def _read_day(self, account, day, today):
+        if day == today:
+            return self._read_lines(os.path.join(self._account_dir(account), f"{day}.jsonl"))
+        key = (account, day)
+        points = self._closed_days.get(key)
+        if points is None:
+            points = self._read_lines(os.path.join(self._account_dir(account), f"{day}.jsonl"))
+            self._closed_days[key] = points
+        return points
+
+    def _daily_points(self, account, days, today):
+        """Last snapshot of every closed day, rolling up days not yet in daily.jsonl"""
+        daily = self._daily.get(account)
+        path = os.path.join(self._account_dir(account), 'daily.jsonl')
+        if daily is None:
+            daily = {self._day(point[0]): point for point in self._read_lines(path)}
+            self._daily[account] = daily
+        missing = [day for day in days if day < today and day not in daily]
+        if missing:
+            rolled = []
+            for day in missing:
+                points = self._read_day(account, day, today)
+                if points:
+                    daily[day] = points[-1]
+                    rolled.append(daily[day])
+            if rolled:
+                with open(path, 'ab') as f:
+                    f.write(b''.join(dump_json_bytes(point) + b'\n' for point in rolled))
+        return daily
+
+    def query(self, account, start=None, end=None, max_points=500, include_positions=False):
+        """
+        Equity curve for `account` between ISO dates `start` and `end` (inclusive,
+        either optional): a list of {'timestamp', *SUMMARY_FIELDS} dicts downsampled
+        to at most `max_points` with LTTB on totalEquity. Ranges spanning more than
+        max_snapshot_days days use one point per closed day (plus today's
+        snapshots), so the work per query stays bounded however old the history is.
+        """
+        today = datetime.now(self.timezone).date().isoformat()
+        with self._lock:
+            days = [day for day in self._days(account)
+                    if (not start or day >= start) and (not end or day <= end)]
+            if len(days) > self.max_snapshot_days:
+                daily = self._daily_points(account, days, today)
+                points = [daily[day] for day in days if day in daily]
+                if today in days:
+                    points += self._read_day(account, today, today)
+                resolution = 'daily'
+            else:
+                points = [point for day in days for point in self._read_day(account, day, today)]
+                resolution = 'snapshot'
+            # Bound the closed-day cache; today's partition is never cached
+            while len(self._closed_days) > 4 * self.max_snapshot_days:
+                self._closed_days.pop(next(iter(self._closed_days)))
+
+        if max_points and len(points) > max_points:
+            xs = [point[0] for point in points]
+            ys = [point[1] or 0.0 for point in points]
+            points = [points[i] for i in lttb_indices(xs, ys, max_points)]
+
+        series = []
+        for point in points:
+            entry = {'timestamp': datetime.fromtimestamp(point[0], pytz.utc).isoformat()}
+            entry.update(zip(SUMMARY_FIELDS, point[1:1 + len(SUMMARY_FIELDS)]))
+            if include_positions:
+                entry['positions'] = point[1 + len(SUMMARY_FIELDS)] if len(point) > 1 + len(SUMMARY_FIELDS) else {}
+            series.append(entry)
+        return {'account': account, 'resolution': resolution, 'days': len(days), 'points': series}
+
+    def accounts(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory)
+                          if os.path.isdir(os.path.join(self.directory, name)))
+        except FileNotFoundError:
+            return []
+
+# Global instance
+equity_history = EquityHistory()
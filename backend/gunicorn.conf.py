@@ -0,0 +1,17 @@
+"""gunicorn settings, read from the "production" section of config.json"""
+import json
+
+with open('config.json', 'r') as f:
+    app_config = json.load(f)
+
+production = app_config['production']
+
+bind = f"{app_config['server']['host']}:{app_config['server']['port']}"
+workers = production['workers']
+# Threaded workers: each open SSE stream (/api/stream/portfolio) holds a thread
+worker_class = 'gthread'
+threads = production['threads']
+timeout = production['timeout_seconds']
+graceful_timeout = production['timeout_seconds']
+keepalive = production['keepalive_seconds']
+accesslog = '-'
@@ -0,0 +1,61 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads in this process
+    fcntl = None
+
+class KeyedLocks:
+    """
+    One lock per key (e.g. per account), held across threads and, through a
+    lock file under `lock_dir`, across worker processes sharing the cache
+    directory. Used to make sure only one refresh of a key runs at a time;
+    waiters then find the freshly written cache.
+    """
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self._locks = {}
+        self._guard = threading.Lock()
+        self._held = threading.local()  # keys held by the current thread (re-entrant use)
+
+    def configure(self, lock_dir=None):
+        if lock_dir is not None:
+            self.lock_dir = lock_dir
+
+    def _thread_lock(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _lock_file_path(self, key):
+        safe_key = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in str(key))
+        return os.path.join(self.lock_dir, f"{safe_key}.lock")
+
+    @contextmanager
+    def lock(self, key):
+        held = getattr(self._held, 'keys', None)
+        if held is None:
+            held = self._held.keys = set()
+        if key in held:
+            yield
+            return
+
+        with self._thread_lock(key):
+            held.add(key)
+            try:
+                if fcntl is None or self.lock_dir is None:
+                    yield
+                    return
+                os.makedirs(self.lock_dir, exist_ok=True)
+                with open(self._lock_file_path(key), 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            finally:
+                held.discard(key)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytz
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+def _norm_cdf(x):
+    """Standard normal CDF (Abramowitz & Stegun 26.2.17, |error| < 7.5e-8)"""
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper_tail = _norm_pdf(x) * poly
+    return np.where(x >= 0, 1.0 - upper_tail, upper_tail)
+
+def _d1_d2(spot, strike, years, volatility, rate):
+    sqrt_t = np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * volatility ** 2) * years) / (volatility * sqrt_t)
+    return d1, d1 - volatility * sqrt_t
+
+def black_scholes_price(is_call, spot, strike, years, volatility, rate=0.0):
+    """Black-Scholes price per share for arrays of European options"""
+    d1, d2 = _d1_d2(spot, strike, years, volatility, rate)
+    discount = strike * np.exp(-rate * years)
+    call = spot * _norm_cdf(d1) - discount * _norm_cdf(d2)
+    put = discount * _norm_cdf(-d2) - spot * _norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+def implied_volatility(is_call, price, spot, strike, years, rate=0.0, tolerance=1e-6, max_iterations=100):
+    """
+    Implied volatility for arrays of option prices: Newton steps, falling back
+    to bisection whenever a step leaves the bracket. NaN where the price is
+    outside the no-arbitrage bounds or the inputs are unusable.
+    """
+    is_call, price, spot, strike, years = np.broadcast_arrays(
+        np.asarray(is_call, dtype=bool), *(np.asarray(a, dtype=float) for a in (price, spot, strike, years)))
+    discount = strike * np.exp(-rate * np.where(years > 0, years, 0))
+    lower = np.where(is_call, np.maximum(spot - discount, 0), np.maximum(discount - spot, 0))
+    upper = np.where(is_call, spot, discount)
+    valid = (price > lower) & (price < upper) & (spot > 0) & (strike > 0) & (years > 0)
+
+    # Solve only the valid legs, with safe placeholder inputs elsewhere
+    spot_v, strike_v, years_v, price_v, call_v = (np.where(valid, a, fill) for a, fill in
+                                                  ((spot, 1.0), (strike, 1.0), (years, 1.0), (price, 0.1), (is_call, True)))
+    low = np.full(price.shape, MIN_VOLATILITY)
+    high = np.full(price.shape, MAX_VOLATILITY)
+    sigma = np.full(price.shape, 0.5)
+    for _ in range(max_iterations):
+        diff = black_scholes_price(call_v, spot_v, strike_v, years_v, sigma, rate) - price_v
+        if np.all(np.abs(diff[valid]) < tolerance):
+            break
+        low = np.where(diff < 0, sigma, low)
+        high = np.where(diff > 0, sigma, high)
+        d1, _ = _d1_d2(spot_v, strike_v, years_v, sigma, rate)
+        vega = spot_v * _norm_pdf(d1) * np.sqrt(years_v)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = sigma - diff / vega
+        sigma = np.where((vega > 1e-10) & (newton > low) & (newton < high), newton, (low + high) / 2)
+    return np.where(valid, sigma, np.nan)
+
+def black_scholes_greeks(is_call, spot, strike, years, volatility, rate=0.0):
+    """
+    Per-share greeks for arrays of European options: delta, gamma, theta (per
+    calendar day) and vega (per 1 point of volatility). NaN where undefined.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(spot, strike, years, volatility, rate)
+        sqrt_t = np.sqrt(years)
+        pdf = _norm_pdf(d1)
+        discount = strike * np.exp(-rate * years)
+        time_decay = -spot * pdf * volatility / (2 * sqrt_t)
+        theta = np.where(is_call,
+                         time_decay - rate * discount * _norm_cdf(d2),
+                         time_decay + rate * discount * _norm_cdf(-d2))
+        return {
+            'delta': np.where(is_call, _norm_cdf(d1), _norm_cdf(d1) - 1),
+            'gamma': pdf / (spot * volatility * sqrt_t),
+            'theta': theta / 365,
+            'vega': spot * pdf * sqrt_t / 100
+        }
+
+def years_to_expiry(expiries, now, close_time='16:00', timezone='US/Eastern'):
+    """Years from `now` (aware datetime) to the market close of each 'MM/DD/YYYY' expiry; NaN if unparseable"""
+    dates = pd.to_datetime(pd.Series(expiries, dtype=object), format='%m/%d/%Y', errors='coerce')
+    closes = (dates + pd.Timedelta(f"{close_time}:00")).dt.tz_localize(pytz.timezone(timezone))
+    return ((closes - now).dt.total_seconds() / SECONDS_PER_YEAR).to_numpy(dtype=float)
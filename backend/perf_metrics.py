@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds (+Inf is implicit)
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def quantile(self, q):
+        """Approximate quantile (upper bound of the bucket containing it)"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99)
+        }
+
+class _Stopwatch:
+    """Records consecutive phases of a longer operation"""
+    def __init__(self, recorder, category, prefix):
+        self.recorder = recorder
+        self.category = category
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Record the time since the previous lap (or creation) as `<prefix>.<phase>`"""
+        now = time.perf_counter()
+        self.recorder.record(self.category, f"{self.prefix}.{phase}", now - self._last)
+        self._last = now
+
+class PerfRecorder:
+    """
+    In-process latency histograms and cache counters.
+    Timings are grouped by (category, operation, outcome); upstream calls tagged
+    with a ticker are also aggregated per ticker so slow symbols stand out.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (category, operation, outcome) -> _Histogram
+        self._cache_counts = {}  # (cache, data_type, outcome) -> int
+        self._by_ticker = {}  # ticker -> {category: {'count', 'total_ms', 'max_ms'}}
+
+    def record(self, category, operation, elapsed_seconds, outcome='ok', ticker=None):
+        elapsed_ms = elapsed_seconds * 1000
+        with self._lock:
+            key = (category, operation, outcome)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(elapsed_ms)
+
+            if ticker:
+                stats = self._by_ticker.setdefault(ticker.upper(), {}).setdefault(
+                    category, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stats['count'] += 1
+                stats['total_ms'] += elapsed_ms
+                stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def record_cache(self, cache, data_type, outcome):
+        """Count a cache lookup outcome: 'hit', 'miss' or 'stale'"""
+        with self._lock:
+            key = (cache, data_type, outcome)
+            self._cache_counts[key] = self._cache_counts.get(key, 0) + 1
+
+    @contextmanager
+    def timed(self, category, operation, ticker=None):
+        """Time a block; outcome is 'error' if it raises"""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            self.record(category, operation, time.perf_counter() - start, outcome, ticker)
+
+    def stopwatch(self, operation, category='phase'):
+        return _Stopwatch(self, category, operation)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._cache_counts.clear()
+            self._by_ticker.clear()
+
+    def snapshot(self, top_tickers=25):
+        """JSON-friendly view of all metrics"""
+        with self._lock:
+            timings = {}
+            for (category, operation, outcome), histogram in sorted(self._histograms.items()):
+                timings.setdefault(category, {}).setdefault(operation, {})[outcome] = histogram.to_dict()
+
+            caches = {}
+            for (cache, data_type, outcome), count in sorted(self._cache_counts.items()):
+                caches.setdefault(cache, {}).setdefault(data_type, {'hit': 0, 'miss': 0, 'stale': 0})[outcome] = count
+
+            tickers = []
+            for ticker, categories in self._by_ticker.items():
+                total_ms = sum(stats['total_ms'] for stats in categories.values())
+                tickers.append({
+                    'ticker': ticker,
+                    'total_ms': round(total_ms, 3),
+                    'upstreams': {
+                        category: {
+                            'count': stats['count'],
+                            'total_ms': round(stats['total_ms'], 3),
+                            'max_ms': round(stats['max_ms'], 3)
+                        } for category, stats in categories.items()
+                    }
+                })
+            tickers.sort(key=lambda entry: entry['total_ms'], reverse=True)
+
+        return {
+            'timings': timings,
+            'caches': caches,
+            'slowest_tickers': tickers[:top_tickers]
+        }
+
+    def prometheus(self):
+        """Metrics in Prometheus text exposition format"""
+        lines = [
+            '# HELP portfolio_latency_seconds Latency of requests, upstream calls and refresh phases.',
+            '# TYPE portfolio_latency_seconds histogram'
+        ]
+        with self._lock:
+            for (category, operation, outcome), histogram in sorted(self._histograms.items()):
+                labels = f'category="{category}",operation="{operation}",outcome="{outcome}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS_MS, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'portfolio_latency_seconds_bucket{{{labels},le="{bound / 1000}"}} {cumulative}')
+                lines.append(f'portfolio_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'portfolio_latency_seconds_sum{{{labels}}} {histogram.total_ms / 1000}')
+                lines.append(f'portfolio_latency_seconds_count{{{labels}}} {histogram.count}')
+
+            lines.append('# HELP portfolio_cache_lookups_total Cache lookups by outcome.')
+            lines.append('# TYPE portfolio_cache_lookups_total counter')
+            for (cache, data_type, outcome), count in sorted(self._cache_counts.items()):
+                lines.append(f'portfolio_cache_lookups_total{{cache="{cache}",data_type="{data_type}",outcome="{outcome}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+# Global instance
+perf = PerfRecorder()
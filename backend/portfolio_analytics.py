@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Enrichment columns that depend on yfinance / historical data rather than Robinhood
+ANALYTICS_FIELDS = [
+    'one_week_change',
+    'one_month_change',
+    'three_month_change',
+    'one_year_change',
+    'yearly_revenue_change',
+    'current_rsi',
+    'current_ps',
+    'ps_12m_max',
+    'ps_12m_min',
+    'pe_12m_max',
+    'pe_12m_min'
+]
+
+class AnalyticsWorker:
+    """
+    Computes per-ticker analytics columns in a background thread pool, so the
+    core portfolio can be returned without waiting on cold yfinance fetches.
+    A failed ticker is reported with empty fields and retried after a backoff
+    (retry_seconds, doubling per consecutive failure up to ttl_seconds), so
+    polling status() doesn't resubmit it on every call.
+    """
+    def __init__(self, compute_func, max_workers=4, ttl_seconds=300, retry_seconds=30):
+        self.compute_func = compute_func  # compute_func(ticker) -> dict of ANALYTICS_FIELDS
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analytics')
+        self._results = {}  # ticker -> {'data': dict, 'timestamp': datetime, 'failures': int}
+        self._pending = {}  # ticker -> Future
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, ticker):
+        result = self._results.get(ticker)
+        if result is None:
+            return False
+        if result['failures']:
+            max_age = min(self.retry_seconds * 2 ** (result['failures'] - 1), self.ttl_seconds)
+        else:
+            max_age = self.ttl_seconds
+        return (datetime.now() - result['timestamp']).total_seconds() < max_age
+
+    def _run(self, ticker):
+        try:
+            data = self.compute_func(ticker)
+            with self._lock:
+                self._results[ticker] = {'data': data, 'timestamp': datetime.now(), 'failures': 0}
+        except Exception as e:
+            print(f"Error computing analytics for {ticker}: {e}")
+            with self._lock:
+                previous = self._results.get(ticker)
+                self._results[ticker] = {
+                    # Keep earlier values if there are any; stale data beats empty fields
+                    'data': previous['data'] if previous else {field: None for field in ANALYTICS_FIELDS},
+                    'timestamp': datetime.now(),
+                    'failures': previous['failures'] + 1 if previous else 1
+                }
+        finally:
+            with self._lock:
+                self._pending.pop(ticker, None)
+
+    def request(self, tickers):
+        """Schedule computation for tickers without fresh results. Non-blocking."""
+        with self._lock:
+            for ticker in tickers:
+                if ticker in self._pending or self._is_fresh(ticker):
+                    continue
+                self._pending[ticker] = self._executor.submit(self._run, ticker)
+
+    def status(self, tickers):
+        """
+        Return {'ready': {ticker: fields}, 'pending': [tickers]} for the requested tickers,
+        scheduling any that are missing or stale.
+        """
+        self.request(tickers)
+        ready = {}
+        pending = []
+        with self._lock:
+            for ticker in tickers:
+                result = self._results.get(ticker)
+                if result is not None:
+                    ready[ticker] = result['data']
+                if ticker in self._pending:
+                    pending.append(ticker)
+        return {'ready': ready, 'pending': pending}
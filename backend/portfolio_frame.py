@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+from option_greeks import black_scholes_greeks, implied_volatility, years_to_expiry
+from positions import POSITION_COLUMNS, Position, position_class
+
+NUMERIC_INPUTS = ['quantity', 'avgCost', 'latest_price', 'marketValue', 'previous_close',
+                  'high_52_weeks', 'low_52_weeks', 'pe_ratio', 'earnedPremium']
+HISTORICAL_METRIC_FIELDS = ['current_rsi', 'current_ps', 'ps_12m_max', 'ps_12m_min', 'pe_12m_max', 'pe_12m_min']
+PRICE_CHANGE_FIELDS = ['one_week_change', 'one_month_change', 'three_month_change', 'one_year_change']
+GREEK_FIELDS = ['delta', 'gamma', 'theta', 'vega']
+NON_TICKER_ROWS = ('USD Cash', 'Cryptocurrency')
+
+# Fields that rows of a type report as 0 rather than computing them
+_ZERO_FIELDS = {
+    'option': ['pe_ratio', 'high_52_weeks', 'low_52_weeks'] + PRICE_CHANGE_FIELDS,
+    'cash': ['pe_ratio', 'high_52_weeks', 'low_52_weeks', 'yearly_revenue_change'] + PRICE_CHANGE_FIELDS,
+    'crypto': ['pe_ratio', 'high_52_weeks', 'low_52_weeks', 'yearly_revenue_change'] + PRICE_CHANGE_FIELDS,
+}
+
+def _safe_divide(numerator, denominator, condition):
+    """numerator / denominator where condition holds, else 0 (no division warnings)"""
+    result = np.zeros(len(numerator))
+    np.divide(numerator, denominator, out=result, where=condition)
+    return result
+
+def build_account_frame(rows, total_equity, now=None, risk_free_rate=0.0):
+    """
+    Columnar view of an account's positions with the derived metrics filled in.
+
+    `rows` hold only the raw inputs per position: type, ticker, quantity,
+    avgCost (option credit as a positive price), latest_price (mark for options),
+    previous_close, 52-week high/low, side and underlying_price (options),
+    marketValue (cash and crypto rows) and the descriptive / analytics fields.
+    Market value, P/L, return %, portfolio %, 52-week position and intraday
+    change are computed for all rows at once, option greeks for all legs at
+    once when `now` (an aware datetime) is given.
+    """
+    df = pd.DataFrame.from_records(rows)
+    for column in set(POSITION_COLUMNS + NUMERIC_INPUTS) - set(df.columns):
+        df[column] = None
+    df[NUMERIC_INPUTS] = df[NUMERIC_INPUTS].apply(pd.to_numeric).fillna(0.0)
+
+    kind = df['type'].to_numpy()
+    is_stock = kind == 'stock'
+    is_option = kind == 'option'
+    is_security = is_stock | is_option
+    direction = np.where(is_option & (df['side'] == 'short').to_numpy(), -1.0, 1.0)
+    multiplier = np.where(is_option, 100.0, 1.0)
+
+    quantity = df['quantity'].to_numpy()
+    avg_cost = df['avgCost'].to_numpy()
+    price = df['latest_price'].to_numpy()
+    pnl_per_share = (price - avg_cost) * direction
+
+    # Short options are a liability: negative market value, P/L from the credit received
+    market_value = np.where(is_security, quantity * price * multiplier * direction, df['marketValue'].to_numpy())
+    df['marketValue'] = market_value
+    df['unrealizedPnl'] = np.where(is_security, pnl_per_share * quantity * multiplier, 0.0)
+    df['returnPct'] = _safe_divide(pnl_per_share * 100, avg_cost, is_security & (avg_cost > 0))
+
+    df['portfolio_percent'] = _safe_divide(market_value * 100, np.full(len(df), float(total_equity)),
+                                           ~is_option & (total_equity > 0))
+
+    high = df['high_52_weeks'].to_numpy()
+    low = df['low_52_weeks'].to_numpy()
+    df['position_52_week'] = _safe_divide((price - low) * 100, high - low, is_stock & (high > low))
+
+    previous_close = df['previous_close'].to_numpy()
+    df['intraday_percent_change'] = _safe_divide((price - previous_close) * 100, previous_close,
+                                                 is_stock & (previous_close > 0))
+
+    df['side'] = np.where(is_stock, np.where(market_value > 0, 'long', 'short'),
+                          np.where(is_option, df['side'].to_numpy(dtype=object), 'long'))
+    for row_type, fields in _ZERO_FIELDS.items():
+        mask = kind == row_type
+        if mask.any():
+            df.loc[mask, fields] = 0
+
+    if now is not None and is_option.any():
+        add_option_greeks(df, is_option, direction * quantity * multiplier, now, risk_free_rate)
+    return df
+
+def add_option_greeks(df, is_option, contract_shares, now, risk_free_rate):
+    """
+    Implied volatility from each leg's mark, then Black-Scholes greeks in one
+    pass. Greeks are per position (signed, times quantity and the 100-share
+    multiplier): delta in shares, theta in $/day, vega in $ per volatility point.
+    """
+    legs = df[is_option]
+    spot = pd.to_numeric(legs['underlying_price']).to_numpy(dtype=float)
+    strike = pd.to_numeric(legs['strike'], errors='coerce').to_numpy(dtype=float)
+    years = years_to_expiry(legs['expiry'].tolist(), now)
+    is_call = (legs['option_type'] == 'call').to_numpy()
+
+    volatility = implied_volatility(is_call, legs['latest_price'].to_numpy(dtype=float), spot, strike, years, risk_free_rate)
+    greeks = black_scholes_greeks(is_call, spot, strike, years, volatility, risk_free_rate)
+
+    df['implied_volatility'] = np.nan
+    df.loc[is_option, 'implied_volatility'] = volatility
+    for field in GREEK_FIELDS:
+        df[field] = np.nan
+        df.loc[is_option, field] = greeks[field] * contract_shares[is_option]
+
+def theta_by_ticker(df):
+    """Summed position theta ($/day) per underlying ticker, legs without greeks skipped"""
+    if 'theta' not in df.columns:
+        return {}
+    theta = pd.to_numeric(df['theta'], errors='coerce')
+    totals = theta[theta.notna()].groupby(df['ticker']).sum()
+    return {ticker: float(value) for ticker, value in totals.items()}
+
+def count_tickers(df):
+    """Distinct tickers, not counting the cash and crypto rows"""
+    tickers = df['ticker']
+    return int(tickers[tickers.notna() & (tickers != '') & ~tickers.isin(NON_TICKER_ROWS)].nunique())
+
+def summarize_account_frame(df):
+    """Total unrealized P/L of stocks and options, and the number of distinct tickers"""
+    securities = df['type'].isin(['stock', 'option'])
+    return float(df.loc[securities, 'unrealizedPnl'].sum()), count_tickers(df)
+
+_MERGE_INDEX = {name: POSITION_COLUMNS.index(name) for name in (
+    'type', 'ticker', 'quantity', 'marketValue', 'avgCost', 'latest_price', 'unrealizedPnl',
+    'returnPct', 'strike', 'expiry', 'option_type', 'intraday_percent_change', 'portfolio_percent', 'theta'
+)}
+_METRIC_INDEXES = [POSITION_COLUMNS.index(field) for field in HISTORICAL_METRIC_FIELDS]
+
+def merge_account_positions(positions_by_account):
+    """
+    Combine position rows of several accounts into one list. Stock, cash and
+    crypto rows of the same ticker are merged: quantities, market values and
+    P/L summed, average cost weighted by quantity, latest price and intraday
+    change from the last account, ticker-level metrics from any account that
+    has them, and `account` becomes the list of holding accounts. Options stay
+    separate per account. Portfolio % is recomputed against the combined
+    market value. This is one pass over the row tuples rather than a pandas
+    groupby: the groupby's fixed cost (frame construction, per-column
+    aggregations) made the merge 3-50x slower from 10 to 3000 positions per
+    account.
+    """
+    i = _MERGE_INDEX
+    merged = {}  # ticker (or option key tuple) -> [values, account(s)]
+    for account, positions in positions_by_account.items():
+        for position in positions:
+            # Rows read from a portfolio cache are dicts: take their values without building a Position
+            values = position.values if isinstance(position, Position) else list(map(position.get, POSITION_COLUMNS))
+            ticker = values[i['ticker']]
+            if values[i['type']] == 'option' or not ticker:
+                key = (ticker, values[i['expiry']], values[i['strike']], values[i['option_type']], account)
+                if key in merged:
+                    merged[key][0] = list(values)  # keeps its first position, like a dict update
+                else:
+                    merged[key] = [list(values), account]
+                continue
+
+            entry = merged.get(ticker)
+            if entry is None:
+                merged[ticker] = [list(values), [account]]
+                continue
+            row, accounts = entry
+            if account not in accounts:
+                accounts.append(account)
+            quantity = (row[i['quantity']] or 0) + (values[i['quantity']] or 0)
+            cost = (row[i['quantity']] or 0) * (row[i['avgCost']] or 0) + (values[i['quantity']] or 0) * (values[i['avgCost']] or 0)
+            avg_cost = cost / quantity if quantity > 0 else 0
+            row[i['marketValue']] = (row[i['marketValue']] or 0) + (values[i['marketValue']] or 0)
+            row[i['unrealizedPnl']] = (row[i['unrealizedPnl']] or 0) + (values[i['unrealizedPnl']] or 0)
+            row[i['quantity']] = quantity
+            row[i['avgCost']] = avg_cost
+            total_cost = quantity * avg_cost
+            row[i['returnPct']] = row[i['unrealizedPnl']] * 100 / total_cost if total_cost > 0 else 0
+            row[i['latest_price']] = values[i['latest_price']]
+            row[i['intraday_percent_change']] = values[i['intraday_percent_change']]
+            # Ticker-level metrics: take them from any account that has them
+            for index in _METRIC_INDEXES:
+                if row[index] is None:
+                    row[index] = values[index]
+
+    total_market_value = sum(row[i['marketValue']] or 0 for row, _ in merged.values())
+    combined = []
+    for row, account in merged.values():
+        if total_market_value > 0:
+            row[i['portfolio_percent']] = (row[i['marketValue']] or 0) * 100 / total_market_value
+        combined.append(position_class(row[i['type']])(row, account))
+    return combined
+
+def count_position_tickers(positions):
+    """count_tickers for a list of Position rows"""
+    return len({p.ticker for p in positions if p.ticker and p.ticker not in NON_TICKER_ROWS})
+
+def position_theta_by_ticker(positions):
+    """theta_by_ticker for a list of Position rows"""
+    totals = {}
+    for position in positions:
+        if position.theta is not None:
+            totals[position.ticker] = totals.get(position.ticker, 0.0) + float(position.theta)
+    return totals
+
+def frame_to_positions(df):
+    """Position objects for the rows of a frame, produced only at the API boundary (NaN as None)"""
+    values = []
+    for column in POSITION_COLUMNS:
+        series = df[column]
+        # tolist() yields native Python scalars, much faster than DataFrame.to_dict
+        column_values = series.tolist()
+        missing = series.isna().to_numpy()
+        if missing.any():
+            column_values = [None if is_missing else value for value, is_missing in zip(column_values, missing)]
+        values.append(column_values)
+    accounts = df['account'].tolist() if 'account' in df.columns else [None] * len(df)
+    return [position_class(row[0])(row, account) for row, account in zip(zip(*values), accounts)]
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+def _json_default(obj):
+    # Position rows serialize as their field dict; anything else as its string
+    return obj.to_dict() if hasattr(obj, 'to_dict') else str(obj)
+
+class PortfolioSnapshotStore:
+    """
+    Keeps the most recent portfolio snapshots per account, each tagged with a
+    version, so clients can ask for only what changed since the version they
+    already hold. Versions are "<instance>.<n>" strings: the instance part (pid
+    and start time) keeps a version handed out by one gunicorn worker from
+    matching a different snapshot held by another, which then sends a full
+    payload instead of a wrong patch or 304.
+    """
+    def __init__(self, history_size=20):
+        self.history_size = history_size
+        self._snapshots = {}  # account -> OrderedDict(version -> snapshot)
+        self._instance = f"{os.getpid():x}-{int(time.time() * 1000):x}"
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _digest(self, data):
+        """Content hash of a portfolio payload, ignoring the fetch timestamp"""
+        payload = {
+            'summary': data.get('summary', {}),
+            'positions': data.get('positions', [])
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=_json_default).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()
+
+    def _index_positions(self, positions, position_id_func):
+        """Map position id -> position, keeping the original order"""
+        indexed = OrderedDict()
+        for pos in positions:
+            position_id = position_id_func(pos)
+            # Disambiguate ids that collide (e.g. a long and a short leg on the same contract)
+            unique_id = position_id
+            suffix = 1
+            while unique_id in indexed:
+                suffix += 1
+                unique_id = f"{position_id}#{suffix}"
+            indexed[unique_id] = pos
+        return indexed
+
+    def record(self, account_name, data, position_id_func):
+        """
+        Record a portfolio payload for an account and return its snapshot.
+        If the content is unchanged since the latest snapshot, the latest one is returned.
+        """
+        digest = self._digest(data)
+        with self._lock:
+            history = self._snapshots.setdefault(account_name, OrderedDict())
+            if history:
+                latest = next(reversed(history.values()))
+                if latest['digest'] == digest:
+                    latest['timestamp'] = data.get('timestamp')
+                    return latest
+
+            self._count += 1
+            snapshot = {
+                'version': f"{self._instance}.{self._count}",
+                'digest': digest,
+                'timestamp': data.get('timestamp'),
+                'summary': dict(data.get('summary', {})),
+                'positions': self._index_positions(data.get('positions', []), position_id_func)
+            }
+            history[snapshot['version']] = snapshot
+            while len(history) > self.history_size:
+                history.popitem(last=False)
+            return snapshot
+
+    def latest(self, account_name):
+        """Return the newest snapshot for an account, or None"""
+        with self._lock:
+            history = self._snapshots.get(account_name)
+            if not history:
+                return None
+            return next(reversed(history.values()))
+
+    def diff(self, account_name, since_version):
+        """
+        Build a patch from `since_version` to the latest snapshot.
+        Returns None if the base version is no longer (or never was) retained,
+        in which case the caller should send the full payload.
+        """
+        with self._lock:
+            history = self._snapshots.get(account_name)
+            if not history or since_version not in history:
+                return None
+            base = history[since_version]
+            latest = next(reversed(history.values()))
+
+        summary_changes = {
+            key: value for key, value in latest['summary'].items()
+            if base['summary'].get(key) != value
+        }
+
+        added = []
+        changed = {}
+        for position_id, pos in latest['positions'].items():
+            old_pos = base['positions'].get(position_id)
+            if old_pos is None:
+                added.append({'id': position_id, 'position': pos})
+                continue
+            fields = {key: value for key, value in pos.items() if old_pos.get(key) != value}
+            # Fields that disappeared are sent as null
+            for key in old_pos:
+                if key not in pos:
+                    fields[key] = None
+            if fields:
+                changed[position_id] = fields
+
+        removed = [position_id for position_id in base['positions'] if position_id not in latest['positions']]
+
+        return {
+            'full': False,
+            'since': since_version,
+            'version': latest['version'],
+            'timestamp': latest['timestamp'],
+            'summary': summary_changes,
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'position_ids': list(latest['positions'].keys())
+        }
+
+# Global instance
+portfolio_snapshots = PortfolioSnapshotStore()
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from serialization import dump_json_bytes
+
+class _Subscription:
+    """A single Server-Sent Events client listening to one account"""
+    def __init__(self, tickers=None, max_pending=100):
+        self.tickers = set(t.upper() for t in tickers) if tickers else None
+        self.version = None  # snapshot version this client currently holds
+        self.queue = queue.Queue(maxsize=max_pending)
+
+class PortfolioStreamHub:
+    """
+    Pushes portfolio changes to Server-Sent Events subscribers.
+    While an account has listeners, a background poller refreshes its (cached)
+    portfolio and every new snapshot version is sent as a patch, so clients
+    no longer need to poll /api/portfolio themselves.
+    """
+    def __init__(self, snapshot_store, refresh_func, poll_interval_func, heartbeat_seconds=15):
+        self.snapshot_store = snapshot_store
+        self.refresh_func = refresh_func  # refresh_func(account_key) records a new snapshot
+        self.poll_interval_func = poll_interval_func  # returns seconds until the next refresh
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers = {}  # account -> set of _Subscription
+        self._pollers = {}  # account -> Thread
+        self._lock = threading.Lock()
+
+    def subscribe(self, account_key, tickers=None):
+        sub = _Subscription(tickers)
+        with self._lock:
+            self._subscribers.setdefault(account_key, set()).add(sub)
+            if account_key not in self._pollers:
+                poller = threading.Thread(target=self._poll, args=(account_key,), daemon=True)
+                self._pollers[account_key] = poller
+                poller.start()
+        # Send whatever we already have right away
+        self.publish(account_key)
+        return sub
+
+    def unsubscribe(self, account_key, sub):
+        with self._lock:
+            subs = self._subscribers.get(account_key)
+            if subs:
+                subs.discard(sub)
+
+    def _poll(self, account_key):
+        """Background refresh loop; exits once the account has no subscribers"""
+        while True:
+            with self._lock:
+                if not self._subscribers.get(account_key):
+                    self._pollers.pop(account_key, None)
+                    return
+            try:
+                self.refresh_func(account_key)
+            except Exception as e:
+                print(f"Error refreshing streamed portfolio for {account_key}: {e}")
+            self.publish(account_key)
+            time.sleep(self.poll_interval_func())
+
+    def _position_matches(self, pos, tickers):
+        return tickers is None or (pos.get('ticker') or '').upper() in tickers
+
+    def _snapshot_event(self, snapshot, tickers):
+        position_ids = [
+            position_id for position_id, pos in snapshot['positions'].items()
+            if self._position_matches(pos, tickers)
+        ]
+        return 'snapshot', {
+            'full': True,
+            'version': snapshot['version'],
+            'timestamp': snapshot['timestamp'],
+            'summary': snapshot['summary'],
+            'positions': [snapshot['positions'][position_id] for position_id in position_ids],
+            'position_ids': position_ids
+        }
+
+    def _patch_event(self, patch, snapshot, tickers):
+        if tickers is not None:
+            positions = snapshot['positions']
+            patch = {
+                **patch,
+                'added': [entry for entry in patch['added'] if self._position_matches(entry['position'], tickers)],
+                'changed': {
+                    position_id: fields for position_id, fields in patch['changed'].items()
+                    if self._position_matches(positions[position_id], tickers)
+                },
+                'position_ids': [
+                    position_id for position_id in patch['position_ids']
+                    if self._position_matches(positions[position_id], tickers)
+                ]
+            }
+        return 'patch', patch
+
+    def publish(self, account_key):
+        """Send the latest snapshot of an account to every subscriber that is behind"""
+        # Pollers and request threads both publish: check and advance each
+        # subscriber's version under the lock so a patch is never queued twice
+        with self._lock:
+            snapshot = self.snapshot_store.latest(account_key)
+            if snapshot is None:
+                return
+            patches = {}  # since version -> patch, shared by subscribers at the same version
+            for sub in self._subscribers.get(account_key, ()):
+                if sub.version == snapshot['version']:
+                    continue
+                patch = None
+                if sub.version is not None:
+                    if sub.version not in patches:
+                        patches[sub.version] = self.snapshot_store.diff(account_key, sub.version)
+                    patch = patches[sub.version]
+
+                if patch is None:
+                    event = self._snapshot_event(snapshot, sub.tickers)
+                else:
+                    event = self._patch_event(patch, snapshot, sub.tickers)
+
+                try:
+                    sub.queue.put_nowait(event)
+                    sub.version = snapshot['version']
+                except queue.Full:
+                    # Slow client; resync it with a full snapshot once it catches up
+                    sub.version = None
+
+    def stream(self, account_key, tickers=None):
+        """Generator producing the text/event-stream body for one client"""
+        sub = self.subscribe(account_key, tickers)
+        try:
+            while True:
+                try:
+                    event, payload = sub.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {dump_json_bytes(payload).decode('utf-8')}\n\n"
+        finally:
+            self.unsubscribe(account_key, sub)
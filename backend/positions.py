@@ -0,0 +1,113 @@
+from operator import itemgetter
+
+# Fields of a position row in API responses and portfolio caches, in order
+POSITION_COLUMNS = [
+    'type', 'ticker', 'quantity', 'marketValue', 'avgCost', 'latest_price',
+    'unrealizedPnl', 'returnPct', 'strike', 'expiry', 'option_type',
+    'earnedPremium', 'name', 'intraday_percent_change', 'pe_ratio',
+    'portfolio_percent', 'high_52_weeks', 'low_52_weeks', 'position_52_week',
+    'side', 'one_week_change', 'one_month_change', 'three_month_change',
+    'one_year_change', 'yearly_revenue_change', 'sector', 'industry',
+    'current_rsi', 'current_ps', 'ps_12m_max', 'ps_12m_min', 'pe_12m_max', 'pe_12m_min',
+    'underlying_price', 'implied_volatility', 'delta', 'gamma', 'theta', 'vega'
+]
+_INDEX = {name: index for index, name in enumerate(POSITION_COLUMNS)}
+_PADDING = (None,) * len(POSITION_COLUMNS)
+_TICKER = _INDEX['ticker']
+_ALL_FIELDS = itemgetter(*POSITION_COLUMNS)
+_OPTION_ID_FIELDS = itemgetter(*(_INDEX[name] for name in ('ticker', 'expiry', 'strike', 'option_type')))
+
+class Position:
+    """
+    One portfolio row, stored as a tuple of values in POSITION_COLUMNS order
+    behind three slots instead of a ~35 key dict; fields read as attributes
+    (`pos.marketValue`). `account` is the account name, or the list of accounts
+    for merged rows on the ALL page; `id` is computed once at construction.
+    Rows are read-only, support dict-style reads (`pos['ticker']`, `pos.get(...)`,
+    `pos.items()`) and serialize with to_dict().
+    """
+    __slots__ = ('_values', 'account', 'id')
+
+    def __init__(self, values=(), account=None):
+        """`values` in POSITION_COLUMNS order; missing trailing fields are None"""
+        values = tuple(values)
+        if len(values) < len(POSITION_COLUMNS):
+            values = values + _PADDING[len(values):]
+        self._values = values
+        self.account = account
+        self.id = self._base_id()
+        # Rows of a single account are unique per account; merged rows just use the base id
+        if account and isinstance(account, str):
+            self.id = f"{self.id}-{account}"
+
+    def _base_id(self):
+        return self._values[_TICKER] or ''
+
+    @staticmethod
+    def from_dict(data):
+        cls = OptionPosition if data.get('type') == 'option' else Position
+        try:
+            values = _ALL_FIELDS(data)  # rows written by to_dict() carry every field
+        except KeyError:
+            values = tuple(map(data.get, POSITION_COLUMNS))
+        return cls(values, data.get('account'))
+
+    @property
+    def values(self):
+        """Field values in POSITION_COLUMNS order"""
+        return self._values
+
+    def to_dict(self):
+        data = dict(zip(POSITION_COLUMNS, self._values))
+        if self.account is not None:
+            data['account'] = self.account
+        return data
+
+    # --- Read-only mapping interface (portfolio rows used to be dicts) ---
+    def __getitem__(self, key):
+        index = _INDEX.get(key)
+        if index is not None:
+            return self._values[index]
+        if key == 'account' and self.account is not None:
+            return self.account
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        index = _INDEX.get(key)
+        if index is not None:
+            return self._values[index]
+        if key == 'account' and self.account is not None:
+            return self.account
+        return default
+
+    def __contains__(self, key):
+        return key in _INDEX or (key == 'account' and self.account is not None)
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def items(self):
+        return self.to_dict().items()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.id!r})"
+
+def _field(index):
+    return property(lambda self: self._values[index])
+
+for _index, _name in enumerate(POSITION_COLUMNS):
+    setattr(Position, _name, _field(_index))
+
+class OptionPosition(Position):
+    """Option contract row; its id includes expiry, strike and call/put"""
+    __slots__ = ()
+
+    def _base_id(self):
+        return '%s-%s-%s-%s' % _OPTION_ID_FIELDS(self._values)
+
+def position_class(position_type):
+    return OptionPosition if position_type == 'option' else Position
+
+def positions_from_dicts(rows):
+    """Position objects for rows read from a portfolio cache (already built ones pass through)"""
+    return [row if isinstance(row, Position) else Position.from_dict(row) for row in rows]
@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytz
+
+ROLLUP_BUCKETS = ('day', 'week', 'month')
+TERMINAL_STATES = ('filled', 'cancelled', 'canceled', 'rejected', 'failed', 'expired')
+STATE_VERSION = 3
+
+def _empty_rollups():
+    return {'day': {}, 'week': {}, 'month': {}, 'ticker': {}, 'strategy': {}}
+
+def empty_premium_state():
+    return {'version': STATE_VERSION, 'orders': {}, 'rollups': _empty_rollups(), 'premiums_by_ticker': {}}
+
+def fill_date(order, timezone):
+    """Trading date (in `timezone`) the order was last filled / updated"""
+    timestamp = order.get('last_transaction_at') or order.get('updated_at')
+    moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return moment.astimezone(timezone).date()
+
+def _bucket_keys(day):
+    return {
+        'day': day.isoformat(),
+        'week': (day - timedelta(days=day.weekday())).isoformat(),  # the week's Monday
+        'month': day.strftime('%Y-%m')
+    }
+
+class PremiumLedger:
+    """
+    Option premium per order with its fill date and premium classification,
+    plus rollups maintained as orders are added: earned (theta-eligible)
+    premium by day, week (Monday), month and ticker, and per opening/closing
+    strategy the eligible premium and order counts. Each order is classified
+    once; orders not yet in a final state are left for a later pass.
+    """
+    def __init__(self, state=None, timezone='US/Eastern'):
+        self.state = state if state and state.get('version') == STATE_VERSION else empty_premium_state()
+        self.timezone = pytz.timezone(timezone)
+
+    def has_order(self, order_id):
+        return order_id in self.state['orders']
+
+    def add_order(self, order, eligible):
+        """
+        Record a final-state order; `eligible` comes from is_order_eligible_for_premium
+        and counts when truthy, as the original premium loop did: that includes its
+        "Cancelled" classification, so partially filled cancels count their net amount.
+        Returns False for orders that are missing an id or may still change.
+        """
+        order_id = order.get('id')
+        if not order_id or order_id in self.state['orders'] or order.get('state') not in TERMINAL_STATES:
+            return False
+        eligible = bool(eligible)
+        ticker = order.get('chain_symbol')
+        direction = order.get('direction')
+        amount = float(order.get('net_amount', 0))
+        quantity = float(order.get('quantity', 0))
+        premium = 0.0
+        if eligible and all([ticker, direction, amount, quantity]):
+            net_amount = amount * quantity
+            premium = net_amount if direction == 'credit' else -net_amount
+        day = fill_date(order, self.timezone)
+        strategy = order.get('opening_strategy') or order.get('closing_strategy') or 'unknown'
+        self.state['orders'][order_id] = {
+            'date': day.isoformat(), 'ticker': ticker, 'premium': premium,
+            'eligible': eligible, 'strategy': strategy, 'state': order.get('state')
+        }
+
+        rollups = self.state['rollups']
+        if eligible:
+            for bucket, key in _bucket_keys(day).items():
+                rollups[bucket][key] = rollups[bucket].get(key, 0.0) + premium
+            if ticker:
+                rollups['ticker'][ticker] = rollups['ticker'].get(ticker, 0.0) + premium
+                if premium:
+                    by_ticker = self.state['premiums_by_ticker']
+                    by_ticker[ticker] = by_ticker.get(ticker, 0.0) + premium
+        if order.get('state') == 'filled':
+            stats = rollups['strategy'].setdefault(strategy, {'premium': 0.0, 'orders': 0, 'eligible_orders': 0})
+            stats['premium'] += premium
+            stats['orders'] += 1
+            stats['eligible_orders'] += eligible
+        return True
+
+    def premiums_by_ticker(self):
+        return defaultdict(float, self.state['premiums_by_ticker'])
+
+    def series(self, bucket, start=None, end=None):
+        """[{'period', 'premium'}] sorted by period, with ISO `start` / `end` bounds (inclusive)"""
+        values = self.state['rollups'][bucket]
+        return [
+            {'period': period, 'premium': values[period]} for period in sorted(values)
+            if (not start or period >= start[:len(period)]) and (not end or period <= end[:len(period)])
+        ]
+
+    def orders(self, ticker=None, start=None, end=None):
+        return [
+            {'id': order_id, **record} for order_id, record in self.state['orders'].items()
+            if (not ticker or record['ticker'] == ticker)
+            and (not start or record['date'] >= start) and (not end or record['date'] <= end)
+        ]
+
+def merge_premium_series(series_list):
+    """Sum several [{'period', 'premium'}] series period by period"""
+    totals = defaultdict(float)
+    for series in series_list:
+        for point in series:
+            totals[point['period']] += point['premium']
+    return [{'period': period, 'premium': totals[period]} for period in sorted(totals)]
@@ -0,0 +1,194 @@
+"""
+Record/replay layer for the robin_stocks and yfinance calls made by app.py and
+ticker_data_cache.py, so the portfolio pipeline can run (and be benchmarked)
+without Robinhood credentials or network access.
+
+record: calls go upstream and every response is written to a fixture store.
+replay: responses come from the fixture store, with optional injected latency.
+
+Enable for the Flask app with environment variables:
+    REPLAY_MODE=record|replay  REPLAY_FIXTURES_DIR=../fixtures  REPLAY_LATENCY_MS=robinhood:50,yfinance:200
+    REPLAY_MODE=synthetic  REPLAY_SYNTHETIC=positions=2000,option_orders=10000  (see synthetic_portfolio.py)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import robin_stocks.robinhood as r
+import yfinance
+
+# (submodule of robin_stocks.robinhood or None for the package itself, function name)
+ROBINHOOD_TARGETS = [
+    ('account', 'load_portfolio_profile'),
+    ('account', 'load_account_profile'),
+    ('account', 'load_phoenix_account'),
+    ('account', 'get_open_stock_positions'),
+    ('options', 'get_open_option_positions'),
+    ('options', 'get_option_market_data_by_id'),
+    ('orders', 'get_all_option_orders'),
+    ('orders', 'get_all_stock_orders'),
+    ('stocks', 'get_fundamentals'),
+    ('stocks', 'get_name_by_symbol'),
+    (None, 'get_instrument_by_url'),
+    (None, 'get_latest_price'),
+    (None, 'get_stock_historicals'),
+]
+
+# yfinance.Ticker attributes read by the app
+YFINANCE_PROPERTIES = ['info', 'financials', 'quarterly_income_stmt', 'quarterly_financials', 'quarterly_balance_sheet']
+
+def call_key(args, kwargs):
+    """Stable key for a call's arguments"""
+    encoded = json.dumps([list(args), kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+def _encode_value(value):
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        return {'__dataframe__': value.to_json(orient='split', date_format='iso')}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and '__dataframe__' in value:
+        import pandas as pd
+        from io import StringIO
+        return pd.read_json(StringIO(value['__dataframe__']), orient='split')
+    return value
+
+class FileFixtureStore:
+    """Fixtures on disk: <root>/<provider>/<name>/<key>.json"""
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, provider, name, args, kwargs):
+        return os.path.join(self.root, provider, name, f"{call_key(args, kwargs)}.json")
+
+    def get(self, provider, name, args, kwargs):
+        path = self._path(provider, name, args, kwargs)
+        try:
+            with open(path, 'r') as f:
+                return _decode_value(json.load(f)['response'])
+        except FileNotFoundError:
+            raise KeyError(f"No fixture for {provider}.{name}{tuple(args)} {kwargs}")
+
+    def put(self, provider, name, args, kwargs, value):
+        path = self._path(provider, name, args, kwargs)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'args': list(args), 'kwargs': kwargs, 'response': _encode_value(value)}, f, default=str)
+
+class _ReplayTicker:
+    """Stand-in for yfinance.Ticker that routes reads through the harness"""
+    def __init__(self, harness, symbol, real_ticker_class):
+        self._harness = harness
+        self._symbol = symbol
+        self._real_ticker_class = real_ticker_class
+        self._real = None
+
+    def _real_ticker(self):
+        if self._real is None:
+            self._real = self._real_ticker_class(self._symbol)
+        return self._real
+
+    def history(self, start=None, end=None, **kwargs):
+        # Key by span in days rather than wall-clock dates so fixtures stay replayable
+        span_days = (end - start).days if start is not None and end is not None else None
+        return self._harness.call(
+            'yfinance', 'history', (self._symbol, span_days), {},
+            lambda: self._real_ticker().history(start=start, end=end, **kwargs)
+        )
+
+    def __getattr__(self, name):
+        if name in YFINANCE_PROPERTIES:
+            return self._harness.call('yfinance', name, (self._symbol,), {},
+                                      lambda: getattr(self._real_ticker(), name))
+        raise AttributeError(name)
+
+class ReplayHarness:
+    """
+    Patches the upstream functions in place. Use as a context manager or
+    call install()/uninstall().
+    """
+    def __init__(self, store, mode='replay', latency_ms=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.store = store
+        self.mode = mode
+        self.latency_ms = latency_ms or {}  # provider -> milliseconds per call
+        self.call_counts = {}
+        self._originals = []
+        self._lock = threading.Lock()
+
+    def call(self, provider, name, args, kwargs, real_func):
+        with self._lock:
+            self.call_counts[f"{provider}.{name}"] = self.call_counts.get(f"{provider}.{name}", 0) + 1
+        if self.mode == 'record':
+            value = real_func()
+            self.store.put(provider, name, args, kwargs, value)
+            return value
+        delay = self.latency_ms.get(provider, 0)
+        if delay:
+            time.sleep(delay / 1000)
+        return self.store.get(provider, name, args, kwargs)
+
+    def _patch(self, owner, name, replacement):
+        self._originals.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _robinhood_wrapper(self, name, original):
+        def wrapper(*args, **kwargs):
+            return self.call('robinhood', name, args, kwargs, lambda: original(*args, **kwargs))
+        wrapper.__name__ = name
+        return wrapper
+
+    def install(self):
+        for submodule, name in ROBINHOOD_TARGETS:
+            owner = getattr(r, submodule) if submodule else r
+            self._patch(owner, name, self._robinhood_wrapper(name, getattr(owner, name)))
+
+        real_ticker_class = yfinance.Ticker
+        self._patch(yfinance, 'Ticker', lambda symbol, *a, **k: _ReplayTicker(self, symbol, real_ticker_class))
+
+        if self.mode == 'replay':
+            self._patch(r, 'login', lambda *args, **kwargs: {'access_token': 'replay'})
+        return self
+
+    def uninstall(self):
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+def parse_latency_spec(spec):
+    """'robinhood:50,yfinance:200' -> {'robinhood': 50.0, 'yfinance': 200.0}"""
+    latency = {}
+    for part in (spec or '').split(','):
+        if ':' in part:
+            provider, ms = part.split(':', 1)
+            latency[provider.strip()] = float(ms)
+    return latency
+
+def install_from_env():
+    """Install a harness configured by REPLAY_* environment variables"""
+    mode = os.environ['REPLAY_MODE']
+    if mode == 'synthetic':
+        from synthetic_portfolio import SyntheticPortfolio, parse_synthetic_spec
+        accounts = None
+        if os.path.exists('robinhood_secrets.json'):
+            with open('robinhood_secrets.json') as f:
+                accounts = json.load(f).get('ACCOUNTS')
+        store = SyntheticPortfolio(accounts=accounts, **parse_synthetic_spec(os.environ.get('REPLAY_SYNTHETIC')))
+        source = f"synthetic, {store.positions} positions per account"
+        mode = 'replay'
+    else:
+        store = FileFixtureStore(os.environ.get('REPLAY_FIXTURES_DIR', os.path.join('..', 'fixtures')))
+        source = f"fixtures: {store.root}"
+    harness = ReplayHarness(store, mode=mode, latency_ms=parse_latency_spec(os.environ.get('REPLAY_LATENCY_MS')))
+    print(f"Upstream calls in {harness.mode} mode ({source})")
+    return harness.install()
@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def position_exposures(positions):
+    """
+    Dollar exposure per position id and ticker: market value for stocks,
+    delta-adjusted (delta shares x underlying price) for options. Cash, crypto
+    and option legs without greeks are left out.
+    """
+    exposures = {}
+    for pos in positions:
+        if pos.type == 'stock':
+            exposure = pos.marketValue
+        elif pos.type == 'option' and pos.delta is not None and pos.underlying_price:
+            exposure = pos.delta * pos.underlying_price
+        else:
+            continue
+        if exposure:
+            exposures[pos.id] = (pos.ticker, float(exposure))
+    return exposures
+
+def close_matrix(series_by_ticker, benchmark, window):
+    """
+    Daily closes as one aligned (dates x tickers) frame over the benchmark's last
+    `window` + 1 sessions; gaps are forward-filled, tickers without any history
+    in the window are dropped.
+    """
+    closes = pd.DataFrame(series_by_ticker).sort_index()
+    closes = closes[closes[benchmark].notna()].ffill().iloc[-(window + 1):]
+    return closes.dropna(axis=1, how='all')
+
+def _none_if_nan(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+def compute_risk(closes, benchmark, exposures, groups, confidence=0.95):
+    """
+    Correlation matrix, beta against `benchmark` and historical VaR / CVaR.
+
+    `closes` comes from close_matrix; `exposures` maps position id ->
+    (ticker, dollars); `groups` maps group id -> list of position ids. VaR and
+    CVaR are one-day losses (positive dollars) at `confidence`, computed for the
+    whole portfolio and every group in one matrix product over the returns.
+    """
+    returns = closes.pct_change().iloc[1:]
+    tickers = [ticker for ticker in closes.columns if ticker != benchmark]
+    held = np.nan_to_num(returns[tickers].to_numpy(dtype=float))  # no close yet = no move
+    bench = returns[benchmark].to_numpy(dtype=float)
+    observations = len(returns)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centered = held - held.mean(axis=0)
+        bench_centered = bench - bench.mean()
+        beta = centered.T @ bench_centered / (bench_centered @ bench_centered)
+        correlation = np.corrcoef(held, rowvar=False) if tickers else np.empty((0, 0))
+    correlation = np.atleast_2d(correlation)
+    beta_by_ticker = dict(zip(tickers, beta))
+
+    # Scenario exposure matrix: row 0 is the portfolio, then one row per group
+    column = {ticker: index for index, ticker in enumerate(tickers)}
+    scenarios = ['portfolio'] + list(groups)
+    weights = np.zeros((len(scenarios), len(tickers)))
+    covered = set()
+    for position_id, (ticker, dollars) in exposures.items():
+        if ticker not in column:
+            continue
+        covered.add(position_id)
+        weights[0, column[ticker]] += dollars
+    for row, group_id in enumerate(groups, start=1):
+        for position_id in groups[group_id]:
+            if position_id in covered:
+                ticker, dollars = exposures[position_id]
+                weights[row, column[ticker]] += dollars
+
+    pnl = held @ weights.T  # observations x scenarios, daily dollar P/L
+    if observations:
+        threshold = np.quantile(pnl, 1 - confidence, axis=0)
+        tail = pnl <= threshold
+        var = -threshold
+        cvar = -(pnl * tail).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+    else:
+        var = cvar = np.full(len(scenarios), np.nan)
+    net_exposure = weights.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scenario_beta = (weights @ np.nan_to_num(beta)) / net_exposure
+
+    levels = {
+        scenario: {
+            'exposure': float(net_exposure[row]),
+            'beta': None if np.isnan(scenario_beta[row]) else float(scenario_beta[row]),
+            'var': None if np.isnan(var[row]) else float(var[row]),
+            'cvar': None if np.isnan(cvar[row]) else float(cvar[row])
+        }
+        for row, scenario in enumerate(scenarios)
+    }
+    return {
+        'benchmark': benchmark,
+        'confidence': confidence,
+        'observations': observations,
+        'start': closes.index[0] if len(closes) else None,
+        'end': closes.index[-1] if len(closes) else None,
+        'tickers': tickers,
+        'correlation': [_none_if_nan(row) for row in correlation] if tickers else [],
+        'beta': {ticker: None if np.isnan(value) else float(value) for ticker, value in beta_by_ticker.items()},
+        'position_beta': {
+            position_id: None if np.isnan(beta_by_ticker[ticker]) else float(beta_by_ticker[ticker])
+            for position_id, (ticker, _) in exposures.items() if ticker in beta_by_ticker
+        },
+        'portfolio': levels.pop('portfolio'),
+        'groups': levels,
+        'uncovered_positions': sorted(set(exposures) - covered)
+    }
+
+class RiskCache:
+    """Risk results per (account, snapshot version, parameters); evicts the oldest entries"""
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Global instance
+risk_cache = RiskCache()
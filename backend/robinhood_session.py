@@ -0,0 +1,87 @@
+import json
+import threading
+from datetime import datetime
+import robin_stocks.robinhood as r
+
+class RobinhoodSession:
+    """
+    Establishes the Robinhood session in a background thread so the server can
+    accept requests (and serve cached data) while login / MFA completes.
+    States: 'idle' -> 'logging_in' -> 'ready' | 'failed'
+    """
+    def __init__(self, secrets_file="robinhood_secrets.json"):
+        self.secrets_file = secrets_file
+        self.state = 'idle'
+        self.error = None
+        self.logged_in_at = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _login(self):
+        with open(self.secrets_file) as f:
+            secrets = json.load(f)
+
+        r.login(
+            username=secrets["USER"],
+            password=secrets["PASSWORD"],
+            store_session=True,
+            mfa_code=secrets["MY_2FA_APP_HERE"]
+        )
+
+    def _run(self):
+        try:
+            self._login()
+            with self._lock:
+                self.state = 'ready'
+                self.error = None
+                self.logged_in_at = datetime.now()
+            self._ready.set()
+            print("Robinhood login successful.")
+        except Exception as e:
+            with self._lock:
+                self.state = 'failed'
+                self.error = str(e)
+            print(f"CRITICAL: Robinhood login failed. {e}")
+            # The app will still run and serve cached data, but fresh fetches will fail.
+
+    def start(self, force=False):
+        """
+        Begin logging in in the background. Only the first call starts a login;
+        force=True retries after a failure or refreshes a ready session.
+        """
+        with self._lock:
+            if self.state == 'logging_in' or (self.state != 'idle' and not force):
+                return self._thread
+            self.state = 'logging_in'
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name='robinhood-login', daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def login(self):
+        """Log in synchronously (used by the re-login endpoint). Returns True on success."""
+        thread = self.start(force=True)
+        thread.join()
+        return self.state == 'ready'
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """Start login if it never ran and wait up to `timeout` seconds; returns readiness"""
+        # A failed login is not retried here (MFA); use /api/auth/login
+        self.start()
+        return self._ready.wait(timeout)
+
+    def status(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'ready': self._ready.is_set(),
+                'error': self.error,
+                'logged_in_at': self.logged_in_at.isoformat() if self.logged_in_at else None
+            }
+
+# Global instance
+robinhood_session = RobinhoodSession()
@@ -0,0 +1,152 @@
+import re
+import threading
+import numpy as np
+
+# Numeric columns of the index (NaN = unknown)
+NUMERIC_FIELDS = [
+    'price', 'pe_ratio',
+    'current_rsi', 'current_ps', 'ps_12m_min', 'ps_12m_max', 'pe_12m_min', 'pe_12m_max',
+    'ps_range_position', 'pe_range_position',
+    'one_week_change', 'one_month_change', 'three_month_change', 'one_year_change',
+    'yearly_revenue_change', 'revenue_growth_yoy'
+]
+TEXT_FIELDS = ['sector', 'industry']
+
+_CONDITION = re.compile(r'^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$')
+_NUMERIC_OPS = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    '==': np.equal, '=': np.equal, '!=': np.not_equal
+}
+
+class ScreenerQueryError(ValueError):
+    """Raised for conditions on unknown fields or with malformed values"""
+
+def parse_conditions(expression):
+    """'current_rsi<35, sector==Technology' -> [('current_rsi', '<', 35.0), ('sector', '==', 'Technology')]"""
+    conditions = []
+    for part in filter(None, (p.strip() for p in (expression or '').split(','))):
+        match = _CONDITION.match(part)
+        if not match:
+            raise ScreenerQueryError(f"Malformed condition: {part}")
+        field, op, value = match.groups()
+        if field in NUMERIC_FIELDS:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ScreenerQueryError(f"{field} needs a number, got {value}")
+        elif field in TEXT_FIELDS:
+            if op not in ('=', '==', '!='):
+                raise ScreenerQueryError(f"{field} only supports == and !=")
+        else:
+            raise ScreenerQueryError(f"Unknown field: {field}")
+        conditions.append((field, op, value))
+    return conditions
+
+def _range_position(current, low, high):
+    """Where `current` sits in its 12-month range, 0 (at the low) to 100 (at the high)"""
+    if current is None or low is None or high is None or high <= low:
+        return None
+    return (current - low) * 100 / (high - low)
+
+class ScreenerIndex:
+    """
+    In-memory columnar index over every ticker the backend has data for: one row
+    per ticker, one NumPy array per numeric field and dictionary-encoded integer
+    codes for sector / industry. Rows are updated in place as analytics,
+    historical data and portfolio refreshes come in, so queries are vectorized
+    comparisons over the arrays with no file reads.
+    """
+    def __init__(self, capacity=256):
+        self._rows = {}  # ticker -> row
+        self._tickers = []
+        self._numeric = {field: np.full(capacity, np.nan) for field in NUMERIC_FIELDS}
+        self._codes = {field: np.full(capacity, -1, dtype=np.int32) for field in TEXT_FIELDS}  # -1 = unknown
+        self._labels = {field: [] for field in TEXT_FIELDS}  # code -> text
+        self._label_codes = {field: {} for field in TEXT_FIELDS}  # text -> code
+        self._lock = threading.Lock()
+
+    def _row(self, ticker):
+        row = self._rows.get(ticker)
+        if row is None:
+            row = len(self._tickers)
+            capacity = len(self._numeric['price'])
+            if row == capacity:
+                for field, column in self._numeric.items():
+                    self._numeric[field] = np.concatenate([column, np.full(capacity, np.nan)])
+                for field, column in self._codes.items():
+                    self._codes[field] = np.concatenate([column, np.full(capacity, -1, dtype=np.int32)])
+            self._rows[ticker] = row
+            self._tickers.append(ticker)
+        return row
+
+    def update(self, ticker, fields):
+        """Set the given fields of a ticker's row; None / NaN values leave the current value alone"""
+        if not ticker:
+            return
+        ticker = ticker.upper()
+        with self._lock:
+            row = self._row(ticker)
+            for field, value in fields.items():
+                if value is None or value != value:
+                    continue
+                if field in self._numeric:
+                    self._numeric[field][row] = float(value)
+                elif field in self._codes:
+                    codes = self._label_codes[field]
+                    if value not in codes:
+                        codes[value] = len(self._labels[field])
+                        self._labels[field].append(value)
+                    self._codes[field][row] = codes[value]
+            # Derived: position within the 12-month P/S and P/E ranges
+            numeric = self._numeric
+            for prefix in ('ps', 'pe'):
+                current = numeric['current_ps'][row] if prefix == 'ps' else numeric['pe_ratio'][row]
+                position = _range_position(*(None if np.isnan(v) else float(v) for v in (
+                    current, numeric[f'{prefix}_12m_min'][row], numeric[f'{prefix}_12m_max'][row])))
+                numeric[f'{prefix}_range_position'][row] = np.nan if position is None else position
+
+    def _records(self, rows):
+        """Row dicts for the given row numbers, gathered column-wise (NaN / unknown as None)"""
+        columns = {'ticker': [self._tickers[row] for row in rows]}
+        for field, column in self._numeric.items():
+            values = column[rows]
+            columns[field] = np.where(np.isnan(values), None, values).tolist()
+        for field, column in self._codes.items():
+            labels = self._labels[field]
+            columns[field] = [labels[code] if code >= 0 else None for code in column[rows].tolist()]
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def query(self, conditions, sort=None, limit=50):
+        """
+        Tickers matching all (field, op, value) conditions. Rows with an unknown
+        value for a filtered field never match. `sort` is a field name, '-' prefix
+        for descending. Returns (total matches, list of row dicts).
+        """
+        with self._lock:
+            size = len(self._tickers)
+            mask = np.ones(size, dtype=bool)
+            for field, op, value in conditions:
+                if field in self._numeric:
+                    column = self._numeric[field][:size]
+                    with np.errstate(invalid='ignore'):
+                        mask &= _NUMERIC_OPS[op](column, value) & ~np.isnan(column)
+                else:
+                    codes = self._codes[field][:size]
+                    matches = codes == self._label_codes[field].get(value, -2)
+                    mask &= (~matches & (codes >= 0)) if op == '!=' else matches
+            rows = np.flatnonzero(mask)
+
+            if sort:
+                field = sort.lstrip('-')
+                if field not in self._numeric:
+                    raise ScreenerQueryError(f"Cannot sort by {field}")
+                keys = self._numeric[field][rows]
+                keys = -keys if sort.startswith('-') else keys
+                rows = rows[np.argsort(keys, kind='stable')]  # NaN sorts last
+            return len(rows), self._records(rows[:limit])
+
+    def __len__(self):
+        return len(self._tickers)
+
+# Global instance
+screener_index = ScreenerIndex()
@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+import tempfile
+from flask.json.provider import DefaultJSONProvider
+from keyed_locks import KeyedLocks
+
+# orjson and brotli are optional; fall back to the standard library when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def _default(obj):
+    """Fallback for types neither serializer handles natively (sets, Position rows, Decimals, ...)"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    return DefaultJSONProvider.default(obj)
+
+def dump_json_bytes(obj):
+    """Serialize to compact JSON bytes using the fastest available backend"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+def load_json(data):
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Per-path locks for JSON files. write_json takes the lock itself; hold it around
+# a read-modify-write (json_file_lock(path)) so concurrent updates aren't lost.
+# Only threads of this process are covered until app.py configures a lock_dir
+# (needed with several gunicorn workers).
+json_file_locks = KeyedLocks()
+
+def json_file_lock(path):
+    return json_file_locks.lock(os.path.abspath(path))
+
+def write_json(path, data, indent=False):
+    """
+    Atomically write a JSON file (compact unless indent=True): the data goes to a
+    temp file in the same directory, is fsynced, then renamed over `path`, so
+    readers see either the old or the new file and never a truncated one.
+    """
+    if indent:
+        if orjson is not None:
+            payload = orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(data, default=_default, indent=2).encode('utf-8')
+    else:
+        payload = dump_json_bytes(data)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with json_file_lock(path):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+def read_json(path):
+    """Read a JSON cache file. Raises json.JSONDecodeError (or a subclass) on bad content."""
+    with open(path, 'rb') as f:
+        return load_json(f.read())
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed"""
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dump_json_bytes(obj), mimetype=self.mimetype)
+
+def compress_response(response, accept_encoding, min_bytes=1024):
+    """
+    Compress a JSON response body with brotli or gzip if the client accepts it.
+    Streaming, already-encoded and small responses are left untouched.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300
+            or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accepted:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    return response
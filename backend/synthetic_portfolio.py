@@ -0,0 +1,541 @@
+"""
+Deterministic synthetic portfolio for scale testing.
+
+SyntheticPortfolio emits robin_stocks-shaped payloads (positions, instruments,
+fundamentals, quotes, option positions and market data, multi-leg option orders,
+stock orders) and yfinance-shaped histories and statements. It implements the
+fixture store interface from replay.py, so a ReplayHarness serves it through the
+existing cached fetch functions:
+
+    ReplayHarness(SyntheticPortfolio(positions=2000, option_orders=10000), mode='replay').install()
+
+or for the Flask app: REPLAY_MODE=synthetic REPLAY_SYNTHETIC=positions=2000,option_orders=10000
+"""
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+DEFAULT_ACCOUNTS = {'INDIVIDUAL': '1001', 'ROTH_IRA': '1002', 'TRADITIONAL_IRA': '1003'}
+SECTORS = {
+    'Technology': ['Software', 'Semiconductors', 'Hardware'],
+    'Health Care': ['Biotechnology', 'Medical Devices'],
+    'Finance': ['Banks', 'Insurance', 'Asset Management'],
+    'Energy': ['Oil & Gas', 'Renewables'],
+    'Consumer Cyclical': ['Retail', 'Autos'],
+    'Industrials': ['Aerospace', 'Machinery']
+}
+# Multi-leg option strategies held per underlying: (name, legs as (side, option_type, strike multiplier))
+OPTION_STRATEGIES = [
+    ('short_put', [('sell', 'put', 0.9)]),
+    ('covered_call', [('sell', 'call', 1.1)]),
+    ('put_credit_spread', [('sell', 'put', 0.92), ('buy', 'put', 0.85)]),
+    ('call_debit_spread', [('buy', 'call', 1.0), ('sell', 'call', 1.1)]),
+    ('iron_condor', [('sell', 'put', 0.9), ('buy', 'put', 0.85), ('sell', 'call', 1.1), ('buy', 'call', 1.15)])
+]
+HISTORY_DAYS = 800  # longest yfinance span requested by the app is 730 days
+SYNTHETIC_NAMESPACE = uuid.UUID('6f1c1d1e-8d52-4b8e-9d1a-5a2c9b7e0f10')
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+def synthetic_ticker(index):
+    """'T' + 4 base-36 digits; fits the 6-character OCC root with a separating space"""
+    digits = ''
+    for _ in range(4):
+        index, remainder = divmod(index, 36)
+        digits = BASE36[remainder] + digits
+    return 'T' + digits
+
+class SyntheticPortfolio:
+    """
+    Generates `positions` stock positions per account, with `overlap` of them
+    shared by every account (exercising the ALL-accounts merge), roughly
+    `option_positions` open option legs and `option_orders` historical option
+    orders per account. The same seed always produces the same payloads.
+    """
+    def __init__(self, positions=100, option_positions=None, option_orders=None, stock_orders=None,
+                 overlap=0.5, accounts=None, seed=7, as_of=None):
+        self.positions = positions
+        self.option_positions = positions // 4 if option_positions is None else option_positions
+        self.option_orders = positions * 10 if option_orders is None else option_orders
+        self.stock_orders = positions * 2 if stock_orders is None else stock_orders
+        self.overlap = overlap
+        self.accounts = dict(accounts or DEFAULT_ACCOUNTS)
+        self.seed = seed
+        self.as_of = (as_of or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        self._memo = {}
+        self._options = {}  # option_id -> contract dict
+        self._lock = threading.RLock()
+
+    # --- Helpers ---
+    def _rng(self, *parts):
+        return random.Random(f"{self.seed}:{':'.join(str(p) for p in parts)}")
+
+    def _id(self, *parts):
+        return str(uuid.uuid5(SYNTHETIC_NAMESPACE, f"{self.seed}:{':'.join(str(p) for p in parts)}"))
+
+    def _memoized(self, key, build):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = build()
+            return self._memo[key]
+
+    def _account_numbers(self):
+        return list(self.accounts.values())
+
+    def _normalize_account(self, account_number):
+        return (account_number or '').rstrip('/')
+
+    def tickers(self, account_number=None):
+        """Tickers held by an account (or the whole universe when account_number is None)"""
+        shared = int(self.positions * self.overlap)
+        unique = self.positions - shared
+        numbers = self._account_numbers()
+        if account_number is None:
+            return [synthetic_ticker(i) for i in range(shared + unique * len(numbers))]
+        index = numbers.index(self._normalize_account(account_number)) if self._normalize_account(account_number) in numbers else 0
+        start = shared + index * unique
+        return [synthetic_ticker(i) for i in range(shared)] + [synthetic_ticker(i) for i in range(start, start + unique)]
+
+    def latest_price(self, ticker):
+        return round(self._rng('price', ticker).uniform(5, 500), 2)
+
+    def _timestamp(self, rng, max_days_ago):
+        moment = self.as_of - timedelta(days=rng.uniform(0, max_days_ago))
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    # --- Daily bars shared by robin_stocks historicals and yfinance history ---
+    def daily_closes(self, ticker):
+        """[(date, close)] for business days up to as_of; the last close is the latest price"""
+        def build():
+            rng = self._rng('history', ticker)
+            dates = []
+            day = self.as_of
+            while len(dates) < HISTORY_DAYS * 5 // 7:
+                if day.weekday() < 5:
+                    dates.append(day)
+                day -= timedelta(days=1)
+            dates.reverse()
+            price = self.latest_price(ticker)
+            closes = [price]
+            for _ in dates[1:]:
+                price = max(0.5, price / (1 + rng.gauss(0.0003, 0.02)))
+                closes.append(round(price, 4))
+            closes.reverse()
+            return list(zip(dates, closes))
+        return self._memoized(('closes', ticker), build)
+
+    # --- robin_stocks payloads ---
+    def instrument(self, ticker):
+        return {
+            'id': self._id('instrument', ticker),
+            'url': f"https://api.robinhood.com/instruments/{self._id('instrument', ticker)}/",
+            'symbol': ticker,
+            'name': f"{ticker} Holdings Inc.",
+            'simple_name': f"{ticker} Holdings",
+            'type': 'stock',
+            'tradeable': True,
+            'country': 'US'
+        }
+
+    def _instrument_by_url(self, url):
+        def build():
+            return {self.instrument(ticker)['url']: ticker for ticker in self.tickers()}
+        ticker = self._memoized(('instrument_urls',), build).get(url)
+        return self.instrument(ticker) if ticker else None
+
+    def fundamentals(self, ticker):
+        rng = self._rng('fundamentals', ticker)
+        price = self.latest_price(ticker)
+        sector = rng.choice(sorted(SECTORS))
+        shares = rng.randint(10**7, 10**10)
+        return {
+            'symbol': ticker,
+            'open': str(round(price * rng.uniform(0.98, 1.02), 4)),
+            'high': str(round(price * 1.02, 4)),
+            'low': str(round(price * 0.98, 4)),
+            'volume': str(rng.randint(10**5, 10**8)),
+            'average_volume': str(rng.randint(10**5, 10**8)),
+            'high_52_weeks': str(round(price * rng.uniform(1.05, 1.6), 4)),
+            'low_52_weeks': str(round(price * rng.uniform(0.4, 0.95), 4)),
+            'dividend_yield': str(round(rng.uniform(0, 4), 4)),
+            'market_cap': str(round(price * shares, 2)),
+            'shares_outstanding': str(shares),
+            'pe_ratio': str(round(rng.uniform(5, 80), 4)),
+            'pb_ratio': str(round(rng.uniform(0.5, 20), 4)),
+            'sector': sector,
+            'industry': rng.choice(SECTORS[sector]),
+            'description': f"{ticker} is a synthetic company used for scale testing."
+        }
+
+    def stock_positions(self, account_number):
+        account_number = self._normalize_account(account_number)
+        def build():
+            rng = self._rng('positions', account_number)
+            positions = []
+            for ticker in self.tickers(account_number):
+                instrument = self.instrument(ticker)
+                positions.append({
+                    'account_number': account_number,
+                    'instrument': instrument['url'],
+                    'instrument_id': instrument['id'],
+                    'symbol': ticker,
+                    'quantity': f"{rng.randint(1, 500)}.00000000",
+                    'average_buy_price': f"{self.latest_price(ticker) * rng.uniform(0.6, 1.3):.4f}",
+                    'shares_held_for_sells': '0.00000000',
+                    'type': 'long',
+                    'created_at': self._timestamp(rng, 1500),
+                    'updated_at': self._timestamp(rng, 30)
+                })
+            return positions
+        return self._memoized(('stock_positions', account_number), build)
+
+    def _contract(self, ticker, expiry, option_type, strike):
+        option_id = self._id('option', ticker, expiry.date(), option_type, strike)
+        with self._lock:
+            self._options[option_id] = {'id': option_id, 'chain_symbol': ticker, 'expiration_date': expiry,
+                                        'type': option_type, 'strike_price': strike}
+        return option_id
+
+    def option_positions_for(self, account_number):
+        """Open option legs, built from multi-leg strategies on the account's tickers"""
+        account_number = self._normalize_account(account_number)
+        def build():
+            rng = self._rng('option_positions', account_number)
+            tickers = self.tickers(account_number)
+            legs = []
+            while tickers and len(legs) < self.option_positions:
+                ticker = rng.choice(tickers)
+                _, strategy_legs = rng.choice(OPTION_STRATEGIES)
+                expiry = self.as_of + timedelta(days=rng.choice([3, 10, 17, 31, 45, 73, 180]))
+                while expiry.weekday() != 4:
+                    expiry += timedelta(days=1)
+                contracts = rng.randint(1, 10)
+                price = self.latest_price(ticker)
+                for side, option_type, multiplier in strategy_legs:
+                    strike = max(0.5, round(price * multiplier * 2) / 2)
+                    option_id = self._contract(ticker, expiry, option_type, strike)
+                    premium = rng.uniform(0.05, 0.08) * price * 100
+                    legs.append({
+                        'account_number': account_number,
+                        'chain_id': self._id('chain', ticker),
+                        'chain_symbol': ticker,
+                        'id': self._id('option_position', account_number, option_id),
+                        'option': f"https://api.robinhood.com/options/instruments/{option_id}/",
+                        'option_id': option_id,
+                        'type': 'short' if side == 'sell' else 'long',
+                        'quantity': f"{contracts}.0000",
+                        'average_price': f"{-premium if side == 'sell' else premium:.4f}",
+                        'trade_value_multiplier': '100.0000',
+                        'pending_buy_quantity': '0.0000',
+                        'pending_sell_quantity': '0.0000',
+                        'created_at': self._timestamp(rng, 60),
+                        'updated_at': self._timestamp(rng, 5)
+                    })
+            return legs[:max(self.option_positions, 0)]
+        return self._memoized(('option_positions', account_number), build)
+
+    def option_market_data(self, option_id):
+        contract = self._options.get(option_id)
+        if contract is None:
+            # Market data may be requested before positions were generated (e.g. from a cold cache)
+            for account_number in self._account_numbers():
+                self.option_positions_for(account_number)
+            contract = self._options.get(option_id)
+        if contract is None:
+            return [None]
+        rng = self._rng('market_data', option_id)
+        ticker, strike, option_type = contract['chain_symbol'], contract['strike_price'], contract['type']
+        price = self.latest_price(ticker)
+        intrinsic = max(0.0, price - strike) if option_type == 'call' else max(0.0, strike - price)
+        days = max((contract['expiration_date'] - self.as_of).days, 1)
+        mark = round(intrinsic + price * rng.uniform(0.005, 0.02) * (days / 30) ** 0.5, 2)
+        delta = rng.uniform(0.05, 0.95) * (1 if option_type == 'call' else -1)
+        occ_symbol = f"{ticker:<6}{contract['expiration_date'].strftime('%y%m%d')}{option_type[0].upper()}{int(round(strike * 1000)):08d}"
+        return [{
+            'instrument': f"https://api.robinhood.com/options/instruments/{option_id}/",
+            'instrument_id': option_id,
+            'symbol': ticker,
+            'occ_symbol': occ_symbol,
+            'mark_price': f"{mark:.6f}",
+            'adjusted_mark_price': f"{mark:.6f}",
+            'bid_price': f"{max(mark - 0.05, 0.01):.6f}",
+            'ask_price': f"{mark + 0.05:.6f}",
+            'previous_close_price': f"{mark * rng.uniform(0.9, 1.1):.6f}",
+            'implied_volatility': f"{rng.uniform(0.15, 1.2):.6f}",
+            'delta': f"{delta:.6f}",
+            'gamma': f"{rng.uniform(0.001, 0.1):.6f}",
+            'theta': f"{-rng.uniform(0.01, 0.5):.6f}",
+            'vega': f"{rng.uniform(0.01, 0.5):.6f}",
+            'rho': f"{rng.uniform(-0.1, 0.1):.6f}",
+            'open_interest': rng.randint(0, 50000),
+            'volume': rng.randint(0, 20000),
+            'chance_of_profit_long': f"{rng.uniform(0, 1):.6f}",
+            'chance_of_profit_short': f"{rng.uniform(0, 1):.6f}",
+            'updated_at': self.as_of.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }]
+
+    def option_order_history(self, account_number):
+        """Historical multi-leg option orders, newest first like the Robinhood API"""
+        account_number = self._normalize_account(account_number)
+        def build():
+            rng = self._rng('option_orders', account_number)
+            tickers = self.tickers(account_number)
+            orders = []
+            for i in range(self.option_orders if tickers else 0):
+                ticker = rng.choice(tickers)
+                strategy, strategy_legs = rng.choice(OPTION_STRATEGIES)
+                closing = rng.random() < 0.35
+                updated_at = self._timestamp(rng, 1500)
+                expiry = datetime.strptime(updated_at[:10], '%Y-%m-%d') + timedelta(days=rng.choice([7, 14, 30, 45]))
+                contracts = rng.randint(1, 10)
+                price = self.latest_price(ticker) * rng.uniform(0.6, 1.4)
+                legs = []
+                for leg_index, (side, option_type, multiplier) in enumerate(strategy_legs):
+                    if closing:
+                        side = 'buy' if side == 'sell' else 'sell'
+                    strike = max(0.5, round(price * multiplier * 2) / 2)
+                    legs.append({
+                        'id': self._id('leg', account_number, i, leg_index),
+                        'option': f"https://api.robinhood.com/options/instruments/{self._id('option', ticker, expiry.date(), option_type, strike)}/",
+                        'side': side,
+                        'position_effect': 'close' if closing else 'open',
+                        'ratio_quantity': 1,
+                        'option_type': option_type,
+                        'strike_price': f"{strike:.4f}",
+                        'expiration_date': expiry.strftime('%Y-%m-%d')
+                    })
+                credit = sum(1 for leg in legs if leg['side'] == 'sell') >= sum(1 for leg in legs if leg['side'] == 'buy')
+                direction = 'credit' if credit else 'debit'
+                unit_price = round(price * rng.uniform(0.005, 0.04), 2)
+                state = rng.choices(['filled', 'cancelled', 'rejected'], weights=[85, 13, 2])[0]
+                orders.append({
+                    'id': self._id('option_order', account_number, i),
+                    'account_number': account_number,
+                    'chain_id': self._id('chain', ticker),
+                    'chain_symbol': ticker,
+                    'state': state,
+                    'type': 'limit',
+                    'time_in_force': 'gfd',
+                    'trigger': 'immediate',
+                    'direction': direction,
+                    'net_amount_direction': direction,
+                    'price': f"{unit_price:.8f}",
+                    'premium': f"{unit_price * 100:.8f}",
+                    'processed_premium': f"{unit_price * 100 * contracts:.8f}" if state == 'filled' else '0.00000000',
+                    'net_amount': f"{unit_price * 100 * contracts:.2f}" if state == 'filled' else '0.00',
+                    'quantity': f"{contracts}.00000",
+                    'processed_quantity': f"{contracts}.00000" if state == 'filled' else '0.00000',
+                    'opening_strategy': None if closing else strategy,
+                    'closing_strategy': strategy if closing else None,
+                    'legs': legs,
+                    'created_at': updated_at,
+                    'updated_at': updated_at
+                })
+            orders.sort(key=lambda order: order['updated_at'], reverse=True)
+            return orders
+        return self._memoized(('option_orders', account_number), build)
+
+    def stock_order_history(self, account_number):
+        account_number = self._normalize_account(account_number)
+        def build():
+            rng = self._rng('stock_orders', account_number)
+            tickers = self.tickers(account_number)
+            orders = []
+            for i in range(self.stock_orders if tickers else 0):
+                ticker = rng.choice(tickers)
+                state = rng.choices(['filled', 'cancelled'], weights=[90, 10])[0]
+                quantity = rng.randint(1, 200)
+                price = self.latest_price(ticker) * rng.uniform(0.6, 1.4)
+                updated_at = self._timestamp(rng, 1500)
+                filled = state == 'filled'
+                orders.append({
+                    'id': self._id('stock_order', account_number, i),
+                    'account_number': account_number,
+                    'instrument': self.instrument(ticker)['url'],
+                    'instrument_id': self.instrument(ticker)['id'],
+                    'state': state,
+                    'side': rng.choice(['buy', 'buy', 'sell']),
+                    'type': rng.choice(['market', 'limit']),
+                    'time_in_force': 'gfd',
+                    'quantity': f"{quantity}.00000000",
+                    'cumulative_quantity': f"{quantity}.00000000" if filled else '0.00000000',
+                    'price': f"{price:.4f}",
+                    'average_price': f"{price:.4f}" if filled else None,
+                    'executed_notional': {'amount': f"{price * quantity:.2f}", 'currency_code': 'USD'} if filled else None,
+                    'created_at': updated_at,
+                    'updated_at': updated_at
+                })
+            orders.sort(key=lambda order: order['updated_at'], reverse=True)
+            return orders
+        return self._memoized(('stock_orders', account_number), build)
+
+    def account_profile(self, account_number):
+        rng = self._rng('account', self._normalize_account(account_number))
+        cash = rng.uniform(1000, 50000)
+        return {
+            'account_number': self._normalize_account(account_number),
+            'cash': f"{cash:.4f}",
+            'uncleared_deposits': f"{rng.choice([0, 0, 0, 500]):.4f}",
+            'buying_power': f"{cash:.4f}",
+            'type': 'margin'
+        }
+
+    def portfolio_profile(self, account_number):
+        account_number = self._normalize_account(account_number)
+        def build():
+            equity = float(self.account_profile(account_number)['cash'])
+            equity += sum(float(pos['quantity']) * self.latest_price(pos['symbol']) for pos in self.stock_positions(account_number))
+            for leg in self.option_positions_for(account_number):
+                mark = float(self.option_market_data(leg['option_id'])[0]['mark_price'])
+                equity += float(leg['quantity']) * mark * 100 * (-1 if leg['type'] == 'short' else 1)
+            previous = equity / (1 + self._rng('day_change', account_number).gauss(0, 0.01))
+            return {
+                'account': f"https://api.robinhood.com/accounts/{account_number}/",
+                'equity': f"{equity:.4f}",
+                'extended_hours_equity': None,
+                'market_value': f"{equity:.4f}",
+                'adjusted_portfolio_equity_previous_close': f"{previous:.4f}",
+                'equity_previous_close': f"{previous:.4f}"
+            }
+        return self._memoized(('portfolio_profile', account_number), build)
+
+    def phoenix_account(self):
+        return {'results': [{
+            'account_number': number,
+            'crypto': {'equity': {'amount': f"{self._rng('crypto', number).choice([0, 0, 1234.5]):.2f}", 'currency_code': 'USD'}}
+        } for number in self._account_numbers()]}
+
+    def stock_historicals(self, ticker, span='week'):
+        bars = self.daily_closes(ticker)[-{'day': 1, 'week': 5, 'month': 22, '3month': 66, 'year': 252, '5year': 1260}.get(span, 5):]
+        rng = self._rng('bars', ticker)
+        return [{
+            'begins_at': day.strftime('%Y-%m-%dT00:00:00Z'),
+            'open_price': f"{close * rng.uniform(0.99, 1.01):.4f}",
+            'close_price': f"{close:.4f}",
+            'high_price': f"{close * 1.015:.4f}",
+            'low_price': f"{close * 0.985:.4f}",
+            'volume': rng.randint(10**5, 10**7),
+            'session': 'reg',
+            'interpolated': False,
+            'symbol': ticker
+        } for day, close in bars]
+
+    # --- yfinance payloads ---
+    def yf_history(self, symbol, span_days):
+        import pandas as pd
+        def build():
+            cutoff = self.as_of - timedelta(days=span_days or 730)
+            rows = [(day, close) for day, close in self.daily_closes(symbol) if day >= cutoff]
+            index = pd.DatetimeIndex([day for day, _ in rows], name='Date').tz_localize('America/New_York')
+            closes = [close for _, close in rows]
+            return pd.DataFrame({
+                'Open': closes, 'High': [c * 1.015 for c in closes], 'Low': [c * 0.985 for c in closes],
+                'Close': closes, 'Volume': [1_000_000] * len(closes), 'Dividends': 0.0, 'Stock Splits': 0.0
+            }, index=index)
+        return self._memoized(('yf_history', symbol, span_days), build)
+
+    def yf_info(self, symbol):
+        fundamentals = self.fundamentals(symbol)
+        return {
+            'symbol': symbol,
+            'longName': f"{symbol} Holdings Inc.",
+            'sector': fundamentals['sector'],
+            'industry': fundamentals['industry'],
+            'sharesOutstanding': int(fundamentals['shares_outstanding']),
+            'marketCap': float(fundamentals['market_cap']),
+            'trailingPE': float(fundamentals['pe_ratio']),
+            'beta': round(self._rng('beta', symbol).uniform(0.3, 2.0), 3),
+            'currentPrice': self.latest_price(symbol)
+        }
+
+    def yf_statement(self, symbol, periods, period_days):
+        import pandas as pd
+        def build():
+            rng = self._rng('statement', symbol, period_days)
+            columns = [pd.Timestamp(self.as_of - timedelta(days=period_days * i + 45)) for i in range(periods)]
+            revenue = rng.uniform(1e8, 1e10) * period_days / 365
+            revenues = []
+            for _ in columns:  # newest first, like yfinance
+                revenues.append(revenue)
+                revenue /= 1 + rng.gauss(0.02, 0.05)
+            margins = [rng.uniform(-0.05, 0.25) for _ in columns]
+            net_income = [r * m for r, m in zip(revenues, margins)]
+            return pd.DataFrame(
+                [revenues, net_income, net_income],
+                index=['Total Revenue', 'Net Income', 'Net Income Common Stockholders'],
+                columns=columns
+            )
+        return self._memoized(('yf_statement', symbol, periods, period_days), build)
+
+    def yf_balance_sheet(self, symbol):
+        import pandas as pd
+        statement = self.yf_statement(symbol, 8, 91)
+        return pd.DataFrame(
+            [[value * 3 for value in statement.loc['Total Revenue']], [value * 1.2 for value in statement.loc['Total Revenue']]],
+            index=['Total Assets', 'Stockholders Equity'],
+            columns=statement.columns
+        )
+
+    # --- Fixture store interface (see replay.ReplayHarness) ---
+    def _per_symbol(self, value, func):
+        """robin_stocks accepts a symbol or a list of symbols for quote-style calls"""
+        if isinstance(value, (list, tuple)):
+            return [item for symbol in value for item in func(symbol)]
+        return func(value)
+
+    def get(self, provider, name, args, kwargs):
+        if provider == 'yfinance':
+            symbol = args[0]
+            if name == 'history':
+                return self.yf_history(symbol, args[1])
+            if name == 'info':
+                return self.yf_info(symbol)
+            if name == 'financials':
+                return self.yf_statement(symbol, 4, 365)
+            if name in ('quarterly_income_stmt', 'quarterly_financials'):
+                return self.yf_statement(symbol, 8, 91)
+            if name == 'quarterly_balance_sheet':
+                return self.yf_balance_sheet(symbol)
+            raise KeyError(f"No synthetic fixture for yfinance.{name}")
+
+        account_number = kwargs.get('account_number')
+        first = args[0] if args else kwargs.get('inputSymbols', kwargs.get('symbol'))
+        if name == 'load_portfolio_profile':
+            return self.portfolio_profile(account_number)
+        if name == 'load_account_profile':
+            return self.account_profile(account_number)
+        if name == 'load_phoenix_account':
+            return self.phoenix_account()
+        if name == 'get_open_stock_positions':
+            return self.stock_positions(account_number)
+        if name == 'get_instrument_by_url':
+            return self._instrument_by_url(first)
+        if name == 'get_fundamentals':
+            return self._per_symbol(first, lambda symbol: [self.fundamentals(symbol)])
+        if name == 'get_latest_price':
+            return self._per_symbol(first, lambda symbol: [f"{self.latest_price(symbol):.6f}"])
+        if name == 'get_name_by_symbol':
+            return self.instrument(first)['simple_name']
+        if name == 'get_stock_historicals':
+            return self._per_symbol(first, lambda symbol: self.stock_historicals(symbol, kwargs.get('span', 'week')))
+        if name == 'get_open_option_positions':
+            return self.option_positions_for(account_number)
+        if name == 'get_option_market_data_by_id':
+            return self.option_market_data(first)
+        if name == 'get_all_option_orders':
+            return self.option_order_history(account_number)
+        if name == 'get_all_stock_orders':
+            return self.stock_order_history(account_number)
+        raise KeyError(f"No synthetic fixture for robinhood.{name}")
+
+    def put(self, provider, name, args, kwargs, value):
+        raise NotImplementedError("SyntheticPortfolio is read-only")
+
+def parse_synthetic_spec(spec):
+    """'positions=2000,option_orders=10000,overlap=0.3' -> SyntheticPortfolio keyword arguments"""
+    kwargs = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            kwargs[key.strip()] = float(value) if key.strip() == 'overlap' else int(value)
+    return kwargs
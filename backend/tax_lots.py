@@ -0,0 +1,319 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+from serialization import read_json, write_json
+
+LONG_TERM_DAYS = 365
+WASH_SALE_DAYS = 30
+TERMINAL_STATES = ('filled', 'cancelled', 'canceled', 'rejected', 'failed', 'expired')
+
+def _empty_bucket():
+    return {'short_term': 0.0, 'long_term': 0.0, 'wash_sale_loss': 0.0, 'closes': 0}
+
+def _empty_state(method):
+    return {
+        'method': method,
+        'cursor': {'timestamp': None, 'ids': []},
+        'positions': {},  # key -> {'ticker', 'multiplier', 'expiry', 'lots': [[signed qty, price, 'YYYY-MM-DD']]}
+        'aggregates': {'total': _empty_bucket(), 'years': {}, 'tickers': {}, 'year_tickers': {}},
+        'recent_buys': {},  # ticker -> buy dates within the wash-sale window
+        'recent_losses': {},  # ticker -> [[sale date, loss]] not yet matched to a replacement buy
+        'wash_sales': [],
+        'last_trade_date': None,
+        'orders_processed': 0
+    }
+
+def _order_time(order):
+    return order.get('last_transaction_at') or order.get('updated_at') or ''
+
+def _leg_price(order, leg):
+    """Per-share price of one option leg: its executions, else the order price split over the paying legs"""
+    executions = leg.get('executions') or []
+    filled = sum(float(e.get('quantity') or 0) for e in executions)
+    if filled:
+        return sum(float(e['price']) * float(e['quantity']) for e in executions) / filled
+    legs = order['legs']
+    price = float(order.get('price') or 0)
+    # Multi-leg fills without executions only report the net: it belongs to the
+    # legs on the order's credit (sell) or debit (buy) side
+    paying_side = 'sell' if order.get('direction') == 'credit' else 'buy'
+    paying = [l for l in legs if l.get('side') == paying_side] or legs
+    return price / len(paying) if leg in paying else 0.0
+
+def stock_trades(order, symbol):
+    """[(key, ticker, signed quantity, price, multiplier, expiry)] for a stock order"""
+    quantity = float(order.get('cumulative_quantity') or 0)
+    price = order.get('average_price') or order.get('price')
+    if not quantity or price is None:
+        return []
+    signed = quantity if order.get('side') == 'buy' else -quantity
+    return [(symbol, symbol, signed, float(price), 1, None)]
+
+def option_trades(order):
+    """One trade per leg of an option order, keyed by contract"""
+    quantity = float(order.get('processed_quantity') or 0)
+    ticker = order.get('chain_symbol')
+    if not quantity or not ticker:
+        return []
+    trades = []
+    for leg in order.get('legs') or []:
+        leg_quantity = quantity * float(leg.get('ratio_quantity') or 1)
+        signed = leg_quantity if leg.get('side') == 'buy' else -leg_quantity
+        strike = float(leg.get('strike_price') or 0)
+        key = f"{ticker} {leg.get('expiration_date')} {strike:.2f} {leg.get('option_type')}"
+        trades.append((key, ticker, signed, _leg_price(order, leg), 100, leg.get('expiration_date')))
+    return trades
+
+class LotLedger:
+    """
+    Tax lots and realized P/L of one account, built incrementally from its
+    orders. Lots are matched FIFO or LIFO per ticker (per contract for options);
+    sells beyond the held quantity open short lots. Realized gains are added to
+    running aggregates by year, ticker and year x ticker as closes happen, so
+    reads are dictionary lookups. Option lots still open after their expiration
+    date are closed at zero; exercise and assignment are not visible in orders.
+    Loss sales with a buy of the same stock within 30 days either side are
+    flagged as wash sales (the loss is reported, the basis is not adjusted).
+    """
+    def __init__(self, state):
+        self.state = state
+
+    def _bucket(self, *path):
+        node = self.state['aggregates']
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        return node.setdefault(path[-1], _empty_bucket())
+
+    def _realize(self, ticker, amount, opened, closed):
+        term = 'long_term' if (date.fromisoformat(closed) - date.fromisoformat(opened)).days > LONG_TERM_DAYS else 'short_term'
+        year = closed[:4]
+        for bucket in (self.state['aggregates']['total'], self._bucket('years', year),
+                       self._bucket('tickers', ticker), self._bucket('year_tickers', year, ticker)):
+            bucket[term] += amount
+            bucket['closes'] += 1
+
+    def _flag_wash_sale(self, ticker, sale_date, loss, replacement_date):
+        self.state['wash_sales'].append({
+            'ticker': ticker, 'sale_date': sale_date, 'loss': loss, 'replacement_date': replacement_date
+        })
+        year = sale_date[:4]
+        for bucket in (self.state['aggregates']['total'], self._bucket('years', year),
+                       self._bucket('tickers', ticker), self._bucket('year_tickers', year, ticker)):
+            bucket['wash_sale_loss'] += loss
+
+    def _prune_wash_window(self, ticker, trade_date):
+        cutoff = (date.fromisoformat(trade_date) - timedelta(days=WASH_SALE_DAYS)).isoformat()
+        buys = [d for d in self.state['recent_buys'].get(ticker, []) if d >= cutoff]
+        losses = [l for l in self.state['recent_losses'].get(ticker, []) if l[0] >= cutoff]
+        self.state['recent_buys'][ticker] = buys
+        self.state['recent_losses'][ticker] = losses
+        return buys, losses
+
+    def apply_trade(self, key, ticker, quantity, price, multiplier, expiry, trade_date):
+        """Match a signed quantity (+ buy, - sell) against the open lots of `key`"""
+        position = self.state['positions'].setdefault(
+            key, {'ticker': ticker, 'multiplier': multiplier, 'expiry': expiry, 'lots': []})
+        lots = position['lots']
+        lifo = self.state['method'] == 'lifo'
+        realized_loss = 0.0
+        opened_dates = set()
+        while quantity and lots:
+            index = -1 if lifo else 0
+            lot = lots[index]
+            if (lot[0] > 0) == (quantity > 0):
+                break  # same direction: nothing to close
+            closed = min(abs(quantity), abs(lot[0]))
+            direction = 1 if lot[0] > 0 else -1
+            amount = (price - lot[1]) * closed * multiplier * direction
+            self._realize(ticker, amount, lot[2], trade_date)
+            if amount < 0:
+                realized_loss += -amount
+                opened_dates.add(lot[2])
+            lot[0] -= closed * direction
+            quantity += closed * direction
+            if abs(quantity) < 1e-9:
+                quantity = 0
+            if abs(lot[0]) < 1e-9:
+                lots.pop(index)
+        if quantity:
+            lots.append([quantity, price, trade_date])
+        if not lots:
+            del self.state['positions'][key]
+
+        if expiry is not None:
+            return  # wash-sale tracking covers stock trades
+        buys, losses = self._prune_wash_window(ticker, trade_date)
+        if realized_loss:
+            replacement = next((d for d in buys if d not in opened_dates), None)
+            if replacement:
+                self._flag_wash_sale(ticker, trade_date, realized_loss, replacement)
+            else:
+                losses.append([trade_date, realized_loss])
+        if quantity > 0:
+            buys.append(trade_date)
+            for loss in losses:
+                self._flag_wash_sale(ticker, loss[0], loss[1], trade_date)
+            losses.clear()
+
+    def expire_options(self, as_of):
+        """Close option lots whose expiration date is before `as_of` (ISO date) at zero; returns how many"""
+        expired = 0
+        for key, position in list(self.state['positions'].items()):
+            expiry = position['expiry']
+            if expiry and expiry < as_of:
+                for quantity, price, opened in position['lots']:
+                    self._realize(position['ticker'], -price * quantity * position['multiplier'], opened, expiry)
+                del self.state['positions'][key]
+                expired += 1
+        return expired
+
+    def is_new(self, order):
+        """True if the order comes after the cursor (not applied yet)"""
+        cursor = self.state['cursor']
+        timestamp = _order_time(order)
+        if not cursor['timestamp'] or timestamp > cursor['timestamp']:
+            return True
+        return timestamp == cursor['timestamp'] and order.get('id') not in cursor['ids']
+
+    def apply_orders(self, orders):
+        """
+        Consume (order, trades) pairs sorted by transaction time (see
+        sort_orders), skipping orders at or before the cursor. Returns the number
+        of orders applied.
+        """
+        cursor = self.state['cursor']
+        applied = 0
+        for order, trades in orders:
+            if not self.is_new(order):
+                continue
+            timestamp = _order_time(order)
+            trade_date = timestamp[:10]
+            if trade_date != self.state['last_trade_date']:
+                self.expire_options(trade_date)
+                self.state['last_trade_date'] = trade_date
+            for trade in trades:
+                self.apply_trade(*trade, trade_date)
+            if timestamp != cursor['timestamp']:
+                cursor['timestamp'] = timestamp
+                cursor['ids'] = []
+            cursor['ids'].append(order.get('id'))
+            applied += 1
+        self.state['orders_processed'] += applied
+        return applied
+
+    def open_lots(self, ticker=None):
+        return {
+            key: position for key, position in self.state['positions'].items()
+            if ticker is None or position['ticker'] == ticker
+        }
+
+    def summary(self, year=None, ticker=None):
+        """Realized P/L from the maintained aggregates, narrowed to a year and/or ticker"""
+        aggregates = self.state['aggregates']
+        result = {
+            'method': self.state['method'],
+            'total': aggregates['total'],
+            'years': aggregates['years'],
+            'orders_processed': self.state['orders_processed'],
+            'cursor': self.state['cursor']['timestamp']
+        }
+        if year and ticker:
+            result['realized'] = aggregates['year_tickers'].get(year, {}).get(ticker, _empty_bucket())
+        elif year:
+            result['realized'] = aggregates['years'].get(year, _empty_bucket())
+            result['tickers'] = aggregates['year_tickers'].get(year, {})
+        elif ticker:
+            result['realized'] = aggregates['tickers'].get(ticker, _empty_bucket())
+        else:
+            result['tickers'] = aggregates['tickers']
+        if ticker:
+            result['open_lots'] = self.open_lots(ticker)
+        result['wash_sales'] = [
+            sale for sale in self.state['wash_sales']
+            if (not ticker or sale['ticker'] == ticker) and (not year or sale['sale_date'].startswith(year))
+        ]
+        return result
+
+def sort_orders(orders):
+    """(order, trades) pairs in the order the ledger consumes them"""
+    return sorted(orders, key=lambda item: (_order_time(item[0]), item[0].get('id') or ''))
+
+def is_filled(order, quantity_field):
+    """Orders in a final state with some quantity executed (including partially filled cancels)"""
+    return order.get('state') in TERMINAL_STATES and float(order.get(quantity_field) or 0) > 0
+
+def merge_buckets(buckets):
+    merged = _empty_bucket()
+    for bucket in buckets:
+        for field in merged:
+            merged[field] += bucket.get(field, 0)
+    return merged
+
+class TaxLotStore:
+    """
+    Ledger state per account, persisted as <cache>/<ACCOUNT>/tax_lots.json and
+    kept in memory; reloaded if another worker process rewrote the file.
+    """
+    def __init__(self, cache_directory='../cache', method='fifo', sync_interval_seconds=300):
+        self.cache_directory = cache_directory
+        self.method = method
+        self.sync_interval_seconds = sync_interval_seconds
+        self._ledgers = {}  # account -> (ledger, file mtime)
+        self._synced_at = {}  # account -> datetime of the last order fetch
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def configure(self, cache_directory=None, method=None, sync_interval_seconds=None):
+        if cache_directory is not None:
+            self.cache_directory = cache_directory
+        if method is not None:
+            self.method = method
+        if sync_interval_seconds is not None:
+            self.sync_interval_seconds = sync_interval_seconds
+
+    def lock(self, account_name):
+        with self._guard:
+            return self._locks.setdefault(account_name, threading.Lock())
+
+    def _path(self, account_name):
+        return os.path.join(self.cache_directory, account_name, 'tax_lots.json')
+
+    def ledger(self, account_name):
+        path = self._path(account_name)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = self._ledgers.get(account_name)
+        if cached and cached[1] == mtime and cached[0].state['method'] == self.method:
+            return cached[0]
+        state = None
+        if mtime is not None:
+            try:
+                state = read_json(path)
+            except ValueError as e:
+                print(f"Warning: Could not read {path}. Rebuilding lots. Error: {e}")
+        # A different matching method means every lot changes: rebuild from the first order
+        if not state or state.get('method') != self.method:
+            state = _empty_state(self.method)
+        ledger = LotLedger(state)
+        self._ledgers[account_name] = (ledger, mtime)
+        return ledger
+
+    def save(self, account_name, ledger):
+        path = self._path(account_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json(path, ledger.state)
+        self._ledgers[account_name] = (ledger, os.path.getmtime(path))
+
+    def needs_sync(self, account_name):
+        synced_at = self._synced_at.get(account_name)
+        return synced_at is None or (datetime.now() - synced_at).total_seconds() >= self.sync_interval_seconds
+
+    def mark_synced(self, account_name):
+        self._synced_at[account_name] = datetime.now()
+
+    def cursor_date(self, account_name):
+        """Start date for the order fetch: the cursor's day (orders before it are already applied)"""
+        timestamp = self.ledger(account_name).state['cursor']['timestamp']
+        return timestamp[:10] if timestamp else None
+
+# Global instance
+tax_lot_store = TaxLotStore()
@@ -0,0 +1 @@
+"""Unit tests for the backend modules (the pipeline benchmarks live in benchmarks/)"""
@@ -0,0 +1,42 @@
+import math
+from datetime import date, timedelta
+import pytest
+from downsampling import lttb_indices, downsample_series, slice_series
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 7), (1000, 500), (1001, 1000), (5000, 1200)])
+def test_keeps_endpoints_and_at_most_threshold_points(n, threshold):
+    xs = list(range(n))
+    ys = [math.sin(x / 10) for x in xs]
+    indices = lttb_indices(xs, ys, threshold)
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert len(indices) == threshold
+    assert all(a < b for a, b in zip(indices, indices[1:]))
+
+def test_small_inputs_and_thresholds():
+    assert lttb_indices([0, 1, 2], [1, 2, 3], 5) == [0, 1, 2]
+    assert lttb_indices([0, 1, 2], [1, 2, 3], 0) == [0, 1, 2]
+    assert lttb_indices(list(range(10)), [0] * 10, 2) == [0, 9]
+    assert lttb_indices(list(range(10)), [0] * 10, 1) == [0]
+    assert lttb_indices([], [], 10) == []
+
+def test_keeps_a_spike():
+    ys = [1.0] * 100
+    ys[42] = 50.0
+    assert 42 in lttb_indices(list(range(100)), ys, 10)
+
+def series(days):
+    start = date(2026, 1, 1)
+    return [{'date': (start + timedelta(days=i)).isoformat(), 'close': float(i % 7)} for i in range(days)]
+
+def test_downsample_series():
+    entries = series(365)
+    sampled = downsample_series(entries, 'close', 50)
+    assert len(sampled) == 50 and sampled[0] is entries[0] and sampled[-1] is entries[-1]
+    assert downsample_series(entries, 'close', None) is entries
+    assert downsample_series(entries, 'close', 400) is entries
+
+def test_slice_series_is_inclusive():
+    entries = series(10)
+    assert [e['date'] for e in slice_series(entries, '2026-01-03', '2026-01-05')] == ['2026-01-03', '2026-01-04', '2026-01-05']
+    assert len(slice_series(entries, start='2026-01-09')) == 2
+    assert slice_series(entries) is entries
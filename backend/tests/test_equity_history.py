@@ -0,0 +1,62 @@
+import os
+from datetime import datetime, timedelta
+import pytz
+from equity_history import EquityHistory
+
+EASTERN = pytz.timezone('US/Eastern')
+START = EASTERN.localize(datetime(2026, 3, 2, 10, 0))
+
+def history(tmp_path, **kwargs):
+    return EquityHistory(directory=str(tmp_path), max_snapshot_days=2, **kwargs)
+
+def fill(history, days=4, per_day=3):
+    """Snapshots every hour from 10:00 for `days` days; equity = 1000 * day + hour"""
+    for day in range(days):
+        for hour in range(per_day):
+            moment = START + timedelta(days=day, hours=hour)
+            history.append('IRA', {'totalEquity': 1000.0 * (day + 1) + hour}, timestamp=moment,
+                           positions={'AAPL': float(hour)})
+
+def test_short_ranges_return_every_snapshot(tmp_path):
+    equity = history(tmp_path)
+    fill(equity)
+    result = equity.query('IRA', start='2026-03-03', end='2026-03-04', include_positions=True)
+    assert result['resolution'] == 'snapshot' and result['days'] == 2
+    assert [p['totalEquity'] for p in result['points']] == [2000.0, 2001.0, 2002.0, 3000.0, 3001.0, 3002.0]
+    assert result['points'][-1]['positions'] == {'AAPL': 2.0}
+
+def test_long_ranges_roll_up_to_each_days_last_snapshot(tmp_path):
+    equity = history(tmp_path)
+    fill(equity)
+    result = equity.query('IRA')
+    assert result['resolution'] == 'daily' and result['days'] == 4
+    assert [p['totalEquity'] for p in result['points']] == [1002.0, 2002.0, 3002.0, 4002.0]
+    assert result['points'][0]['timestamp'] == (START + timedelta(hours=2)).astimezone(pytz.utc).isoformat()
+
+    # The rollup is persisted: a fresh instance answers from daily.jsonl alone
+    assert os.path.exists(tmp_path / 'IRA' / 'daily.jsonl')
+    for day in ('2026-03-02', '2026-03-03', '2026-03-04', '2026-03-05'):
+        (tmp_path / 'IRA' / f'{day}.jsonl').write_bytes(b'')
+    assert [p['totalEquity'] for p in history(tmp_path).query('IRA')['points']] == [1002.0, 2002.0, 3002.0, 4002.0]
+
+def test_snapshots_closer_than_the_interval_are_dropped(tmp_path):
+    equity = history(tmp_path, min_interval_seconds=60)
+    assert equity.append('IRA', {'totalEquity': 1.0}, timestamp=START)
+    assert not equity.append('IRA', {'totalEquity': 2.0}, timestamp=START + timedelta(seconds=30))
+    assert equity.append('IRA', {'totalEquity': 3.0}, timestamp=START + timedelta(seconds=60))
+    assert [p['totalEquity'] for p in equity.query('IRA')['points']] == [1.0, 3.0]
+
+def test_reads_skip_a_torn_line_and_downsample(tmp_path):
+    equity = history(tmp_path, min_interval_seconds=0)
+    fill(equity, days=1, per_day=10)
+    with open(tmp_path / 'IRA' / '2026-03-02.jsonl', 'ab') as f:
+        f.write(b'[1772470000.0, 12')
+    points = equity.query('IRA', max_points=4)['points']
+    assert len(points) == 4
+    assert points[0]['totalEquity'] == 1000.0 and points[-1]['totalEquity'] == 1009.0
+
+def test_accounts(tmp_path):
+    equity = history(tmp_path)
+    assert equity.query('NONE')['points'] == []
+    fill(equity, days=1, per_day=1)
+    assert equity.accounts() == ['IRA']
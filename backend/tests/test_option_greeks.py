@@ -0,0 +1,41 @@
+from datetime import datetime
+import numpy as np
+import pytz
+from option_greeks import black_scholes_price, black_scholes_greeks, implied_volatility, years_to_expiry
+
+IS_CALL = np.array([True, False, True, False, True])
+SPOT = np.array([100.0, 100.0, 50.0, 250.0, 10.0])
+STRIKE = np.array([100.0, 90.0, 60.0, 260.0, 8.0])
+YEARS = np.array([0.25, 0.5, 1.0, 0.05, 2.0])
+VOLATILITY = np.array([0.2, 0.35, 0.6, 1.2, 0.15])
+
+def test_implied_volatility_round_trips_black_scholes_price():
+    prices = black_scholes_price(IS_CALL, SPOT, STRIKE, YEARS, VOLATILITY, rate=0.04)
+    solved = implied_volatility(IS_CALL, prices, SPOT, STRIKE, YEARS, rate=0.04)
+    np.testing.assert_allclose(solved, VOLATILITY, atol=1e-4)
+
+def test_put_call_parity():
+    call = black_scholes_price(True, 100.0, 95.0, 0.5, 0.3, rate=0.05)
+    put = black_scholes_price(False, 100.0, 95.0, 0.5, 0.3, rate=0.05)
+    assert abs((call - put) - (100.0 - 95.0 * np.exp(-0.05 * 0.5))) < 1e-5
+
+def test_implied_volatility_is_nan_outside_no_arbitrage_bounds():
+    solved = implied_volatility(
+        [True, True, False, True],
+        [0.5, 120.0, 1.0, 5.0],  # below intrinsic, above spot, fine, fine
+        [110.0, 100.0, 100.0, 100.0],
+        [100.0, 100.0, 100.0, 100.0],
+        [0.5, 0.5, 0.5, 0.0])  # expired
+    assert np.isnan(solved[[0, 1, 3]]).all()
+    assert not np.isnan(solved[2])
+
+def test_greeks_signs():
+    greeks = black_scholes_greeks(np.array([True, False]), 100.0, 100.0, 0.25, 0.3)
+    assert 0 < greeks['delta'][0] < 1 and -1 < greeks['delta'][1] < 0
+    assert (greeks['gamma'] > 0).all() and (greeks['vega'] > 0).all() and (greeks['theta'] < 0).all()
+
+def test_years_to_expiry_counts_to_the_market_close():
+    now = pytz.timezone('US/Eastern').localize(datetime(2026, 3, 20, 15, 0))
+    years = years_to_expiry(['03/20/2026', 'not a date'], now)
+    assert abs(years[0] * 365 * 24 - 1.0) < 1e-9
+    assert np.isnan(years[1])
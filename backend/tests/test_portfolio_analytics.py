@@ -0,0 +1,58 @@
+import threading
+from datetime import datetime, timedelta
+from portfolio_analytics import AnalyticsWorker, ANALYTICS_FIELDS
+
+def wait_until_drained(worker, tickers):
+    for _ in range(200):
+        if not worker.status(tickers)['pending']:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('analytics still pending')
+
+def failing_worker(calls):
+    def compute(ticker):
+        calls.append(ticker)
+        raise RuntimeError('yfinance down')
+    return AnalyticsWorker(compute, max_workers=1, ttl_seconds=300, retry_seconds=30)
+
+def test_failed_ticker_drains_with_empty_fields():
+    calls = []
+    worker = failing_worker(calls)
+    worker.request(['AAPL'])
+    wait_until_drained(worker, ['AAPL'])
+
+    status = worker.status(['AAPL'])
+    assert status['pending'] == []
+    assert status['ready']['AAPL'] == {field: None for field in ANALYTICS_FIELDS}
+    # Polling again within the backoff doesn't resubmit the ticker
+    worker.status(['AAPL'])
+    assert calls == ['AAPL']
+
+def test_failed_ticker_is_retried_after_backoff():
+    calls = []
+    worker = failing_worker(calls)
+    worker.request(['AAPL'])
+    wait_until_drained(worker, ['AAPL'])
+
+    worker._results['AAPL']['timestamp'] -= timedelta(seconds=31)
+    wait_until_drained(worker, ['AAPL'])
+    assert calls == ['AAPL', 'AAPL']
+    assert worker._results['AAPL']['failures'] == 2
+    # Second failure doubles the wait
+    worker._results['AAPL']['timestamp'] = datetime.now() - timedelta(seconds=31)
+    assert worker._is_fresh('AAPL')
+
+def test_failure_keeps_previous_values():
+    results = [{'current_rsi': 55.0}]
+    def compute(ticker):
+        if not results:
+            raise RuntimeError('yfinance down')
+        return results.pop()
+    worker = AnalyticsWorker(compute, max_workers=1, ttl_seconds=300)
+    worker.request(['AAPL'])
+    wait_until_drained(worker, ['AAPL'])
+    worker._results['AAPL']['timestamp'] -= timedelta(seconds=301)
+    worker.request(['AAPL'])
+    wait_until_drained(worker, ['AAPL'])
+    assert worker._results['AAPL']['failures'] == 1
+    assert worker.status(['AAPL'])['ready']['AAPL'] == {'current_rsi': 55.0}
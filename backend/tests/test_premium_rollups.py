@@ -0,0 +1,41 @@
+from premium_rollups import PremiumLedger
+
+def option_order(order_id, state='filled', net_amount='50.00', quantity='1', direction='credit',
+                 when='2026-03-02T15:30:00Z', ticker='AAPL'):
+    return {
+        'id': order_id, 'state': state, 'chain_symbol': ticker, 'direction': direction,
+        'net_amount': net_amount, 'quantity': quantity, 'last_transaction_at': when,
+        'opening_strategy': 'short_put'
+    }
+
+CANCELLED = {'is_theta_play_initiator': False, 'order_type': 'Cancelled'}
+
+def test_cancelled_partial_fill_counts_its_net_amount():
+    ledger = PremiumLedger()
+    assert ledger.add_order(option_order('a', state='cancelled', net_amount='20.00'), CANCELLED)
+    assert ledger.premiums_by_ticker()['AAPL'] == 20.0
+    assert ledger.series('day') == [{'period': '2026-03-02', 'premium': 20.0}]
+    # Only filled orders feed the strategy stats
+    assert ledger.state['rollups']['strategy'] == {}
+
+def test_cancelled_without_fill_adds_nothing():
+    ledger = PremiumLedger()
+    assert ledger.add_order(option_order('a', state='cancelled', net_amount='0.00'), CANCELLED)
+    assert ledger.premiums_by_ticker()['AAPL'] == 0.0
+
+def test_filled_orders_roll_up_by_bucket_and_direction():
+    ledger = PremiumLedger()
+    ledger.add_order(option_order('a', net_amount='100.00', quantity='2'), True)
+    ledger.add_order(option_order('b', net_amount='30.00', direction='debit', when='2026-03-04T15:00:00Z'), True)
+    ledger.add_order(option_order('c', net_amount='75.00', when='2026-03-05T15:00:00Z'), False)
+    assert ledger.premiums_by_ticker()['AAPL'] == 170.0
+    assert ledger.series('week') == [{'period': '2026-03-02', 'premium': 170.0}]
+    assert ledger.series('day', start='2026-03-03') == [{'period': '2026-03-04', 'premium': -30.0}]
+    assert ledger.state['rollups']['strategy']['short_put'] == {'premium': 170.0, 'orders': 3, 'eligible_orders': 2}
+
+def test_open_and_duplicate_orders_are_not_recorded():
+    ledger = PremiumLedger()
+    assert not ledger.add_order(option_order('a', state='queued'), True)
+    assert ledger.add_order(option_order('a'), True)
+    assert not ledger.add_order(option_order('a'), True)
+    assert ledger.premiums_by_ticker()['AAPL'] == 50.0
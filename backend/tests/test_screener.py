@@ -0,0 +1,48 @@
+import pytest
+from screener import ScreenerIndex, ScreenerQueryError, parse_conditions
+
+def test_parse_conditions():
+    assert parse_conditions(' current_rsi<35, sector==Technology,pe_ratio >= 10 ') == [
+        ('current_rsi', '<', 35.0), ('sector', '==', 'Technology'), ('pe_ratio', '>=', 10.0)
+    ]
+    assert parse_conditions('') == []
+
+@pytest.mark.parametrize('expression', ['current_rsi<abc', 'volume>10', 'sector<Tech', 'current_rsi'])
+def test_parse_conditions_rejects_bad_input(expression):
+    with pytest.raises(ScreenerQueryError):
+        parse_conditions(expression)
+
+@pytest.fixture
+def index():
+    index = ScreenerIndex(capacity=2)  # grows past the initial capacity
+    index.update('aapl', {'price': 180.0, 'current_rsi': 30.0, 'sector': 'Technology'})
+    index.update('XOM', {'price': 110.0, 'current_rsi': 55.0, 'sector': 'Energy'})
+    index.update('MSFT', {'price': 400.0, 'current_rsi': 25.0, 'sector': 'Technology'})
+    index.update('NEW', {'price': 20.0})  # no RSI or sector yet
+    return index
+
+def tickers(result):
+    return [row['ticker'] for row in result[1]]
+
+def test_unknown_values_never_match(index):
+    assert tickers(index.query(parse_conditions('current_rsi<100'))) == ['AAPL', 'XOM', 'MSFT']
+    assert tickers(index.query(parse_conditions('current_rsi!=30'))) == ['XOM', 'MSFT']
+    assert tickers(index.query(parse_conditions('sector!=Energy'))) == ['AAPL', 'MSFT']
+
+def test_text_and_numeric_conditions_combine(index):
+    total, rows = index.query(parse_conditions('sector==Technology, current_rsi<28'))
+    assert total == 1 and rows[0]['ticker'] == 'MSFT' and rows[0]['sector'] == 'Technology'
+    assert index.query(parse_conditions('sector==Utilities')) == (0, [])
+
+def test_sort_puts_unknown_values_last(index):
+    assert tickers(index.query([], sort='current_rsi')) == ['MSFT', 'AAPL', 'XOM', 'NEW']
+    assert tickers(index.query([], sort='-current_rsi')) == ['XOM', 'AAPL', 'MSFT', 'NEW']
+    total, rows = index.query([], sort='-price', limit=2)
+    assert total == 4 and [row['ticker'] for row in rows] == ['MSFT', 'AAPL']
+    with pytest.raises(ScreenerQueryError):
+        index.query([], sort='sector')
+
+def test_updates_keep_known_values_and_derive_range_position(index):
+    index.update('AAPL', {'current_rsi': None, 'current_ps': 7.5, 'ps_12m_min': 5.0, 'ps_12m_max': 10.0})
+    row = index.query(parse_conditions('ps_range_position==50'))[1][0]
+    assert row['ticker'] == 'AAPL' and row['current_rsi'] == 30.0
@@ -0,0 +1,111 @@
+from tax_lots import LotLedger, _empty_state, option_trades, sort_orders
+
+def order(order_id, when):
+    return {'id': order_id, 'last_transaction_at': when}
+
+def stock(order_id, when, quantity, price, ticker='AAPL'):
+    """(order, trades) for a stock fill; quantity is signed (+ buy, - sell)"""
+    return order(order_id, when), [(ticker, ticker, quantity, price, 1, None)]
+
+def ledger_after(orders, method='fifo'):
+    ledger = LotLedger(_empty_state(method))
+    ledger.apply_orders(sort_orders(orders))
+    return ledger
+
+LOTS = [
+    stock('b1', '2026-01-05T15:00:00Z', 10, 100.0),
+    stock('b2', '2026-01-06T15:00:00Z', 10, 120.0),
+    stock('s1', '2026-01-07T15:00:00Z', -10, 130.0),
+]
+
+def test_fifo_closes_the_oldest_lot():
+    ledger = ledger_after(LOTS, 'fifo')
+    assert ledger.summary()['total']['short_term'] == 300.0
+    assert ledger.open_lots()['AAPL']['lots'] == [[10, 120.0, '2026-01-06']]
+
+def test_lifo_closes_the_newest_lot():
+    ledger = ledger_after(LOTS, 'lifo')
+    assert ledger.summary()['total']['short_term'] == 100.0
+    assert ledger.open_lots()['AAPL']['lots'] == [[10, 100.0, '2026-01-05']]
+
+def test_sell_beyond_holdings_opens_a_short_lot():
+    ledger = ledger_after([
+        stock('b1', '2026-01-05T15:00:00Z', 5, 100.0),
+        stock('s1', '2026-01-06T15:00:00Z', -8, 110.0),
+    ])
+    assert ledger.open_lots()['AAPL']['lots'] == [[-3, 110.0, '2026-01-06']]
+    ledger.apply_orders([stock('b2', '2026-01-07T15:00:00Z', 3, 90.0)])
+    assert ledger.summary()['total']['short_term'] == 50.0 + 60.0
+    assert ledger.open_lots() == {}
+
+def test_holding_over_a_year_is_long_term():
+    ledger = ledger_after([
+        stock('b1', '2024-01-05T15:00:00Z', 10, 100.0),
+        stock('s1', '2025-03-03T15:00:00Z', -10, 150.0),
+    ])
+    assert ledger.summary(year='2025')['realized']['long_term'] == 500.0
+    assert ledger.summary(year='2025')['realized']['short_term'] == 0.0
+
+def test_option_lots_expire_at_zero():
+    leg = {'side': 'sell', 'position_effect': 'open', 'ratio_quantity': '1', 'strike_price': '150.0000',
+           'option_type': 'put', 'expiration_date': '2026-03-20'}
+    short_put = {'id': 'o1', 'last_transaction_at': '2026-03-02T15:00:00Z', 'chain_symbol': 'AAPL',
+                 'processed_quantity': '2', 'direction': 'credit', 'price': '1.50', 'legs': [leg]}
+    ledger = ledger_after([(short_put, option_trades(short_put))])
+    assert ledger.open_lots()['AAPL 2026-03-20 150.00 put']['lots'] == [[-2.0, 1.5, '2026-03-02']]
+
+    # Expiry is realized by the next order after the expiration date...
+    ledger.apply_orders([stock('b1', '2026-03-23T15:00:00Z', 1, 100.0, ticker='MSFT')])
+    assert ledger.summary(ticker='AAPL')['realized']['short_term'] == 300.0
+    assert ledger.open_lots('AAPL') == {}
+
+def test_expire_options_keeps_lots_until_after_expiry():
+    ledger = LotLedger(_empty_state('fifo'))
+    ledger.apply_trade('AAPL 2026-03-20 150.00 call', 'AAPL', 1, 2.0, 100, '2026-03-20', '2026-03-02')
+    assert ledger.expire_options('2026-03-20') == 0
+    # ...or by the sync pass with today's date
+    assert ledger.expire_options('2026-03-21') == 1
+    assert ledger.summary()['total']['short_term'] == -200.0
+
+def test_cursor_skips_orders_already_applied_at_the_same_timestamp():
+    when = '2026-01-05T15:00:00Z'
+    ledger = ledger_after([stock('a', when, 1, 100.0), stock('b', when, 1, 100.0)])
+    applied = ledger.apply_orders(sort_orders([
+        stock('a', when, 1, 100.0), stock('b', when, 1, 100.0), stock('c', when, 1, 100.0),
+        stock('old', '2026-01-04T15:00:00Z', 1, 100.0),
+    ]))
+    assert applied == 1
+    assert ledger.summary()['orders_processed'] == 3
+    assert sum(lot[0] for lot in ledger.open_lots()['AAPL']['lots']) == 3
+
+def test_loss_with_replacement_buy_after_the_sale_is_a_wash_sale():
+    ledger = ledger_after([
+        stock('b1', '2026-03-02T15:00:00Z', 10, 100.0),
+        stock('s1', '2026-03-10T15:00:00Z', -10, 80.0),
+    ])
+    # The sold lot's own buy is not a replacement
+    assert ledger.summary()['wash_sales'] == []
+    ledger.apply_orders([stock('b2', '2026-03-20T15:00:00Z', 10, 85.0)])
+    assert ledger.summary()['wash_sales'] == [
+        {'ticker': 'AAPL', 'sale_date': '2026-03-10', 'loss': 200.0, 'replacement_date': '2026-03-20'}
+    ]
+    assert ledger.summary()['total']['wash_sale_loss'] == 200.0
+
+def test_loss_with_replacement_buy_before_the_sale_is_a_wash_sale():
+    ledger = ledger_after([
+        stock('b1', '2026-01-05T15:00:00Z', 10, 100.0),
+        stock('b2', '2026-02-20T15:00:00Z', 5, 90.0),
+        stock('s1', '2026-03-02T15:00:00Z', -10, 80.0),
+    ])
+    assert ledger.summary()['wash_sales'] == [
+        {'ticker': 'AAPL', 'sale_date': '2026-03-02', 'loss': 200.0, 'replacement_date': '2026-02-20'}
+    ]
+
+def test_buys_outside_the_window_are_not_wash_sales():
+    ledger = ledger_after([
+        stock('b1', '2026-01-05T15:00:00Z', 10, 100.0),
+        stock('s1', '2026-03-02T15:00:00Z', -10, 80.0),
+        stock('b2', '2026-04-06T15:00:00Z', 10, 85.0),
+    ])
+    assert ledger.summary()['wash_sales'] == []
+    assert ledger.summary()['total']['short_term'] == -200.0
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+import pytz
+from trading_calendar import TradingCalendar, us_market_holidays, us_market_half_days
+
+EASTERN = pytz.timezone('US/Eastern')
+
+def eastern(*args):
+    return EASTERN.localize(datetime(*args))
+
+def test_nyse_holidays_2026():
+    assert sorted(us_market_holidays(2026)) == [
+        date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3), date(2026, 5, 25),
+        date(2026, 6, 19),
+        date(2026, 7, 3),  # July 4th is a Saturday: observed Friday
+        date(2026, 9, 7), date(2026, 11, 26), date(2026, 12, 25)
+    ]
+
+def test_observed_holiday_rules():
+    # Saturday New Year's Day is not moved back into the previous year
+    assert date(2021, 12, 31) not in us_market_holidays(2021)
+    assert not any(day.month == 1 and day.day < 17 for day in us_market_holidays(2022))
+    # Sunday holidays move to Monday; Juneteenth only from 2022
+    assert date(2022, 6, 20) in us_market_holidays(2022)
+    assert date(2022, 12, 26) in us_market_holidays(2022)
+    assert not any(day.month == 6 for day in us_market_holidays(2021))
+
+def test_half_days_close_early():
+    calendar = TradingCalendar()
+    assert date(2026, 11, 27) in us_market_half_days(2026)
+    assert calendar.session(date(2026, 11, 27))[1] == eastern(2026, 11, 27, 13, 0)
+    assert calendar.session(date(2026, 12, 24))[1] == eastern(2026, 12, 24, 13, 0)
+    assert calendar.session(date(2025, 7, 3))[1] == eastern(2025, 7, 3, 13, 0)
+    # A half day that is also an observed holiday stays closed
+    assert calendar.session(date(2026, 7, 3)) is None
+    assert calendar.session(date(2026, 12, 23))[1] == eastern(2026, 12, 23, 16, 0)
+
+def test_is_open_and_session_boundaries():
+    calendar = TradingCalendar()
+    assert calendar.is_open(eastern(2026, 3, 2, 9, 30))
+    assert not calendar.is_open(eastern(2026, 3, 2, 9, 29))
+    assert not calendar.is_open(eastern(2026, 4, 3, 12, 0))  # Good Friday
+    assert not calendar.is_open(eastern(2026, 11, 27, 14, 0))
+    # Thursday evening before Good Friday: next open is Monday
+    assert calendar.next_open(eastern(2026, 4, 2, 17, 0)) == eastern(2026, 4, 6, 9, 30)
+    assert calendar.next_close(eastern(2026, 11, 27, 10, 0)) == eastern(2026, 11, 27, 13, 0)
+    assert calendar.session_date(eastern(2026, 4, 5, 12, 0)) == date(2026, 4, 2)
+    assert calendar.session_date(eastern(2026, 4, 6, 8, 0)) == date(2026, 4, 6)
+
+def test_off_hours_data_stays_fresh_until_the_next_open():
+    calendar = TradingCalendar()
+    fetched = eastern(2026, 4, 2, 17, 0)
+    assert calendar.expires_at(fetched, 300) == eastern(2026, 4, 6, 9, 30)
+    assert calendar.is_fresh(fetched, 300, now=eastern(2026, 4, 6, 9, 29))
+    assert not calendar.is_fresh(fetched, 300, now=eastern(2026, 4, 6, 9, 31))
+    # During a session the plain TTL applies
+    assert calendar.expires_at(eastern(2026, 4, 6, 10, 0), 300) == eastern(2026, 4, 6, 10, 5)
+
+def test_configured_extra_holidays_and_half_days():
+    calendar = TradingCalendar(calendar={'extra_holidays': ['2025-01-09'], 'extra_half_days': ['2025-01-10'],
+                                         'half_day_close_time': '12:30'})
+    assert calendar.session(date(2025, 1, 9)) is None
+    assert calendar.session(date(2025, 1, 10))[1] == eastern(2025, 1, 10, 12, 30)
+    assert calendar.session(date(2025, 12, 24))[1] == eastern(2025, 12, 24, 12, 30)
@@ -0,0 +1,85 @@
+"""Regression tests for the upstream governor's failure handling"""
+import pytest
+import requests
+import ticker_data_cache
+from ticker_data_cache import TickerDataCache
+from upstream import UpstreamGovernor, UpstreamThrottled, KnownBadTicker
+
+@pytest.fixture
+def governor(monkeypatch):
+    governor = UpstreamGovernor({'robinhood': {'rate_per_second': 1000, 'burst': 1000}},
+                                breaker={'failure_threshold': 5, 'cooldown_seconds': 0},
+                                ticker_failures={'threshold': 3, 'ttl_seconds': 300})
+    monkeypatch.setattr(ticker_data_cache, 'upstream', governor)
+    return governor
+
+def flaky_latest_price(monkeypatch, failures):
+    """r.get_latest_price raising ConnectionError for the first `failures` calls"""
+    calls = []
+    def get_latest_price(ticker):
+        calls.append(ticker)
+        if len(calls) <= failures:
+            raise requests.exceptions.ConnectionError('connection dropped')
+        return ['123.45']
+    monkeypatch.setattr(ticker_data_cache.r, 'get_latest_price', get_latest_price)
+    return calls
+
+def test_single_network_error_does_not_blacklist_ticker(governor, monkeypatch, tmp_path):
+    calls = flaky_latest_price(monkeypatch, failures=1)
+    cache = TickerDataCache(cache_dir=str(tmp_path))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cache.get_latest_price('AAPL')
+    assert governor.known_bad('robinhood', 'get_latest_price', 'AAPL') is None
+    assert cache.get_latest_price('AAPL') == ['123.45']
+    assert len(calls) == 2
+
+def test_known_bad_ticker_serves_expired_cache(governor, monkeypatch, tmp_path):
+    cache = TickerDataCache(cache_dir=str(tmp_path))
+    cache._settings = dict(ticker_data_cache.DEFAULT_CACHE_SETTINGS, price_cache_minutes=0)
+    flaky_latest_price(monkeypatch, failures=0)
+    assert cache.get_latest_price('AAPL') == ['123.45']
+
+    calls = flaky_latest_price(monkeypatch, failures=10)
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            cache.get_latest_price('AAPL')
+    assert governor.known_bad('robinhood', 'get_latest_price', 'AAPL')
+    # Negatively cached now: the expired file is served without calling upstream
+    assert cache.get_latest_price('AAPL') == ['123.45']
+    assert len(calls) == 3
+
+def test_throttled_half_open_probe_releases_breaker(governor):
+    breaker = governor._breakers['robinhood']
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            with governor.call('robinhood', 'op'):
+                raise RuntimeError('down')
+    assert breaker.state == 'open'
+
+    bucket = governor._buckets['robinhood']
+    tokens, bucket.tokens, bucket.rate = bucket.tokens, 0.0, 1e-9
+    governor.max_wait_seconds = 0
+    with pytest.raises(UpstreamThrottled):
+        with governor.call('robinhood', 'op'):
+            pass
+    assert breaker.state == 'open'
+
+    bucket.tokens, bucket.rate = tokens, 1000.0
+    with governor.call('robinhood', 'op'):
+        pass
+    assert breaker.state == 'closed'
+
+def test_known_bad_is_only_raised_for_negatively_cached_tickers(governor):
+    governor.mark_bad('robinhood', 'op', 'BAD', 'no instrument')
+    with pytest.raises(KnownBadTicker):
+        with governor.call('robinhood', 'op', ticker='BAD'):
+            pass
+    with governor.call('robinhood', 'op', ticker='GOOD'):
+        pass
+
+def test_known_bad_ticker_without_cache_returns_none(governor, monkeypatch, tmp_path):
+    cache = TickerDataCache(cache_dir=str(tmp_path))
+    calls = flaky_latest_price(monkeypatch, failures=10)
+    governor.mark_bad('robinhood', 'get_latest_price', 'NEW', 'no instrument')
+    assert cache.get_latest_price('NEW') is None
+    assert calls == []
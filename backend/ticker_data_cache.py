@@ -3,16 +3,51 @@ import os
 from datetime import datetime, timedelta
 from functools import wraps
 import robin_stocks.robinhood as r
-
-# Load ticker cache configuration
-with open('ticker_cache.json', 'r') as f:
-    ticker_cache_config = json.load(f)
+from serialization import load_json, write_json
+from perf_metrics import perf
+from upstream import upstream, KnownBadTicker, UpstreamUnavailable, UpstreamThrottled
+from daily_bars import daily_bars
+from trading_calendar import trading_calendar
+
+# Used for any setting missing from ticker_cache.json (or if the file is absent)
+DEFAULT_CACHE_SETTINGS = {
+    "fundamentals_cache_hours": 24,
+    "price_cache_minutes": 5,
+    "name_cache_hours": 168,
+    "historical_cache_hours": 24,
+    "revenue_cache_hours": 168,
+    "previous_close_cache_minutes": 60
+}
+
+# Data types that don't change while the market is closed: fetched off-hours,
+# they stay valid until the next session opens. Prices (extended hours) and
+# the previous close (rolls over with the session date) keep their plain TTL.
+OFF_HOURS_STABLE_TYPES = {'fundamentals', 'name', 'price_changes', 'revenue_change'}
+
+def load_cache_settings(config_file='ticker_cache.json'):
+    """Ticker cache settings from config_file, falling back to DEFAULT_CACHE_SETTINGS"""
+    settings = dict(DEFAULT_CACHE_SETTINGS)
+    try:
+        with open(config_file, 'r') as f:
+            settings.update(json.load(f).get('cache_settings', {}))
+    except FileNotFoundError:
+        print(f"{config_file} not found, using default ticker cache settings.")
+    except json.JSONDecodeError as e:
+        print(f"Warning: Could not decode {config_file}, using default ticker cache settings. Error: {e}")
+    return settings
 
 class TickerDataCache:
     def __init__(self, cache_dir="../cache/ticker_data"):
         self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
-        self.settings = ticker_cache_config['cache_settings']
+        self._settings = None
+
+    @property
+    def settings(self):
+        # Loaded on first use so importing this module has no file I/O
+        if self._settings is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._settings = load_cache_settings()
+        return self._settings
 
     def _get_cache_file(self, ticker, data_type):
         """Generate cache file path for ticker and data type"""
@@ -27,22 +62,32 @@ class TickerDataCache:
 
         try:
             with open(cache_file, 'r') as f:
-                data = json.load(f)
+                data = load_json(f.read())
 
             timestamp = datetime.fromisoformat(data.get('timestamp', ''))
-            now = datetime.now()
 
             if cache_hours:
-                valid_until = timestamp + timedelta(hours=cache_hours)
+                ttl_seconds = cache_hours * 3600
             elif cache_minutes:
-                valid_until = timestamp + timedelta(minutes=cache_minutes)
+                ttl_seconds = cache_minutes * 60
             else:
                 return False
 
-            return now <= valid_until
+            if os.path.basename(cache_file).replace('.json', '') in OFF_HOURS_STABLE_TYPES:
+                return trading_calendar.is_fresh(timestamp, ttl_seconds)
+            return (datetime.now() - timestamp).total_seconds() <= ttl_seconds
         except (json.JSONDecodeError, ValueError, KeyError):
             return False
 
+    def _check_cache(self, cache_file, cache_hours=None, cache_minutes=None):
+        """_is_cache_valid for request paths; records the hit/miss/stale outcome"""
+        data_type = os.path.basename(cache_file).replace('.json', '')
+        if self._is_cache_valid(cache_file, cache_hours, cache_minutes):
+            perf.record_cache('ticker_data', data_type, 'hit')
+            return True
+        perf.record_cache('ticker_data', data_type, 'stale' if os.path.exists(cache_file) else 'miss')
+        return False
+
     def _save_to_cache(self, cache_file, data):
         """Save data to cache with timestamp"""
         cache_data = {
@@ -50,81 +95,115 @@ class TickerDataCache:
             'data': data
         }
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            write_json(cache_file, cache_data)
         except Exception as e:
             print(f"Error saving to cache {cache_file}: {e}")
 
+    def _save_unless_failed(self, cache_file, data, data_type):
+        """
+        Cache a dict of computed values only if every upstream fetch succeeded
+        (None marks a failure), so a throttled refresh isn't cached as zeros.
+        """
+        failed = [key for key, value in data.items() if value is None]
+        if failed:
+            perf.record_cache('ticker_data', data_type, 'failed')
+            print(f"Not caching {data_type} ({', '.join(failed)} failed): {cache_file}")
+            return
+        self._save_to_cache(cache_file, data)
+
     def _load_from_cache(self, cache_file):
         """Load data from cache file"""
         try:
             with open(cache_file, 'r') as f:
-                data = json.load(f)
+                data = load_json(f.read())
             return data.get('data')
         except (json.JSONDecodeError, FileNotFoundError):
             return None
 
+    def _fetch(self, cache_file, operation, ticker, fetch):
+        """
+        Fetch from Robinhood through the upstream governor and cache the result.
+        If the governor refuses the call (ticker failing repeatedly, breaker
+        open, no budget) an expired cache file is served instead of failing,
+        or None when there is none, so one ticker can't fail a whole refresh.
+        """
+        try:
+            with upstream.call('robinhood', operation, ticker=ticker):
+                data = fetch()
+        except (KnownBadTicker, UpstreamUnavailable, UpstreamThrottled) as e:
+            if not os.path.exists(cache_file):
+                print(f"No data for {ticker} ({e}), nothing cached: {cache_file}")
+                return None
+            print(f"Serving expired cache for {ticker} ({e}): {cache_file}")
+            perf.record_cache('ticker_data', os.path.basename(cache_file).replace('.json', ''), 'stale_served')
+            return self._load_from_cache(cache_file)
+        self._save_to_cache(cache_file, data)
+        return data
+
     def get_fundamentals(self, ticker):
         """Get fundamentals with caching"""
         cache_file = self._get_cache_file(ticker, 'fundamentals')
         cache_hours = self.settings['fundamentals_cache_hours']
 
-        if self._is_cache_valid(cache_file, cache_hours=cache_hours):
+        if self._check_cache(cache_file, cache_hours=cache_hours):
             print(f"Using cached fundamentals for {ticker}")
             return self._load_from_cache(cache_file)
 
         print(f"Fetching fresh fundamentals for {ticker}")
-        data = r.stocks.get_fundamentals(ticker)
-        self._save_to_cache(cache_file, data)
-        return data
+        return self._fetch(cache_file, 'get_fundamentals', ticker, lambda: r.stocks.get_fundamentals(ticker))
 
     def get_latest_price(self, ticker):
         """Get latest price with caching"""
         cache_file = self._get_cache_file(ticker, 'latest_price')
         cache_minutes = self.settings['price_cache_minutes']
 
-        if self._is_cache_valid(cache_file, cache_minutes=cache_minutes):
+        if self._check_cache(cache_file, cache_minutes=cache_minutes):
             print(f"Using cached price for {ticker}")
             return self._load_from_cache(cache_file)
 
         print(f"Fetching fresh price for {ticker}")
-        data = r.get_latest_price(ticker)
-        self._save_to_cache(cache_file, data)
-        return data
+        return self._fetch(cache_file, 'get_latest_price', ticker, lambda: r.get_latest_price(ticker))
 
     def get_name_by_symbol(self, ticker):
         """Get company name with caching (names rarely change)"""
         cache_file = self._get_cache_file(ticker, 'name')
         cache_hours = self.settings['name_cache_hours']
 
-        if self._is_cache_valid(cache_file, cache_hours=cache_hours):
+        if self._check_cache(cache_file, cache_hours=cache_hours):
             print(f"Using cached name for {ticker}")
             return self._load_from_cache(cache_file)
 
         print(f"Fetching fresh name for {ticker}")
-        data = r.stocks.get_name_by_symbol(ticker)
-        self._save_to_cache(cache_file, data)
-        return data
+        return self._fetch(cache_file, 'get_name_by_symbol', ticker, lambda: r.stocks.get_name_by_symbol(ticker))
 
     def get_price_changes(self, ticker, symbol, get_yfinance_ticker_func):
         """Get all price changes with caching"""
         cache_file = self._get_cache_file(ticker, 'price_changes')
         cache_hours = self.settings['historical_cache_hours']
 
-        if self._is_cache_valid(cache_file, cache_hours=cache_hours):
+        if self._check_cache(cache_file, cache_hours=cache_hours):
             print(f"Using cached price changes for {ticker}")
             return self._load_from_cache(cache_file)
 
+        # Computed locally from the batched daily bars when available
+        data = daily_bars.price_changes(ticker)
+        if data is not None:
+            self._save_to_cache(cache_file, data)
+            return data
+
         print(f"Fetching fresh price changes for {ticker}")
 
         def get_price_change_percentage(symbol, days_ago):
-            """Helper function from original code"""
+            """Helper function from original code. Returns None if the fetch failed."""
             try:
                 ticker_obj = get_yfinance_ticker_func(symbol)
+                if ticker_obj is None:
+                    return None
                 from datetime import datetime, timedelta
                 end_date = datetime.now()
                 start_date = end_date - timedelta(days=days_ago)
-                hist = ticker_obj.history(start=start_date, end=end_date)
+                with upstream.call('yfinance', 'history', ticker=symbol):
+                    hist = ticker_obj.history(start=start_date, end=end_date)
                 if hist.empty or len(hist) < 2:
                     return 0.0
                 old_price = hist['Close'].iloc[0]
@@ -134,7 +213,7 @@ class TickerDataCache:
                 return ((new_price - old_price) / old_price) * 100
             except Exception as e:
                 print(f"yfinance failed for {symbol} over {days_ago} days: {e}")
-                return 0.0
+                return None
 
         data = {
             'one_week_change': get_price_change_percentage(symbol, 7),
@@ -143,7 +222,7 @@ class TickerDataCache:
             'one_year_change': get_price_change_percentage(symbol, 365)
         }
 
-        self._save_to_cache(cache_file, data)
+        self._save_unless_failed(cache_file, data, 'price_changes')
         return data
 
     def get_revenue_change(self, ticker, symbol, get_yfinance_ticker_func):
@@ -151,7 +230,7 @@ class TickerDataCache:
         cache_file = self._get_cache_file(ticker, 'revenue_change')
         cache_hours = self.settings['revenue_cache_hours']
 
-        if self._is_cache_valid(cache_file, cache_hours=cache_hours):
+        if self._check_cache(cache_file, cache_hours=cache_hours):
             print(f"Using cached revenue change for {ticker}")
             return self._load_from_cache(cache_file)
 
@@ -161,10 +240,18 @@ class TickerDataCache:
             """Helper function from original code"""
             try:
                 ticker_obj = get_yfinance_ticker_func(symbol)
-                if type == "yearly":
-                    statement = ticker_obj.financials
-                elif type == "quarterly":
-                    statement = ticker_obj.quarterly_income_stmt
+                if ticker_obj is None:
+                    return None
+                with upstream.call('yfinance', f'{type}_financials', ticker=symbol):
+                    if type == "yearly":
+                        statement = ticker_obj.financials
+                    elif type == "quarterly":
+                        statement = ticker_obj.quarterly_income_stmt
+            except Exception as e:
+                # The fetch itself failed (throttled, network); don't report it as 0% change
+                print('symbol: ', symbol, ' type: ', type, f' revenue fetch failed: {e}')
+                return None
+            try:
                 this = statement.loc['Total Revenue'].iloc[0]
                 prev = statement.loc['Total Revenue'].iloc[1]
                 if prev == 0:
@@ -185,7 +272,7 @@ class TickerDataCache:
             'quarterly_revenue_change': get_revenue_change_percent(symbol, "quarterly")
         }
 
-        self._save_to_cache(cache_file, data)
+        self._save_unless_failed(cache_file, data, 'revenue_change')
         return data
 
     def get_previous_close(self, ticker):
@@ -193,14 +280,20 @@ class TickerDataCache:
         cache_file = self._get_cache_file(ticker, 'previous_close')
         cache_minutes = self.settings['previous_close_cache_minutes']
 
-        if self._is_cache_valid(cache_file, cache_minutes=cache_minutes):
+        if self._check_cache(cache_file, cache_minutes=cache_minutes):
             print(f"Using cached previous close for {ticker}")
             return self._load_from_cache(cache_file)
 
+        previous_close = daily_bars.previous_close(ticker)
+        if previous_close is not None:
+            self._save_to_cache(cache_file, previous_close)
+            return previous_close
+
         print(f"Fetching fresh previous close for {ticker}")
         try:
             # Get the last day's historical data (yesterday's close)
-            historicals = r.get_stock_historicals(ticker, interval='day', span='week')
+            with upstream.call('robinhood', 'get_stock_historicals', ticker=ticker):
+                historicals = r.get_stock_historicals(ticker, interval='day', span='week')
             if historicals and len(historicals) >= 2:
                 # [-1] is today's data, [-2] is yesterday's close
                 previous_close = float(historicals[-2]['close_price'])
@@ -225,30 +318,37 @@ class TickerDataCache:
                 cache_path = os.path.join(ticker_path, cache_file)
                 data_type = cache_file.replace('.json', '')
 
-                # Determine cache duration based on data type
-                cache_hours = None
-                cache_minutes = None
-
-                if data_type == 'fundamentals':
-                    cache_hours = self.settings['fundamentals_cache_hours']
-                elif data_type == 'latest_price':
-                    cache_minutes = self.settings['price_cache_minutes']
-                elif data_type == 'name':
-                    cache_hours = self.settings['name_cache_hours']
-                elif data_type in ['price_changes']:
-                    cache_hours = self.settings['historical_cache_hours']
-                elif data_type == 'revenue_change':
-                    cache_hours = self.settings['revenue_cache_hours']
-                elif data_type == 'previous_close':
-                    cache_minutes = self.settings['previous_close_cache_minutes']
-
-                if not self._is_cache_valid(cache_path, cache_hours, cache_minutes):
+                if data_type == 'daily_bars':
+                    # Carries its own expires_at (next session boundary)
+                    expired = daily_bars.is_expired(cache_path)
+                else:
+                    expired = not self._is_cache_valid(cache_path, *self._ttl_for(data_type))
+                if expired:
                     try:
                         os.remove(cache_path)
                         print(f"Removed expired cache: {cache_path}")
                     except OSError:
                         pass
 
+    def _ttl_for(self, data_type):
+        """(cache_hours, cache_minutes) of a ticker data type"""
+        cache_hours = None
+        cache_minutes = None
+
+        if data_type == 'fundamentals':
+            cache_hours = self.settings['fundamentals_cache_hours']
+        elif data_type == 'latest_price':
+            cache_minutes = self.settings['price_cache_minutes']
+        elif data_type == 'name':
+            cache_hours = self.settings['name_cache_hours']
+        elif data_type in ['price_changes']:
+            cache_hours = self.settings['historical_cache_hours']
+        elif data_type == 'revenue_change':
+            cache_hours = self.settings['revenue_cache_hours']
+        elif data_type == 'previous_close':
+            cache_minutes = self.settings['previous_close_cache_minutes']
+        return cache_hours, cache_minutes
+
 # Global instance
 ticker_cache = TickerDataCache()
 
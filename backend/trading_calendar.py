@@ -0,0 +1,163 @@
+import threading
+from datetime import date, datetime, time, timedelta
+import pytz
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based) weekday of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    """Saturday holidays are observed on Friday, Sunday ones on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def us_market_holidays(year):
+    """NYSE full-day holidays of a year"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25))
+    }
+    # New Year's Day falling on a Saturday is not observed on the prior Friday
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+def us_market_half_days(year):
+    """NYSE early closes: July 3rd, the day after Thanksgiving and Christmas Eve (when they are sessions)"""
+    return {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24)
+    }
+
+class TradingCalendar:
+    """
+    Regular sessions (open, close) per trading day, with holidays and early
+    closes, precomputed a year at a time. Answers "is the market open" and
+    "when is the next session boundary" without reparsing configuration, and
+    decides how long cached data stays valid (see expires_at).
+    """
+    def __init__(self, market_hours=None, calendar=None):
+        self._lock = threading.Lock()
+        self.configure(market_hours or {
+            'timezone': 'US/Eastern', 'open_time': '09:30', 'close_time': '16:00', 'trading_days': [0, 1, 2, 3, 4]
+        }, calendar)
+
+    def configure(self, market_hours, calendar=None):
+        calendar = calendar or {}
+        with self._lock:
+            self.timezone = pytz.timezone(market_hours['timezone'])
+            self.open_time = time(*map(int, market_hours['open_time'].split(':')))
+            self.close_time = time(*map(int, market_hours['close_time'].split(':')))
+            self.half_day_close_time = time(*map(int, calendar.get('half_day_close_time', '13:00').split(':')))
+            self.trading_days = set(market_hours['trading_days'])
+            self.extra_holidays = {date.fromisoformat(d) for d in calendar.get('extra_holidays', [])}
+            self.extra_half_days = {date.fromisoformat(d) for d in calendar.get('extra_half_days', [])}
+            self._sessions = {}  # date -> (open, close) aware datetimes
+            self._years = set()
+
+    def _build_year(self, year):
+        holidays = us_market_holidays(year) | self.extra_holidays
+        half_days = us_market_half_days(year) | self.extra_half_days
+        day = date(year, 1, 1)
+        while day.year == year:
+            if day.weekday() in self.trading_days and day not in holidays:
+                close = self.half_day_close_time if day in half_days else self.close_time
+                self._sessions[day] = (
+                    self.timezone.localize(datetime.combine(day, self.open_time)),
+                    self.timezone.localize(datetime.combine(day, close))
+                )
+            day += timedelta(days=1)
+        self._years.add(year)
+
+    def session(self, day):
+        """(open, close) of a date's regular session, or None if the market is closed that day"""
+        if day.year not in self._years:
+            with self._lock:
+                if day.year not in self._years:
+                    self._build_year(day.year)
+        return self._sessions.get(day)
+
+    def _local(self, moment):
+        if moment.tzinfo is None:
+            moment = moment.astimezone()  # naive timestamps are local time
+        return moment.astimezone(self.timezone)
+
+    def is_open(self, moment=None):
+        moment = self._local(moment or datetime.now(pytz.utc))
+        session = self.session(moment.date())
+        return session is not None and session[0] <= moment <= session[1]
+
+    def session_date(self, moment=None):
+        """Date of today's session if the market trades today, else of the most recent one"""
+        day = self._local(moment or datetime.now(pytz.utc)).date()
+        while self.session(day) is None:
+            day -= timedelta(days=1)
+        return day
+
+    def next_open(self, moment):
+        """First session open strictly after `moment`"""
+        moment = self._local(moment)
+        day = moment.date()
+        while True:
+            session = self.session(day)
+            if session and session[0] > moment:
+                return session[0]
+            day += timedelta(days=1)
+
+    def next_close(self, moment):
+        """First session close strictly after `moment`"""
+        moment = self._local(moment)
+        day = moment.date()
+        while True:
+            session = self.session(day)
+            if session and session[1] > moment:
+                return session[1]
+            day += timedelta(days=1)
+
+    def expires_at(self, fetched_at, ttl_seconds):
+        """
+        When data fetched at `fetched_at` goes stale: after `ttl_seconds`, except
+        that data fetched while the market is closed stays valid until the next
+        session opens, since nothing it reflects changes before then.
+        """
+        fetched_at = self._local(fetched_at)
+        expiry = fetched_at + timedelta(seconds=ttl_seconds)
+        if not self.is_open(fetched_at):
+            expiry = max(expiry, self.next_open(fetched_at))
+        return expiry
+
+    def is_fresh(self, fetched_at, ttl_seconds, now=None):
+        return self._local(now or datetime.now(pytz.utc)) < self.expires_at(fetched_at, ttl_seconds)
+
+# Global instance
+trading_calendar = TradingCalendar()
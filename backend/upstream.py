@@ -0,0 +1,290 @@
+import threading
+import time
+from contextlib import contextmanager
+from perf_metrics import perf
+
+# Priority classes, highest first
+INTERACTIVE = 'interactive'  # a user is waiting on the response (portfolio view, charts)
+BACKGROUND = 'background'    # prefetch, analytics workers, stream polling
+PRIORITIES = [INTERACTIVE, BACKGROUND]
+
+DEFAULT_BUDGETS = {
+    'robinhood': {'rate_per_second': 5, 'burst': 10},
+    'yfinance': {'rate_per_second': 2, 'burst': 5}
+}
+
+class UpstreamThrottled(Exception):
+    """Raised when no rate budget became available within max_wait_seconds"""
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling upstream while its circuit breaker is open"""
+
+class KnownBadTicker(Exception):
+    """Raised without calling upstream for a ticker that recently failed there"""
+
+class _CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures; while open, calls fail
+    fast. After `cooldown_seconds` one probe call is let through (half-open):
+    success closes the breaker, failure re-opens it.
+    """
+    def __init__(self, failure_threshold, cooldown_seconds):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.streak_tickers = set()  # tickers that failed during the current failure streak
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def release_probe(self):
+        """The half-open probe never reached upstream (throttled, interrupted): re-open for another cooldown"""
+        with self.lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.streak_tickers.clear()
+
+    def record_failure(self, ticker=None):
+        """Returns the tickers of the failure streak if this failure opened the breaker"""
+        with self.lock:
+            self.failures += 1
+            if ticker:
+                self.streak_tickers.add(ticker)
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                tickers, self.streak_tickers = self.streak_tickers, set()
+                return tickers
+            return None
+
+class _Bucket:
+    """Token bucket; callers wait on `condition`, higher priorities are served first"""
+    def __init__(self, rate_per_second, burst):
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiting = {priority: 0 for priority in PRIORITIES}
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _outranked(self, priority):
+        rank = PRIORITIES.index(priority)
+        return any(self.waiting[p] for p in PRIORITIES[:rank])
+
+    def acquire(self, priority, max_wait):
+        deadline = time.monotonic() + max_wait
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1 and not self._outranked(priority):
+                        self.tokens -= 1
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    next_token = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.05
+                    self.condition.wait(min(remaining, max(next_token, 0.001)))
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+class UpstreamGovernor:
+    """
+    Central scheduler for Robinhood / yfinance calls: a token bucket per provider
+    and priority classes, so interactive requests go ahead of background
+    prefetch when the budget is tight. The priority of the current thread is set
+    with `with upstream.priority(BACKGROUND): ...` (default: interactive).
+    """
+    def __init__(self, budgets=None, max_wait_seconds=30, breaker=None, negative_ttl_seconds=3600,
+                 ticker_failures=None):
+        self._local = threading.local()
+        self._negative = {}  # (provider, operation, ticker) -> {'until': monotonic time, 'reason': str}
+        self._failures = {}  # (provider, operation, ticker) -> consecutive failed calls
+        self._negative_lock = threading.Lock()
+        self.configure(budgets or DEFAULT_BUDGETS, max_wait_seconds, breaker, negative_ttl_seconds, ticker_failures)
+
+    def configure(self, budgets, max_wait_seconds=30, breaker=None, negative_ttl_seconds=3600, ticker_failures=None):
+        breaker = breaker or {'failure_threshold': 5, 'cooldown_seconds': 60}
+        ticker_failures = ticker_failures or {'threshold': 3, 'ttl_seconds': 300}
+        self.max_wait_seconds = max_wait_seconds
+        # Definitive results (no data for the symbol) vs. repeated errors, which may be transient
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.ticker_failure_threshold = ticker_failures['threshold']
+        self.ticker_failure_ttl_seconds = ticker_failures['ttl_seconds']
+        self._buckets = {
+            provider: _Bucket(budget['rate_per_second'], budget['burst'])
+            for provider, budget in budgets.items()
+        }
+        self._breakers = {
+            provider: _CircuitBreaker(breaker['failure_threshold'], breaker['cooldown_seconds'])
+            for provider in set(budgets) | set(DEFAULT_BUDGETS)
+        }
+
+    # --- Negative cache: tickers an upstream operation recently failed for ---
+    @staticmethod
+    def _symbol(ticker):
+        return ticker.upper().replace('.', '-')
+
+    def mark_bad(self, provider, operation, ticker, reason, ttl_seconds=None):
+        """Negatively cache a definitive "unresolvable" result (no instrument, empty history)"""
+        ttl = self.negative_ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._negative_lock:
+            self._negative[(provider, operation, self._symbol(ticker))] = {
+                'until': time.monotonic() + ttl, 'reason': reason
+            }
+
+    def _record_ticker_failure(self, provider, operation, ticker, reason):
+        """Only `ticker_failure_threshold` consecutive errors negatively cache a ticker, and briefly"""
+        key = (provider, operation, self._symbol(ticker))
+        with self._negative_lock:
+            failures = self._failures.get(key, 0) + 1
+            if failures < self.ticker_failure_threshold:
+                self._failures[key] = failures
+                return
+            self._failures.pop(key, None)
+        self.mark_bad(provider, operation, ticker, reason, self.ticker_failure_ttl_seconds)
+
+    def _record_ticker_success(self, provider, operation, ticker):
+        if self._failures:
+            with self._negative_lock:
+                self._failures.pop((provider, operation, self._symbol(ticker)), None)
+
+    def known_bad(self, provider, operation, ticker):
+        """The failure reason if `ticker` is negatively cached for this operation, else None"""
+        if not ticker:
+            return None
+        key = (provider, operation, self._symbol(ticker))
+        with self._negative_lock:
+            entry = self._negative.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry['until']:
+                del self._negative[key]
+                return None
+            return entry['reason']
+
+    def clear_bad(self, provider=None, tickers=None):
+        with self._negative_lock:
+            for cache in (self._negative, self._failures):
+                for key in list(cache):
+                    if (provider is None or key[0] == provider) and (tickers is None or key[2] in tickers):
+                        del cache[key]
+
+    def current_priority(self):
+        return getattr(self._local, 'priority', INTERACTIVE)
+
+    @contextmanager
+    def priority(self, priority):
+        previous = self.current_priority()
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def run_in_background(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) with background priority (for thread pool targets)"""
+        with self.priority(BACKGROUND):
+            return func(*args, **kwargs)
+
+    @contextmanager
+    def call(self, provider, operation, ticker=None):
+        """
+        Wait for `provider`'s rate budget, then time the block in perf metrics.
+        Fails fast with KnownBadTicker / UpstreamUnavailable for negatively cached
+        tickers and open circuit breakers, and raises UpstreamThrottled if no
+        budget frees up within max_wait_seconds. An exception in the block counts
+        as a failure for the breaker and toward the ticker's failure streak.
+        """
+        reason = self.known_bad(provider, operation, ticker)
+        if reason:
+            perf.record(provider, operation, 0, outcome='known_bad', ticker=ticker)
+            raise KnownBadTicker(f"{ticker} recently failed at {provider}: {reason}")
+        breaker = self._breakers.get(provider)
+        if breaker is not None and not breaker.allow():
+            perf.record(provider, operation, 0, outcome='circuit_open', ticker=ticker)
+            raise UpstreamUnavailable(f"{provider} circuit breaker is open")
+
+        settled = False  # the breaker saw this call's outcome
+        try:
+            bucket = self._buckets.get(provider)
+            if bucket is not None:
+                priority = self.current_priority()
+                start = time.perf_counter()
+                acquired = bucket.acquire(priority, self.max_wait_seconds)
+                perf.record('rate_limit_wait', f"{provider}.{priority}", time.perf_counter() - start,
+                            outcome='ok' if acquired else 'throttled')
+                if not acquired:
+                    perf.record(provider, operation, 0, outcome='throttled', ticker=ticker)
+                    raise UpstreamThrottled(f"{provider} budget exhausted for {operation}")
+            try:
+                with perf.timed(provider, operation, ticker=ticker):
+                    yield
+            except Exception as e:
+                settled = True
+                if breaker is not None:
+                    outage_tickers = breaker.record_failure(ticker)
+                    if outage_tickers:
+                        # The streak was an outage, not bad symbols: forget those negatives
+                        print(f"Circuit breaker for {provider} opened after repeated failures: {e}")
+                        self.clear_bad(provider, {self._symbol(t) for t in outage_tickers})
+                        raise
+                if ticker:
+                    self._record_ticker_failure(provider, operation, ticker, str(e))
+                raise
+            else:
+                settled = True
+                if breaker is not None:
+                    breaker.record_success()
+                if ticker:
+                    self._record_ticker_success(provider, operation, ticker)
+        finally:
+            # A half-open probe that was throttled or interrupted must not hold the slot forever
+            if not settled and breaker is not None:
+                breaker.release_probe()
+
+    def status(self):
+        status = {}
+        for provider, bucket in self._buckets.items():
+            with bucket.condition:
+                bucket._refill()
+                status[provider] = {
+                    'rate_per_second': bucket.rate,
+                    'burst': bucket.capacity,
+                    'tokens': round(bucket.tokens, 2),
+                    'waiting': dict(bucket.waiting)
+                }
+        for provider, breaker in self._breakers.items():
+            with breaker.lock:
+                status.setdefault(provider, {})['breaker'] = {'state': breaker.state, 'consecutive_failures': breaker.failures}
+        now = time.monotonic()
+        with self._negative_lock:
+            for (provider, operation, ticker), entry in self._negative.items():
+                if entry['until'] > now:
+                    status.setdefault(provider, {}).setdefault('known_bad', {})[f"{operation}:{ticker}"] = entry['reason']
+        return status
+
+# Global instance (app.py applies config['upstream'] at startup)
+upstream = UpstreamGovernor()
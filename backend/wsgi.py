@@ -0,0 +1,10 @@
+"""
+Production entry point. Run from the backend directory:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app, start_background_startup_tasks
+
+# Each worker establishes its own Robinhood session (reusing the stored session
+# pickle) and schedules the cache sweep; portfolio refreshes are serialized per
+# account across workers through the lock files in the shared cache directory.
+start_background_startup_tasks()
@@ -51,7 +51,11 @@ document.getElementById('rsi-sell').addEventListener('change', (e) => {
 // Fetch data
 async function fetchData() {
     try {
-        const response = await fetch(`${API_BASE}/api/historical/${ticker}`);
+        // Only the last year is charted; let the backend trim and downsample to the canvas width
+        const oneYearAgo = new Date();
+        oneYearAgo.setFullYear(oneYearAgo.getFullYear() - 1);
+        const start = oneYearAgo.toISOString().slice(0, 10);
+        const response = await fetch(`${API_BASE}/api/historical/${ticker}?start=${start}&max_points=1200`);
         if (!response.ok) throw new Error('Failed to fetch data');
 
         historicalData = await response.json();
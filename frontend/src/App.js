@@ -114,6 +114,36 @@ const TableRowSkeleton = ({ columns, columnOrder }) => (
     </tr>
 );
 
+// Apply a delta response from /api/portfolio?since=<version> to the previously cached full payload
+const applyPortfolioPatch = (base, patch) => {
+    const byId = new Map((base.position_ids || []).map((id, i) => [id, base.positions[i]]));
+    patch.removed.forEach(id => byId.delete(id));
+    Object.entries(patch.changed).forEach(([id, fields]) => {
+        if (byId.has(id)) byId.set(id, { ...byId.get(id), ...fields });
+    });
+    patch.added.forEach(({ id, position }) => byId.set(id, position));
+    return {
+        ...base,
+        summary: { ...base.summary, ...patch.summary },
+        timestamp: patch.timestamp,
+        version: patch.version,
+        position_ids: patch.position_ids,
+        positions: patch.position_ids.map(id => byId.get(id)).filter(Boolean),
+    };
+};
+
+// Merge /api/portfolio/<account>/analytics results ({ticker: fields}) into core positions
+const mergeAnalytics = (data, analytics) => ({
+    ...data,
+    positions: data.positions.map(pos => {
+        const fields = analytics[pos.ticker];
+        if (!fields) return pos;
+        if (pos.type === 'stock') return { ...pos, ...fields };
+        if (pos.type === 'option') return { ...pos, yearly_revenue_change: fields.yearly_revenue_change };
+        return pos;
+    })
+});
+
 const formatCurrency = (value, sign = false) => {
     if (typeof value !== 'number') return '$0.00';
     const options = { style: 'currency', currency: 'USD', minimumFractionDigits: 2, maximumFractionDigits: 2 };
@@ -217,6 +247,9 @@ function App() {
     const [loginLoading, setLoginLoading] = useState(false);
     const [loginMessage, setLoginMessage] = useState(null);
     const [globalNotes, setGlobalNotes] = useState({});
+    // Latest notes for the live stream handlers, so editing a note doesn't reconnect the stream
+    const globalNotesRef = useRef(globalNotes);
+    globalNotesRef.current = globalNotes;
     const [showRefreshDone, setShowRefreshDone] = useState(false);
     const [showGroups, setShowGroups] = useState(() => {
         const saved = localStorage.getItem(`showGroups_${selectedAccount}`);
@@ -623,6 +656,7 @@ function App() {
         if (!selectedAccount) return;
 
         const cacheKey = `${config.cache.local_storage_keys.portfolio_data_prefix}${selectedAccount}`;
+        let cachedData = null;
 
         // If not forcing a refresh, try to load from cache first
         if (!force) {
@@ -630,6 +664,7 @@ function App() {
                 const cached = localStorage.getItem(cacheKey);
                 if (cached) {
                     const parsed = JSON.parse(cached);
+                    cachedData = parsed;
                     // Optional: Add a timestamp to invalidate cache after some time
                     setPortfolioData(parsed);
                     setLoading(false); // Stop initial loading, but we'll still fetch in background
@@ -647,7 +682,50 @@ function App() {
         setError(null);
 
         try {
-            const portfolioUrl = `${config.api.base_url}${config.api.endpoints.portfolio}/${selectedAccount}${force ? '?force=true' : ''}`;
+            if (!force && !cachedData) {
+                // First paint from Robinhood-only core data; analytics columns fill in as they become ready
+                const portfolioBase = `${config.api.base_url}${config.api.endpoints.portfolio}/${selectedAccount}`;
+                const withNotes = (data) => ({
+                    ...data,
+                    positions: data.positions.map(pos => ({
+                        ...pos,
+                        note: globalNotes[pos.ticker]?.note || '',
+                        comment: globalNotes[pos.ticker]?.comment || ''
+                    }))
+                });
+
+                const coreRes = await fetch(`${portfolioBase}?fields=core`);
+                let coreData = await coreRes.json();
+                if (!coreRes.ok || coreData.error) {
+                    throw new Error(coreData.error || `HTTP error! status: ${coreRes.status}`);
+                }
+                setPortfolioData(withNotes(coreData));
+                setLoading(false);
+
+                for (let attempt = 0; attempt < 60; attempt++) {
+                    const analyticsRes = await fetch(`${portfolioBase}/analytics`);
+                    if (!analyticsRes.ok) break;
+                    const { ready, pending } = await analyticsRes.json();
+                    coreData = mergeAnalytics(coreData, ready);
+                    setPortfolioData(withNotes(coreData));
+                    if (pending.length === 0) break;
+                    await new Promise(resolve => setTimeout(resolve, 2000));
+                }
+
+                try {
+                    localStorage.setItem(cacheKey, JSON.stringify(withNotes(coreData)));
+                } catch (e) {
+                    console.error("Failed to write to cache", e);
+                }
+                return;
+            }
+
+            // Ask only for changes since the cached snapshot version, if we have one
+            const params = new URLSearchParams();
+            if (force) params.set('force', 'true');
+            if (cachedData?.version && cachedData?.position_ids) params.set('since', cachedData.version);
+            const query = params.toString();
+            const portfolioUrl = `${config.api.base_url}${config.api.endpoints.portfolio}/${selectedAccount}${query ? `?${query}` : ''}`;
 
             // Fetch portfolio data and global notes in parallel
             const [portfolioRes, notes] = await Promise.all([
@@ -660,10 +738,14 @@ function App() {
                 throw new Error(errData.error || `HTTP error! status: ${portfolioRes.status}`);
             }
 
-            const portfolioResult = await portfolioRes.json();
+            let portfolioResult = await portfolioRes.json();
 
             if (portfolioResult.error) throw new Error(portfolioResult.error);
 
+            if (portfolioResult.full === false) {
+                portfolioResult = applyPortfolioPatch(cachedData, portfolioResult);
+            }
+
             // Merge positions with global notes
             const positionsWithNotes = portfolioResult.positions.map(pos => ({
                 ...pos,
@@ -698,6 +780,48 @@ function App() {
         fetchData();
     }, [selectedAccount, fetchData]);
 
+    // Live price and P/L updates pushed by the backend (Server-Sent Events)
+    useEffect(() => {
+        if (!selectedAccount || typeof EventSource === 'undefined') return;
+
+        const withNotes = (data) => {
+            const notes = globalNotesRef.current;
+            return {
+                ...data,
+                positions: data.positions.map(pos => ({
+                    ...pos,
+                    note: notes[pos.ticker]?.note || '',
+                    comment: notes[pos.ticker]?.comment || ''
+                }))
+            };
+        };
+
+        let source;
+        let streamVersion = null;
+        const connect = () => {
+            source = new EventSource(`${config.api.base_url}${config.api.endpoints.portfolio_stream}/${selectedAccount}`);
+            source.addEventListener('snapshot', (event) => {
+                const snapshot = JSON.parse(event.data);
+                streamVersion = snapshot.version;
+                setPortfolioData(withNotes(snapshot));
+            });
+            source.addEventListener('patch', (event) => {
+                const patch = JSON.parse(event.data);
+                if (patch.since !== streamVersion) {
+                    // Out of sync with the stream; reconnect to get a fresh snapshot
+                    source.close();
+                    connect();
+                    return;
+                }
+                streamVersion = patch.version;
+                setPortfolioData(prev => (prev && prev.version === patch.since) ? withNotes(applyPortfolioPatch(prev, patch)) : prev);
+            });
+        };
+        connect();
+
+        return () => source.close();
+    }, [selectedAccount]);
+
     const handleReLogin = async () => {
         setLoginLoading(true);
         setLoginMessage(null);